@@ -0,0 +1,115 @@
+import json
+import zlib
+from typing import Optional
+import chess
+
+# Compact storage for moment cards: the root FEN plus UCI move lists, zlib-compressed.
+# SAN and fen_after are derived again on read; evals and text fields are stored as-is.
+CARDS_FORMAT = 1
+ZLIB_LEVEL = 6
+
+_PV_FIELDS = (("pv_best", False), ("pv_played", True))
+_CANDIDATE_FIELDS = (("candidates", False), ("candidates_played", True))
+_LISTS = {name for name, _ in _PV_FIELDS + _CANDIDATE_FIELDS}
+
+
+def _pack_pv(pv: list[dict]) -> dict:
+    out = {"m": [m["uci"] for m in pv]}
+    evals = [m.get("eval_cp") for m in pv]
+    if any(e is not None for e in evals):
+        out["e"] = evals
+    return out
+
+
+def _unpack_pv(board: chess.Board, packed: dict, fen_after: bool) -> list[dict]:
+    b = board.copy(stack=False)
+    evals = packed.get("e") or [None] * len(packed["m"])
+    out = []
+    for uci, ev in zip(packed["m"], evals):
+        mv = chess.Move.from_uci(uci)
+        san = b.san(mv)
+        b.push(mv)
+        out.append({"uci": uci, "san": san, "fen_after": b.fen() if fen_after else None, "eval_cp": ev})
+    return out
+
+
+def _derived(board: chess.Board, uci_played: str, uci_best: str) -> dict:
+    return {
+        "side_to_move": "White" if board.turn == chess.WHITE else "Black",
+        "san_played": board.san(chess.Move.from_uci(uci_played)),
+        "san_best": board.san(chess.Move.from_uci(uci_best)) if uci_best else "",
+    }
+
+
+def _pack_card(card: dict) -> dict:
+    derived = _derived(chess.Board(card["fen_before"]), card["uci_played"], card.get("uci_best"))
+    skip = {k for k, v in derived.items() if card.get(k) == v} | set(_LISTS)
+    out = {k: v for k, v in card.items() if k not in skip}
+    for name, _ in _PV_FIELDS:
+        out[name] = _pack_pv(card.get(name) or [])
+    for name, _ in _CANDIDATE_FIELDS:
+        out[name] = [{"uci": c["uci"], "eval_cp": c.get("eval_cp"), "pv": _pack_pv(c.get("pv") or [])}
+                     for c in card.get(name) or []]
+    return out
+
+
+def _unpack_card(packed: dict, fen_after: bool) -> dict:
+    board = chess.Board(packed["fen_before"])
+    played_board = board.copy(stack=False)
+    played_board.push_uci(packed["uci_played"])
+    roots = {False: board, True: played_board}
+    card = {**_derived(board, packed["uci_played"], packed.get("uci_best")),
+            **{k: v for k, v in packed.items() if k not in _LISTS}}
+    for name, after_played in _PV_FIELDS:
+        card[name] = _unpack_pv(roots[after_played], packed[name], fen_after)
+    for name, after_played in _CANDIDATE_FIELDS:
+        root = roots[after_played]
+        card[name] = [{"uci": c["uci"], "san": root.san(chess.Move.from_uci(c["uci"])), "eval_cp": c["eval_cp"],
+                       "pv": _unpack_pv(root, c["pv"], fen_after)}
+                      for c in packed[name]]
+    return card
+
+
+def pack_cards(cards: list[dict]) -> bytes:
+    """Moment cards (PivotMoment dumps) -> compressed blob for Report.cards_blob."""
+    payload = {"v": CARDS_FORMAT, "cards": [_pack_card(c) for c in cards]}
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode(), ZLIB_LEVEL)
+
+
+def unpack_cards(blob: bytes, fen_after: bool = True) -> list[dict]:
+    """Inverse of pack_cards. With fen_after=False the per-move FENs are left as None (slim reports)."""
+    payload = json.loads(zlib.decompress(blob))
+    if payload.get("v") != CARDS_FORMAT:
+        raise ValueError(f"unknown moment card format {payload.get('v')!r}")
+    return [_unpack_card(c, fen_after) for c in payload["cards"]]
+
+
+def report_cards(report, fen_after: bool = True) -> list[dict]:
+    """A report's moment cards, from the compact blob or, for older rows, the JSON column."""
+    if report.cards_blob is not None:
+        return unpack_cards(report.cards_blob, fen_after)
+    cards = report.moment_cards or []
+    if not fen_after:
+        cards = [_strip_fens(c) for c in cards]
+    return cards
+
+
+def trim_card(card: dict, multipv: int, pv_len: int) -> dict:
+    """A card built with more lines (or longer ones) cut down to `multipv` candidates of `pv_len` moves."""
+    out = dict(card)
+    for name, _ in _PV_FIELDS:
+        out[name] = (card.get(name) or [])[:pv_len]
+    for name, _ in _CANDIDATE_FIELDS:
+        out[name] = [{**c, "pv": (c.get("pv") or [])[:pv_len]} for c in (card.get(name) or [])[:multipv]]
+    return out
+
+
+def _strip_fens(card: dict) -> dict:
+    def strip(pv: Optional[list]) -> list:
+        return [{**m, "fen_after": None} for m in pv or []]
+    out = dict(card)
+    for name, _ in _PV_FIELDS:
+        out[name] = strip(card.get(name))
+    for name, _ in _CANDIDATE_FIELDS:
+        out[name] = [{**c, "pv": strip(c.get("pv"))} for c in card.get(name) or []]
+    return out
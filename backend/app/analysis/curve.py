@@ -0,0 +1,61 @@
+import json
+import zlib
+from typing import Optional
+import chess
+
+# Per-game eval curve kept by detect_pivots: one entry per ply (0 = start position) with the
+# white-relative score, the depth its search reached, its source and the engine line.
+# Stored zlib-compressed next to the reports so pivots can be re-selected without the engine.
+CURVE_FORMAT = 1
+ZLIB_LEVEL = 6
+
+_SOURCES = {"engine": "e", "book": "b", "tablebase": "t", "embedded": "a"}
+_SOURCE_NAMES = {v: k for k, v in _SOURCES.items()}
+
+
+def pack_curve(curve: dict) -> bytes:
+    payload = {**curve, "v": CURVE_FORMAT,
+               "sources": "".join(_SOURCES[s] for s in curve["sources"]),
+               "pvs": [" ".join(pv) for pv in curve["pvs"]]}
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode(), ZLIB_LEVEL)
+
+
+def unpack_curve(blob: bytes) -> dict:
+    payload = json.loads(zlib.decompress(blob))
+    if payload.pop("v", None) != CURVE_FORMAT:
+        raise ValueError("unknown eval curve format")
+    payload["sources"] = [_SOURCE_NAMES[c] for c in payload["sources"]]
+    payload["pvs"] = [tuple(pv.split()) for pv in payload["pvs"]]
+    return payload
+
+
+def covers(curve: dict, depth: int, mode: str, prescan_depth: int, pre_threshold: int) -> bool:
+    """Whether a stored curve can stand in for a scan with these settings.
+
+    A full scan at `depth` or deeper serves any request at that depth. A two-pass curve
+    only has deep evals around its own flagged swings, so it serves two-pass requests with
+    the same sweep depth whose (scaled) threshold flags no more plies than it did. Curves
+    built from a PGN's own [%eval] comments serve no other request.
+    """
+    if curve["mode"] == "embedded" or curve["depth"] < depth:
+        return False
+    if curve["mode"] == "full":
+        return True
+    return (mode == "two_pass" and curve["prescan_depth"] == prescan_depth
+            and curve["pre_threshold"] <= pre_threshold)
+
+
+def curve_points(curve: dict) -> list[dict]:
+    """Chart-friendly view: per ply the move that led there (SAN), eval, best move and depth."""
+    board = chess.Board(curve["fen"])
+    points = []
+    for ply, score in enumerate(curve["scores"]):
+        san: Optional[str] = None
+        if ply > 0:
+            mv = chess.Move.from_uci(curve["moves"][ply - 1])
+            san = board.san(mv)
+            board.push(mv)
+        pv = curve["pvs"][ply]
+        points.append({"ply": ply, "san": san, "eval_cp": score, "best": pv[0] if pv else None,
+                       "depth": curve["depths"][ply], "source": curve["sources"][ply]})
+    return points
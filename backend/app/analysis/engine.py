@@ -1,7 +1,11 @@
 import os
-from typing import Optional
+import time
+from typing import Optional, List, Tuple
 import chess
 import chess.engine
+from app.schemas import PVMove, CandidateLine
+from app.analysis.eval_cache import get_eval_cache
+from app.metrics import CACHE_LOOKUPS, ENGINE_SEARCHES, observe_search, span
 
 STOCKFISH_PATH = os.getenv("STOCKFISH_PATH", "stockfish")
 
@@ -16,3 +20,67 @@ def score_to_white_cp(score: chess.engine.PovScore) -> Optional[int]:
             return None
         return 100000 if m > 0 else -100000
     return s.score(mate_score=100000)
+
+def analyse(
+    engine: chess.engine.SimpleEngine,
+    board: chess.Board,
+    depth: int,
+    multipv: int = 1,
+    time_limit: Optional[float] = None,
+) -> List[chess.engine.InfoDict]:
+    """`engine.analyse` behind the shared eval cache; always returns a list of multipv infos."""
+    cache = get_eval_cache()
+    if cache is not None:
+        cached = cache.get(board, depth, multipv)
+        CACHE_LOOKUPS.labels("eval", "miss" if cached is None else "hit").inc()
+        if cached is not None:
+            ENGINE_SEARCHES.labels("cache").inc()
+            return cached
+    t0 = time.perf_counter()
+    infos = engine.analyse(board, chess.engine.Limit(depth=depth, time=time_limit), multipv=multipv)
+    if isinstance(infos, dict):
+        infos = [infos]
+    if infos:
+        observe_search(infos[0], time.perf_counter() - t0)
+    if cache is not None and infos and "score" in infos[0]:
+        # a search stopped by its time limit is stored at the depth it reached
+        cache.put(board, min(info.get("depth", depth) for info in infos), multipv, infos)
+    return infos
+
+def pv_moves(board: chess.Board, pv: List[chess.Move]) -> List[PVMove]:
+    b = board.copy(stack=False)
+    out = []
+    for mv in pv:
+        if mv not in b.legal_moves:
+            break
+        san = b.san(mv)
+        b.push(mv)
+        out.append(PVMove(uci=mv.uci(), san=san, fen_after=b.fen()))
+    return out
+
+def analyze_multipv(
+    board: chess.Board,
+    engine: chess.engine.SimpleEngine,
+    depth: int,
+    multipv: int = 1,
+    pv_len: int = 4,
+    time_limit: Optional[float] = None,
+) -> Tuple[List[PVMove], List[CandidateLine], Optional[str], Optional[int]]:
+    """Return (pv_best, candidates, uci_best, eval_best_cp) for `board`; evals are white-relative."""
+    with span("multipv"):
+        infos = analyse(engine, board, depth, multipv=multipv, time_limit=time_limit)
+    candidates: List[CandidateLine] = []
+    for info in infos:
+        pv = info.get("pv") or []
+        if not pv:
+            continue
+        candidates.append(CandidateLine(
+            uci=pv[0].uci(),
+            san=board.san(pv[0]),
+            eval_cp=score_to_white_cp(info["score"]) if "score" in info else None,
+            pv=pv_moves(board, pv[:pv_len]),
+        ))
+    if not candidates:
+        return [], [], None, None
+    best = candidates[0]
+    return best.pv, candidates, best.uci, best.eval_cp
@@ -0,0 +1,224 @@
+import os
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Sequence, TypeVar
+import chess.engine
+from app.analysis.engine import open_engine
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+ENGINE_POOL_SIZE = int(os.getenv("ENGINE_POOL_SIZE", "1"))
+ENGINE_THREADS = int(os.getenv("ENGINE_THREADS", "1"))
+ENGINE_HASH_MB = int(os.getenv("ENGINE_HASH_MB", "128"))
+# Recycle an engine after this many checkouts, or once its RSS grows past the cap (0 disables).
+ENGINE_MAX_USES = int(os.getenv("ENGINE_MAX_USES", "200"))
+ENGINE_MAX_RSS_MB = int(os.getenv("ENGINE_MAX_RSS_MB", "0"))
+# Upper bound on engines a single job may use at once. A job only borrows engines
+# that are idle, so concurrent jobs in one worker never exceed ENGINE_POOL_SIZE.
+ENGINE_JOB_PARALLELISM = int(os.getenv("ENGINE_JOB_PARALLELISM", "1"))
+
+
+def _rss_mb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        return None
+    return None
+
+
+class EnginePool:
+    """A fixed-size set of long-lived UCI engines shared by one worker process.
+
+    Engines are started lazily (or eagerly via `warm()`), configured once with
+    Threads/Hash, and handed out through `checkout()`/`checkin()` so the
+    transposition table survives across plies and across jobs.
+    """
+
+    def __init__(self, size: int = ENGINE_POOL_SIZE, threads: int = ENGINE_THREADS, hash_mb: int = ENGINE_HASH_MB,
+                 max_uses: int = ENGINE_MAX_USES, max_rss_mb: int = ENGINE_MAX_RSS_MB):
+        self.size = max(1, size)
+        self.options = {"Threads": threads, "Hash": hash_mb}
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self._idle: "queue.LifoQueue[chess.engine.SimpleEngine]" = queue.LifoQueue()
+        self._uses: dict[int, int] = {}
+        self._started = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        cores = os.cpu_count() or 1
+        if self.size * threads > cores:
+            logger.warning("engine_pool: %s engines x %s threads oversubscribes %s cores", self.size, threads, cores)
+
+    def _start(self) -> chess.engine.SimpleEngine:
+        eng = open_engine()
+        try:
+            eng.configure({k: v for k, v in self.options.items() if k in eng.options})
+        except Exception:
+            eng.quit()
+            raise
+        self._uses[id(eng)] = 0
+        logger.info("engine_pool: started engine pid=%s options=%s", eng.transport.get_pid(), self.options)
+        return eng
+
+    def _discard(self, eng: chess.engine.SimpleEngine) -> None:
+        self._uses.pop(id(eng), None)
+        with self._lock:
+            self._started -= 1
+        try:
+            eng.quit()
+        except Exception:
+            try:
+                eng.close()
+            except Exception:
+                pass
+
+    def _healthy(self, eng: chess.engine.SimpleEngine) -> bool:
+        try:
+            eng.ping()
+        except Exception:
+            return False
+        if self.max_rss_mb:
+            rss = _rss_mb(eng.transport.get_pid())
+            if rss is not None and rss > self.max_rss_mb:
+                logger.info("engine_pool: recycling engine pid=%s rss=%sMB", eng.transport.get_pid(), rss)
+                return False
+        return True
+
+    def warm(self) -> None:
+        engines = [self.checkout() for _ in range(self.size)]
+        for eng in engines:
+            self.checkin(eng)
+
+    def _acquire(self, block: bool, timeout: Optional[float]) -> Optional[chess.engine.SimpleEngine]:
+        if self._closed:
+            raise RuntimeError("Engine pool is closed.")
+        while True:
+            try:
+                eng = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_start = self._started < self.size
+                    if can_start:
+                        self._started += 1
+                if can_start:
+                    try:
+                        return self._start()
+                    except Exception:
+                        with self._lock:
+                            self._started -= 1
+                        raise
+                if not block:
+                    return None
+                try:
+                    eng = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError("No engine available in pool.")
+            if self._healthy(eng):
+                return eng
+            self._discard(eng)
+
+    def checkout(self, timeout: Optional[float] = None) -> chess.engine.SimpleEngine:
+        return self._acquire(block=True, timeout=timeout)
+
+    def try_checkout(self) -> Optional[chess.engine.SimpleEngine]:
+        """An idle (or newly started) engine, or None if the pool is fully in use."""
+        return self._acquire(block=False, timeout=None)
+
+    def checkin(self, eng: chess.engine.SimpleEngine, discard: bool = False) -> None:
+        uses = self._uses.get(id(eng), 0) + 1
+        self._uses[id(eng)] = uses
+        if discard or self._closed or (self.max_uses and uses >= self.max_uses):
+            self._discard(eng)
+            return
+        self._idle.put(eng)
+
+    @contextmanager
+    def engine(self, timeout: Optional[float] = None) -> Iterator[chess.engine.SimpleEngine]:
+        eng = self.checkout(timeout=timeout)
+        failed = False
+        try:
+            yield eng
+        except (chess.engine.EngineError, chess.engine.EngineTerminatedError, TimeoutError):
+            failed = True
+            raise
+        finally:
+            self.checkin(eng, discard=failed)
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                eng = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(eng)
+
+
+_pool: Optional[EnginePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> EnginePool:
+    """Process-wide pool. The owner (worker main, scripts) must call `close()` on shutdown:
+    engine I/O threads are not daemonic, so the interpreter cannot exit while engines run."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = EnginePool()
+        return _pool
+
+
+def map_engines(
+    engine: chess.engine.SimpleEngine,
+    items: Sequence[T],
+    fn: Callable[[chess.engine.SimpleEngine, T], R],
+    pool: Optional[EnginePool] = None,
+    parallelism: int = 1,
+) -> List[R]:
+    """Apply `fn(engine, item)` to every item, in order.
+
+    With a pool and parallelism > 1 the items are split into contiguous chunks
+    (so each engine's hash sees neighbouring positions) and run concurrently on
+    `engine` plus whatever idle engines the pool can lend, up to `parallelism`.
+    """
+    extra: List[chess.engine.SimpleEngine] = []
+    if pool is not None and parallelism > 1 and len(items) > 1:
+        for _ in range(min(parallelism, len(items)) - 1):
+            eng = pool.try_checkout()
+            if eng is None:
+                break
+            extra.append(eng)
+    if not extra:
+        return [fn(engine, it) for it in items]
+
+    engines = [engine] + extra
+    size = -(-len(items) // len(engines))
+    chunks = [items[k * size:(k + 1) * size] for k in range(len(engines))]
+    failed: set[int] = set()
+
+    def run(k: int) -> List[R]:
+        try:
+            return [fn(engines[k], it) for it in chunks[k]]
+        except Exception:
+            failed.add(k)
+            raise
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(engines)) as ex:
+            futures = [ex.submit(run, k) for k in range(len(engines))]
+            out: List[R] = []
+            for f in futures:
+                out.extend(f.result())
+            return out
+    finally:
+        for k, eng in enumerate(extra, start=1):
+            pool.checkin(eng, discard=k in failed)
@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, List
+import chess
+import chess.engine
+
+logger = logging.getLogger(__name__)
+
+EVAL_CACHE_ENABLED = os.getenv("EVAL_CACHE_ENABLED", "1") == "1"
+EVAL_CACHE_LRU_SIZE = int(os.getenv("EVAL_CACHE_LRU_SIZE", "50000"))
+EVAL_CACHE_TTL_S = int(os.getenv("EVAL_CACHE_TTL_S", str(30 * 24 * 3600)))
+EVAL_CACHE_PREFIX = "evalcache:"
+# After a Redis error, serve from the LRU only for this long before retrying.
+EVAL_CACHE_REDIS_BACKOFF_S = 30
+
+
+def normalize_fen(board: chess.Board) -> str:
+    # Drop the move clocks and only keep an en-passant square if a capture is legal,
+    # so transpositions reached by different move orders share one entry.
+    return " ".join(board.fen(en_passant="legal").split(" ")[:4])
+
+
+def _encode(infos: List[chess.engine.InfoDict]) -> list:
+    lines = []
+    for info in infos:
+        score = info.get("score")
+        w = score.white() if score is not None else None
+        lines.append({
+            "s": None if w is None else (["mate", w.mate()] if w.is_mate() else ["cp", w.score()]),
+            "pv": [m.uci() for m in info.get("pv") or []],
+            "depth": info.get("depth"),
+        })
+    return lines
+
+
+def _decode(lines: list) -> List[chess.engine.InfoDict]:
+    infos = []
+    for line in lines:
+        info: chess.engine.InfoDict = {"pv": [chess.Move.from_uci(u) for u in line["pv"]]}
+        if line.get("s"):
+            kind, v = line["s"]
+            rel = chess.engine.Mate(v) if kind == "mate" else chess.engine.Cp(v)
+            info["score"] = chess.engine.PovScore(rel, chess.WHITE)
+        if line.get("depth") is not None:
+            info["depth"] = line["depth"]
+        infos.append(info)
+    return infos
+
+
+class EvalCache:
+    """Evaluation store keyed by normalized FEN, with an in-process LRU in front of Redis.
+
+    Each position keeps the stored searches no other one dominates (a deep single-line
+    search and a shallower multipv one can both be useful); a lookup is served by any
+    entry whose depth and multipv are at least the requested ones.
+    """
+
+    def __init__(self, size: int = EVAL_CACHE_LRU_SIZE, ttl_s: int = EVAL_CACHE_TTL_S, redis=None):
+        self.size = size
+        self.ttl_s = ttl_s
+        self.redis = redis
+        self._lru: "OrderedDict[str, tuple[float, list]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.redis_hits = 0
+        self._redis_down_until = 0.0
+
+    @staticmethod
+    def _key(fen: str) -> str:
+        return EVAL_CACHE_PREFIX + hashlib.sha1(fen.encode()).hexdigest()
+
+    def _lru_get(self, fen: str) -> Optional[list]:
+        with self._lock:
+            item = self._lru.get(fen)
+            if item is None:
+                return None
+            stored_at, entry = item
+            if self.ttl_s and time.time() - stored_at > self.ttl_s:
+                del self._lru[fen]
+                return None
+            self._lru.move_to_end(fen)
+            return entry
+
+    def _lru_put(self, fen: str, entries: list) -> None:
+        with self._lock:
+            self._lru[fen] = (time.time(), entries)
+            self._lru.move_to_end(fen)
+            while len(self._lru) > self.size:
+                self._lru.popitem(last=False)
+
+    def _redis_ok(self) -> bool:
+        return self.redis is not None and time.time() >= self._redis_down_until
+
+    def _redis_failed(self, e: Exception) -> None:
+        logger.warning("eval_cache: redis unavailable, using in-process cache only: %s", e)
+        self._redis_down_until = time.time() + EVAL_CACHE_REDIS_BACKOFF_S
+
+    def _redis_get(self, fen: str) -> Optional[list]:
+        if not self._redis_ok():
+            return None
+        try:
+            raw = self.redis.get(self._key(fen))
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+        if not raw:
+            return None
+        entries = json.loads(raw)
+        return entries if isinstance(entries, list) else [entries]  # stored before entries were lists
+
+    def _redis_put(self, fen: str, entries: list) -> None:
+        if not self._redis_ok():
+            return
+        try:
+            self.redis.set(self._key(fen), json.dumps(entries), ex=self.ttl_s or None)
+        except Exception as e:
+            self._redis_failed(e)
+
+    def get(self, board: chess.Board, depth: int, multipv: int = 1) -> Optional[List[chess.engine.InfoDict]]:
+        fen = normalize_fen(board)
+        entries = self._lru_get(fen)
+        from_redis = entries is None
+        if from_redis:
+            entries = self._redis_get(fen)
+            if entries is not None:
+                self._lru_put(fen, entries)
+        entry = next((e for e in entries or () if e["d"] >= depth and e["m"] >= multipv), None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.redis_hits += from_redis
+        return _decode(entry["lines"][:multipv])
+
+    def put(self, board: chess.Board, depth: int, multipv: int, infos: List[chess.engine.InfoDict]) -> None:
+        """Store a search that reached `depth` with `multipv` lines, unless a stored one dominates it."""
+        fen = normalize_fen(board)
+        current = self._lru_get(fen) or []
+        if any(e["d"] >= depth and e["m"] >= multipv for e in current):
+            return
+        entries = [e for e in current if e["d"] > depth or e["m"] > multipv]
+        entries.append({"d": depth, "m": multipv, "lines": _encode(infos)})
+        self._lru_put(fen, entries)
+        self._redis_put(fen, entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "redis_hits": self.redis_hits,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "lru_size": len(self._lru),
+        }
+
+
+_cache: Optional[EvalCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_eval_cache() -> Optional[EvalCache]:
+    global _cache
+    if not EVAL_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            from app.tasks import get_redis
+            _cache = EvalCache(redis=get_redis())
+        return _cache
@@ -0,0 +1,130 @@
+import hashlib
+from pathlib import Path
+from typing import Optional
+import chess
+
+# Stored plain reports carry this version; it is a hash of this file, so any change
+# to the explanation rules invalidates every stored copy without a manual bump.
+EXPLAIN_VERSION = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:16]
+
+MATE_CP = 100000
+
+
+def _severity(loss_cp: int) -> str:
+    if loss_cp >= 300:
+        return "blunder"
+    if loss_cp >= 100:
+        return "mistake"
+    if loss_cp >= 50:
+        return "inaccuracy"
+    return "turning point"
+
+
+def _side_cp(cp: Optional[int], white: bool) -> Optional[int]:
+    if cp is None:
+        return None
+    return cp if white else -cp
+
+
+def _words(cp: Optional[int]) -> str:
+    if cp is None:
+        return "unclear"
+    if cp >= MATE_CP:
+        return "a forced mate"
+    if cp <= -MATE_CP:
+        return "getting mated"
+    if cp >= 300:
+        return "winning"
+    if cp >= 100:
+        return "clearly better"
+    if cp > -100:
+        return "roughly equal"
+    if cp > -300:
+        return "clearly worse"
+    return "losing"
+
+
+def _move(board: chess.Board, uci: Optional[str]) -> Optional[chess.Move]:
+    try:
+        mv = chess.Move.from_uci(uci or "")
+    except ValueError:
+        return None
+    return mv if mv in board.legal_moves else None
+
+
+def explain_pivot(card: dict) -> dict:
+    """Plain-English fields for one moment card, from the card's own evals and lines only."""
+    board = chess.Board(card["fen_before"])
+    white = card["side_to_move"] == "White"
+    played = _move(board, card.get("uci_played"))
+    best = _move(board, card.get("uci_best"))
+    before = _side_cp(card.get("eval_before_cp"), white)
+    after = _side_cp(card.get("eval_after_played_cp"), white)
+    best_cp = _side_cp(card.get("eval_after_best_cp"), white)
+    if best_cp is None:
+        best_cp = before
+    loss = max(0, best_cp - after) if best_cp is not None and after is not None else 0
+
+    reply = (card.get("pv_played") or [None])[0]
+    motif = "positional"
+    why_bad = f"After {card['san_played']} the position went from {_words(before)} to {_words(after)}."
+    remember = "Before each move, list your opponent's checks, captures and threats."
+    if played is not None and reply:
+        after_board = board.copy(stack=False)
+        after_board.push(played)
+        reply_mv = _move(after_board, reply.get("uci"))
+        if reply_mv is not None and after_board.is_capture(reply_mv):
+            piece = after_board.piece_at(reply_mv.to_square)
+            name = chess.piece_name(piece.piece_type) if piece else "pawn"
+            why_bad += f" It allows {reply['san']}, winning the {name} on {chess.square_name(reply_mv.to_square)}."
+            remember = "Check which of your pieces are left undefended after your move."
+            motif = "allows_capture"
+        elif reply_mv is not None and after_board.gives_check(reply_mv):
+            why_bad += f" It allows the forcing reply {reply['san']}."
+            remember = "Look at every check your opponent gets after your move."
+            motif = "allows_check"
+
+    what_instead = f"{card['san_best']} was stronger."
+    why_instead = f"It keeps the position {_words(best_cp)}."
+    if best is not None:
+        if board.is_capture(best):
+            target = board.piece_at(best.to_square)
+            name = chess.piece_name(target.piece_type) if target else "pawn"
+            why_instead = f"It captures the {name} on {chess.square_name(best.to_square)}; the position stays {_words(best_cp)}."
+            if motif == "positional":
+                motif = "missed_capture"
+        elif board.gives_check(best):
+            why_instead = f"It starts with check and keeps the initiative; the position stays {_words(best_cp)}."
+            if motif == "positional":
+                motif = "missed_check"
+    line = " ".join(m["san"] for m in card.get("pv_best") or [])
+    if line:
+        what_instead += f" Main line: {line}."
+
+    return {
+        "ply": card["ply"],
+        "move_number": card["ply"] // 2 + 1,
+        "side": card["side_to_move"],
+        "played": card["san_played"],
+        "best": card["san_best"],
+        "loss_cp": loss,
+        "severity": _severity(loss),
+        "motif": motif,  # allows_capture|allows_check|missed_capture|missed_check|positional
+        "why_bad": card.get("why_bad") or why_bad,
+        "what_instead": card.get("what_instead") or what_instead,
+        "why_instead": card.get("why_instead") or why_instead,
+        "remember": card.get("remember") or remember,
+    }
+
+
+def explain_pivots(headers: dict, pivots: list[dict]) -> dict:
+    moments = [explain_pivot(p) for p in pivots]
+    counts: dict[str, int] = {}
+    for m in moments:
+        counts[m["severity"]] = counts.get(m["severity"], 0) + 1
+    found = ", ".join(f"{n} {s}{'s' if n > 1 else ''}" for s, n in counts.items()) or "no turning points"
+    white, black = headers.get("White", "White"), headers.get("Black", "Black")
+    return {
+        "summary": f"{white} vs {black} ({headers.get('Result', '*')}): {found}.",
+        "moments": moments,
+    }
@@ -1,7 +1,35 @@
-import os, json
-from openai import OpenAI
+import os, json, hashlib, logging
+from typing import Optional
+from app.metrics import CACHE_LOOKUPS, span
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
+
+# "openai" calls the API; "stub" builds a deterministic report locally (tests, bench, offline dev).
+NARRATION_CLIENT = os.getenv("NARRATION_CLIENT", "openai")
+NARRATION_MODEL = os.getenv("NARRATION_MODEL", "gpt-4o")
+NARRATION_CACHE_TTL_S = int(os.getenv("NARRATION_CACHE_TTL_S", str(90 * 24 * 3600)))
+NARRATION_CACHE_PREFIX = "narration:"
+# Bump whenever the instructions or schema change so cached narrations are not reused.
+PROMPT_VERSION = "1"
+
+INSTRUCTIONS = (
+    "You are a calm, practical chess coach. "
+    "Use ONLY the provided headers and moment_cards. "
+    "Do not invent moves, evaluations, or tactics not implied by the cards. "
+    "Write in clear, human language. "
+    "For each turning point: explain what went wrong/right, why it mattered, and one actionable rule-of-thumb. "
+    "Keep it concise but helpful."
+)
+
+_client = None
+
+def _openai():
+    # Created on first use so importing this module needs neither an API key nor network.
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
 
 REPORT_SCHEMA = {
   "name": "chess_coach_report",
@@ -45,21 +73,20 @@ REPORT_SCHEMA = {
   }
 }
 
-def narrate(headers: dict, moment_cards: list[dict]) -> dict:
-    instructions = (
-        "You are a calm, practical chess coach. "
-        "Use ONLY the provided headers and moment_cards. "
-        "Do not invent moves, evaluations, or tactics not implied by the cards. "
-        "Write in clear, human language. "
-        "For each turning point: explain what went wrong/right, why it mattered, and one actionable rule-of-thumb. "
-        "Keep it concise but helpful."
+def narration_key(headers: dict, moment_cards: list[dict]) -> str:
+    payload = json.dumps(
+        {"headers": headers, "moment_cards": moment_cards, "prompt": PROMPT_VERSION,
+         "client": NARRATION_CLIENT, "model": NARRATION_MODEL},
+        sort_keys=True, separators=(",", ":"), default=str,
     )
+    return hashlib.sha256(payload.encode()).hexdigest()
 
+def _narrate_openai(headers: dict, moment_cards: list[dict]) -> dict:
     payload = {"headers": headers, "moment_cards": moment_cards}
 
-    resp = client.responses.create(
-        model="gpt-4o",
-        instructions=instructions,
+    resp = _openai().responses.create(
+        model=NARRATION_MODEL,
+        instructions=INSTRUCTIONS,
         input=[{"role": "user", "content": json.dumps(payload)}],
         response_format={
             "type": "json_schema",
@@ -75,3 +102,54 @@ def narrate(headers: dict, moment_cards: list[dict]) -> dict:
         # very defensive fallback
         text = json.dumps({"summary":"(no output)","turning_points":[],"themes":[],"training_plan":[]})
     return json.loads(text)
+
+def _narrate_stub(headers: dict, moment_cards: list[dict]) -> dict:
+    """Schema-shaped report built only from the cards; no network."""
+    white, black = headers.get("White", "White"), headers.get("Black", "Black")
+    turning_points = []
+    for c in moment_cards:
+        before, after = c.get("eval_before_cp"), c.get("eval_after_played_cp")
+        swing = f" (eval {before} -> {after} cp)" if before is not None and after is not None else ""
+        turning_points.append({
+            "ply": c["ply"],
+            "title": f"Ply {c['ply']}: {c['san_played']}",
+            "what_happened": f"{c['side_to_move']} played {c['san_played']}{swing}.",
+            "why_it_matters": f"The engine preferred {c['san_best']}.",
+            "try_this_next_time": "Check forcing moves for both sides before committing.",
+            "pv_in_words": " ".join(m["san"] for m in c.get("pv_best") or []),
+        })
+    return {
+        "summary": f"{white} vs {black}: {len(moment_cards)} turning points.",
+        "turning_points": turning_points,
+        "themes": [],
+        "training_plan": [],
+    }
+
+def _cache_get(key: str) -> Optional[dict]:
+    from app.tasks import get_redis
+    try:
+        raw = get_redis().get(NARRATION_CACHE_PREFIX + key)
+    except Exception as e:
+        logger.warning("narration cache unavailable: %s", e)
+        return None
+    return json.loads(raw) if raw else None
+
+def _cache_put(key: str, report: dict) -> None:
+    from app.tasks import get_redis
+    try:
+        get_redis().set(NARRATION_CACHE_PREFIX + key, json.dumps(report), ex=NARRATION_CACHE_TTL_S or None)
+    except Exception as e:
+        logger.warning("narration cache unavailable: %s", e)
+
+def narrate(headers: dict, moment_cards: list[dict]) -> dict:
+    """Coach report for a game's moment cards. Identical inputs (same prompt version) are narrated once."""
+    key = narration_key(headers, moment_cards)
+    cached = _cache_get(key)
+    CACHE_LOOKUPS.labels("narration", "miss" if cached is None else "hit").inc()
+    if cached is not None:
+        return cached
+    fn = _narrate_stub if NARRATION_CLIENT == "stub" else _narrate_openai
+    with span("llm_call"):
+        report = fn(headers, moment_cards)
+    _cache_put(key, report)
+    return report
@@ -1,8 +1,48 @@
 import chess.pgn
 import io
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+from app.analysis.engine import score_to_white_cp
 
 def parse_pgn(pgn_text: str) -> chess.pgn.Game:
     game = chess.pgn.read_game(io.StringIO(pgn_text))
     if game is None:
         raise ValueError("Could not parse PGN.")
     return game
+
+def embedded_evals(game: chess.pgn.Game) -> List[Optional[Tuple[int, Optional[int]]]]:
+    """Per ply (0 = start position) the `[%eval ...]` comment of the move that led there, as
+    (white-relative cp, depth or None), or None where the move carries no eval."""
+    out: List[Optional[Tuple[int, Optional[int]]]] = [None]
+    for node in game.mainline():
+        pov = node.eval()
+        cp = score_to_white_cp(pov) if pov is not None else None
+        out.append((cp, node.eval_depth()) if cp is not None else None)
+    return out
+
+_TAG_LINE = re.compile(r'^\[[A-Za-z0-9_]+\s+"')
+
+def iter_pgn_texts(lines: Iterable[str]) -> Iterator[str]:
+    """Split a multi-game PGN stream into the raw text of each game, one at a time.
+
+    A game ends where the next tag section starts after some movetext. Only the
+    current game is held in memory, and the raw text is kept (not re-exported)
+    so `pgn_hash` matches a single-game upload of the same game.
+    """
+    buf: list[str] = []
+    in_moves = False
+    for line in lines:
+        stripped = line.strip()
+        is_tag = bool(_TAG_LINE.match(stripped))
+        if is_tag and in_moves:
+            text = "".join(buf).strip()
+            if text:
+                yield text
+            buf = []
+            in_moves = False
+        elif stripped and not is_tag and not stripped.startswith("%"):
+            in_moves = True
+        buf.append(line)
+    text = "".join(buf).strip()
+    if text:
+        yield text
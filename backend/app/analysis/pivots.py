@@ -1,121 +1,598 @@
-
-
-from typing import Optional, List
+from typing import Callable, Dict, Optional, List, Tuple
 import chess
 import chess.engine
 import chess.pgn
-import io
 import logging
+import threading
 import time
 from app.schemas import PVMove, CandidateLine, PivotMoment
-from app.analysis.engine import analyze_multipv, open_engine, score_to_white_cp
+from app.analysis.engine import analyse, analyze_multipv, pv_moves, score_to_white_cp
+from app.analysis.eval_cache import get_eval_cache
+from app.analysis.engine_pool import EnginePool, map_engines
+from app.analysis.resolvers import Resolvers, get_resolvers
+from app.analysis.pgn import embedded_evals
+from app.metrics import span
+
+# Per-ply search time in seconds; two-pass mode scales it per position (see _ply_budget).
+BASE_TIME_S = 0.25
+# Plies treated as (likely) opening theory when the shallow eval is near level.
+BOOK_PLIES = 10
+# Moves of history kept with each position handed to the engine.
+REPETITION_WINDOW = 8
+# Depth recorded for book/tablebase positions, so no later pass re-searches them.
+RESOLVED_DEPTH = 255
+# Moves kept per line on the cards.
+PV_LEN = 4
+# Anytime mode: depth of the first full scan, depth added per refinement round, and the
+# factor by which a round is expected to cost more than the one before it.
+ANYTIME_START_DEPTH = 8
+ANYTIME_DEPTH_STEP = 2
+ANYTIME_GROWTH = 3.0
+
+# progress(stage, done, total, pivot=None); stages: "scan", "deep", "pivots", "refine"
+ProgressFn = Callable[..., None]
+
+
+class _Counter:
+    """Thread-safe done-counter that reports each step to a progress callback."""
+
+    def __init__(self, progress: Optional[ProgressFn], stage: str, total: int):
+        self.progress, self.stage, self.total = progress, stage, total
+        self.done = 0
+        self._lock = threading.Lock()
+
+    def step(self, **extra) -> None:
+        if self.progress is None:
+            return
+        with self._lock:
+            self.done += 1
+            done = self.done
+        self.progress(self.stage, done, self.total, **extra)
+
+
+class PlyRecord:
+    """Scan result for the position after `ply` half-moves (ply 0 = start position).
+
+    Holds only strings and ints so a long game stays a few hundred bytes per ply;
+    boards are rebuilt from `fen` on demand.
+    """
+    __slots__ = ("fen", "move", "capture", "score", "best", "pv", "depth", "source")
+
+    def __init__(self, fen: str, move: Optional[str] = None, capture: bool = False):
+        self.fen = fen
+        self.move = move  # uci of the move that led here
+        self.capture = capture
+        self.score: Optional[int] = None  # white-relative cp
+        self.best: Optional[str] = None
+        self.pv: Tuple[str, ...] = ()
+        self.depth = 0
+        self.source = "engine"  # engine | book | tablebase | embedded
+
+
+def _records(game: chess.pgn.Game) -> List[PlyRecord]:
+    board = game.board()
+    records = [PlyRecord(board.fen())]
+    for mv in game.mainline_moves():
+        capture = board.is_capture(mv)
+        board.push(mv)
+        records.append(PlyRecord(board.fen(), mv.uci(), capture))
+    return records
+
+
+def _board(records: List[PlyRecord], ply: int) -> chess.Board:
+    """Position after `ply` half-moves, with a short move stack so the engine still sees repetitions."""
+    start = max(0, ply - REPETITION_WINDOW)
+    board = chess.Board(records[start].fen)
+    for k in range(start + 1, ply + 1):
+        board.push_uci(records[k].move)
+    return board
+
+
+def _search(engine: chess.engine.SimpleEngine, board: chess.Board, depth: int, time_limit: Optional[float]):
+    """(white cp, PV, depth reached): a search stopped by its time limit reports less than `depth`."""
+    info = analyse(engine, board, depth, multipv=1, time_limit=time_limit)[0]
+    pv = tuple(m.uci() for m in info.get("pv") or [])
+    score = score_to_white_cp(info["score"]) if "score" in info else None
+    # mate or stalemate on the board is exact, whatever depth the engine reports
+    reached = info.get("depth", depth) if any(board.legal_moves) else RESOLVED_DEPTH
+    return score, pv, reached
+
+
+def _scan(engine: chess.engine.SimpleEngine, records: List[PlyRecord], plies: List[int], depth: int,
+          budgets: List[Optional[float]], pool: Optional[EnginePool], parallelism: int,
+          progress: Optional[ProgressFn] = None, stage: str = "scan") -> None:
+    """Search the given plies and store score/best/PV on their records."""
+    counter = _Counter(progress, stage, len(plies))
+
+    def search(eng: chess.engine.SimpleEngine, item: Tuple[int, Optional[float]]):
+        result = _search(eng, _board(records, item[0]), depth, item[1])
+        counter.step()
+        return result
+
+    results = map_engines(engine, list(zip(plies, budgets)), search, pool=pool, parallelism=parallelism)
+    for j, (score, pv, reached) in zip(plies, results):
+        rec = records[j]
+        rec.score, rec.pv, rec.depth = score, pv, reached
+        rec.best = pv[0] if pv else None
+
+
+def _resolve(records: List[PlyRecord], resolvers: Resolvers, pv_len: int) -> List[int]:
+    """Fill book and tablebase positions without searching; returns the plies left for the engine."""
+    if resolvers.book is None and resolvers.tablebase is None:
+        return list(range(len(records)))
+    rest = []
+    for j, rec in enumerate(records):
+        board = chess.Board(rec.fen)
+        played = chess.Move.from_uci(records[j+1].move) if j + 1 < len(records) else None
+        hit = resolvers.book_line(board, played)
+        source = "book"
+        if hit is None:
+            hit = resolvers.tablebase_line(board, pv_len)
+            source = "tablebase"
+        if hit is None:
+            rest.append(j)
+            continue
+        rec.score, rec.pv = hit
+        rec.best = rec.pv[0] if rec.pv else None
+        rec.depth, rec.source = RESOLVED_DEPTH, source
+    return rest
+
+
+def _apply_embedded(game: chess.pgn.Game, records: List[PlyRecord], plies: List[int]) -> List[int]:
+    """Fill the given plies from the PGN's [%eval] comments; returns the plies that had one."""
+    evals = embedded_evals(game)
+    filled = []
+    for j in plies:
+        if evals[j] is None:
+            continue
+        rec = records[j]
+        rec.score, depth = evals[j]
+        rec.depth, rec.source = depth or 0, "embedded"
+        filled.append(j)
+    return filled
+
+
+def _backfill_book(records: List[PlyRecord]) -> None:
+    # A book move keeps the eval where theory leads, so book positions take the score of
+    # the first position after the game leaves the book and never register a swing.
+    for j in range(len(records) - 2, -1, -1):
+        if records[j].source == "book":
+            records[j].score = records[j+1].score
+
+
+def _curve(records: List[PlyRecord], depth: int, mode: str, prescan_depth: Optional[int],
+           pre_threshold: Optional[int]) -> dict:
+    return {
+        "depth": depth, "mode": mode, "prescan_depth": prescan_depth, "pre_threshold": pre_threshold,
+        "fen": records[0].fen,
+        "moves": [r.move for r in records[1:]],
+        "scores": [r.score for r in records],
+        "depths": [r.depth for r in records],
+        "sources": [r.source for r in records],
+        "pvs": [r.pv for r in records],
+    }
+
+
+def _apply_curve(records: List[PlyRecord], curve: dict) -> None:
+    if curve["moves"] != [r.move for r in records[1:]]:
+        raise ValueError("eval curve belongs to a different game")
+    for rec, score, depth, source, pv in zip(records, curve["scores"], curve["depths"], curve["sources"], curve["pvs"]):
+        rec.score, rec.depth, rec.source, rec.pv = score, depth, source, tuple(pv)
+        rec.best = rec.pv[0] if rec.pv else None
+
+
+def _swings(evals: List[Optional[int]], threshold_cp: int, min_cross_cp: int = 0) -> List[Tuple[int, int]]:
+    """(ply, delta) for every ply whose eval swing crosses the threshold or flips the sign
+    (sign flips only count once the swing is at least `min_cross_cp`)."""
+    out = []
+    for i in range(1, len(evals)):
+        if evals[i] is None or evals[i-1] is None:
+            continue
+        delta = evals[i] - evals[i-1]
+        cross = (evals[i] >= 0 > evals[i-1]) or (evals[i] <= 0 < evals[i-1])
+        if abs(delta) >= threshold_cp or (cross and abs(delta) >= min_cross_cp):
+            out.append((i, delta))
+    return out
+
+
+def _ply_budget(board: chess.Board, ply: int, records: List[PlyRecord], shallow_swing: int, threshold_cp: int) -> float:
+    """Deep-search time for the position after `ply` half-moves."""
+    if board.legal_moves.count() <= 1:
+        return BASE_TIME_S * 0.25  # forced reply
+    rec = records[ply]
+    if rec.capture and ply >= 2 and records[ply-1].capture and rec.move[2:4] == records[ply-1].move[2:4]:
+        return BASE_TIME_S * 0.5  # recapture
+    if rec.capture or board.is_check() or abs(shallow_swing) >= threshold_cp:
+        return BASE_TIME_S * 2  # tactical / volatile
+    if ply <= BOOK_PLIES and rec.score is not None and abs(rec.score) < 50:
+        return BASE_TIME_S * 0.5  # quiet opening
+    return BASE_TIME_S
+
+
+def _curve_candidates(records: List[PlyRecord], curve: dict, threshold_cp: int) -> List[Tuple[int, int]]:
+    # Same rule as the scan that built the curve: in a two-pass curve both sides of a swing need
+    # a deep-pass (or book/tablebase) eval. Depths are the ones reached, so a deep search cut
+    # short by its time limit is told apart from the sweep by exceeding the sweep depth.
+    swings = _swings([r.score for r in records], threshold_cp)
+    if curve["mode"] != "two_pass":
+        return swings
+    deep_set = {j for j, r in enumerate(records) if r.depth > curve["prescan_depth"]}
+    return [(i, d) for i, d in swings if i in deep_set and i-1 in deep_set]
+
+
+def _select(candidates: List[Tuple[int, int]], max_pivots: int, min_ply_gap: int) -> List[Tuple[int, int]]:
+    """Largest swings first, keeping at least `min_ply_gap` plies between picks."""
+    selected: List[Tuple[int, int]] = []
+    for i, delta in sorted(candidates, key=lambda c: abs(c[1]), reverse=True):
+        if len(selected) >= max_pivots:
+            break
+        if all(abs(i - j) >= min_ply_gap for j, _ in selected):
+            selected.append((i, delta))
+    return selected
+
+
+def _build_pivot(
+    engine: chess.engine.SimpleEngine,
+    records: List[PlyRecord],
+    i: int,
+    depth: int,
+    multipv: int,
+    pv_len: int,
+) -> PivotMoment:
+    logger = logging.getLogger(__name__)
+    board = _board(records, i-1)
+    before, after = records[i-1], records[i]
+    played_move = chess.Move.from_uci(after.move)
+    san_played = board.san(played_move)
+    uci_played = after.move
+    if (multipv <= 1 or before.source == "tablebase") and before.depth >= depth and before.pv:
+        # The scan already searched this position deeply enough; reuse its line.
+        pv_best = pv_moves(board, [chess.Move.from_uci(u) for u in before.pv[:pv_len]])
+        uci_best, eval_after_best = before.best, before.score
+        candidates_list = [CandidateLine(uci=uci_best, san=pv_best[0].san, eval_cp=eval_after_best, pv=pv_best)] if pv_best else []
+    else:
+        logger.info(f"detect_pivots: analyzing ply={i}")
+        pv_best, candidates_list, uci_best, eval_after_best = analyze_multipv(
+            board, engine, depth=depth, multipv=multipv, pv_len=pv_len, time_limit=BASE_TIME_S)
+    board_played = board.copy()
+    board_played.push(played_move)
+    # The scan's line for the position after the played move is the played continuation;
+    # an eval taken from a PGN comment has none, so that position is searched here.
+    after_pv = after.pv
+    if not after_pv and after.source == "embedded":
+        _, after_pv, _ = _search(engine, board_played, depth, BASE_TIME_S)
+    pv_played: List[PVMove] = pv_moves(board_played, [chess.Move.from_uci(u) for u in after_pv[:pv_len]])
+    candidates_played: List[CandidateLine] = []
+    # Fallback for uci_best/san_best
+    if not uci_best:
+        uci_best = uci_played
+        pv_played, candidates_played, _, _ = analyze_multipv(
+            board_played, engine, depth=depth, multipv=multipv, pv_len=pv_len, time_limit=BASE_TIME_S)
+    san_best = board.san(chess.Move.from_uci(uci_best)) if uci_best else None
+    if not san_best:
+        san_best = san_played
+    return PivotMoment(
+        ply=i,
+        side_to_move="White" if board.turn else "Black",
+        fen_before=board.fen(),
+        uci_played=uci_played or None,
+        san_played=san_played or None,
+        uci_best=uci_best or "",
+        san_best=san_best or "",
+        eval_before_cp=before.score,
+        eval_after_played_cp=after.score,
+        eval_after_best_cp=eval_after_best,
+        source_before=before.source,
+        source_after=after.source,
+        pv_best=pv_best if pv_best is not None else [],
+        candidates=[c for c in candidates_list if len(c.pv) >= 4] if candidates_list is not None else [],
+        why_bad=None,
+        what_instead=None,
+        why_instead=None,
+        remember=None,
+        pv_played=pv_played,
+        candidates_played=candidates_played,
+    )
+
 
 def detect_pivots(
-    pgn_text: str,
+    game: chess.pgn.Game,
+    engine: chess.engine.SimpleEngine,
     depth: int,
     max_pivots: int,
-    threshold_cp: int,
+    swing_threshold_cp: int,
     min_ply_gap: int,
     multipv: int = 1,
-    pv_len: int = 4
+    pv_len: int = PV_LEN,
+    mode: str = "full",
+    prescan_depth: int = 8,
+    prescan_ratio: float = 0.5,
+    stats: Optional[dict] = None,
+    pool: Optional[EnginePool] = None,
+    parallelism: int = 1,
+    progress: Optional[ProgressFn] = None,
+    curve: Optional[dict] = None,
+    curve_out: Optional[dict] = None,
+    known_cards: Optional[Dict[int, dict]] = None,
+    embedded: str = "off",
 ) -> List[PivotMoment]:
+    """Scan the mainline with one (pooled, warm) engine and return the largest eval swings.
+
+    The scan keeps a PlyRecord (FEN, score, best move, PV) per ply; pivot
+    candidates are selected from those records first and only the selected
+    plies get a multipv search, on the same engine so it starts from the hash
+    built during the scan.
+
+    mode="two_pass" first sweeps every ply at `prescan_depth`, then searches at
+    full depth only the plies whose shallow swing reaches
+    `prescan_ratio * swing_threshold_cp` (plus their neighbours), with a per-ply
+    time budget. Timings and the estimated saving are written into `stats`.
+
+    With a `pool` and parallelism > 1, ply evaluations and per-pivot searches
+    are spread over up to that many engines borrowed from the pool.
+
+    Positions covered by the opening book (when the game's move is a book move)
+    or by Syzygy tables are resolved before any search and tagged on the cards
+    via source_before/source_after.
+
+    `progress` is called after every searched ply and every finished pivot
+    (the pivot card is passed along so clients can show it early).
+
+    A stored `curve` (see analysis/curve.py) replaces the scan entirely, so only
+    selection and the per-pivot searches run; `known_cards` (ply -> card built
+    from the same curve with the same multipv) skips those searches too.
+    Otherwise the scan's curve is written into `curve_out` when given.
+
+    embedded="trust" takes the evals of plies the PGN annotates with [%eval] comments as
+    they are and searches only the other plies; "verify" also re-searches, at full depth,
+    both sides of every swing the comments show (at the two-pass threshold), and only
+    those verified swings can become pivots. Games without such comments scan as usual.
+    """
     logger = logging.getLogger(__name__)
     t0 = time.time()
-    game = chess.pgn.read_game(io.StringIO(pgn_text))
-    logger.info(f"detect_pivots: moves={len(list(game.mainline_moves()))}")
+    stats = stats if stats is not None else {}
+    timings = stats.setdefault("timings", {})
     if game is None:
         logger.info("detect_pivots: game is None")
         return []
-    board = game.board()
-    moves = []
-    evals = []
-    logger.info(f"detect_pivots: opening engine {time.time()-t0:.3f}s")
-    with open_engine() as engine:
-        # Initial eval
-        info0 = engine.analyse(board, chess.engine.Limit(depth=depth, time=0.25), multipv=1)
-        if isinstance(info0, list):
-            info0 = info0[0]
-        evals.append(score_to_white_cp(info0["score"]))
-        node = game
-        while node.variations:
-            node = node.variation(0)
-            mv = node.move
-            moves.append(mv)
-            board.push(mv)
-            info = engine.analyse(board, chess.engine.Limit(depth=depth, time=0.25), multipv=1)
-            if isinstance(info, list):
-                info = info[0]
-            evals.append(score_to_white_cp(info["score"]))
-    # Find candidate pivots
-    candidates = []
-    for i in range(1, len(evals)):
-        if evals[i] is None or evals[i-1] is None:
-            continue
-        delta = evals[i] - evals[i-1]
-        cross = (evals[i] >= 0 > evals[i-1]) or (evals[i] <= 0 < evals[i-1])
-        if abs(delta) >= threshold_cp or cross:
-            candidates.append((i, delta))
-    pivots: List[PivotMoment] = []
-    for idx, (i, delta) in enumerate(candidates):
-        board = game.board()
-        node = game
-        for k in range(i-1):
-            node = node.variation(0)
-            board.push(node.move)
-        played_move = moves[i-1]
-        san_played = board.san(played_move)
-        uci_played = played_move.uci()
-        fen_before = board.fen()
-        logger.info(f"detect_pivots: analyzing ply={i} idx={idx}")
-        with open_engine() as engine:
-            pv_best, candidates_list, uci_best, eval_after_best = analyze_multipv(
-                board, engine, depth=depth, multipv=multipv, pv_len=pv_len, time_limit=0.25)
-        logger.info(f"detect_pivots: analyze_multipv done ply={i} pv_best_len={len(pv_best)} candidates_len={len(candidates_list)}")
-        # Fallback for uci_best/san_best
-        if not uci_best:
-            uci_best = uci_played
-            # Generate played line: apply played move, then run multipv
-            board_played = board.copy()
-            board_played.push(played_move)
-            pv_played, candidates_played, _, _ = analyze_multipv(
-                board_played, engine, depth=depth, multipv=multipv, pv_len=pv_len, time_limit=0.25)
-        san_best = board.san(chess.Move.from_uci(uci_best)) if uci_best else None
-        if not san_best:
-            san_best = san_played
-        eval_before = evals[i-1]
-        eval_after_played = evals[i]
-        pivots.append(PivotMoment(
-            ply=i,
-            side_to_move="White" if board.turn else "Black",
-            fen_before=fen_before,
-            uci_played=uci_played or None,
-            san_played=san_played or None,
-            uci_best=uci_best or "",
-            san_best=san_best or "",
-            eval_before_cp=eval_before if eval_before is not None else None,
-            eval_after_played_cp=eval_after_played if eval_after_played is not None else None,
-            eval_after_best_cp=eval_after_best if eval_after_best is not None else None,
-            pv_best=pv_best if pv_best is not None else [],
-            candidates=[c for c in candidates_list if len(c.pv) >= 4] if candidates_list is not None else [],
-            why_bad=None,
-            what_instead=None,
-            why_instead=None,
-            remember=None
-            pv_played=pv_played,
-            candidates_played=candidates_played,
-        ))
-    pivots.sort(key=lambda c: abs((c.eval_after_played_cp or 0) - (c.eval_before_cp or 0)), reverse=True)
-    selected: List[PivotMoment] = []
-    for c in pivots:
-        if len(selected) >= max_pivots:
+    if curve is not None:
+        with span("curve", timings):
+            records = _records(game)
+            _apply_curve(records, curve)
+        candidates = _curve_candidates(records, curve, swing_threshold_cp)
+        stats.update({
+            "mode": "curve",
+            "curve_mode": curve["mode"],
+            "plies": len(records) - 1,
+            "book_plies": sum(r.source == "book" for r in records),
+            "tablebase_plies": sum(r.source == "tablebase" for r in records),
+        })
+    else:
+        with span("resolve", timings):
+            records = _records(game)
+            all_plies = _resolve(records, get_resolvers(), pv_len)
+        resolved = set(range(len(records))) - set(all_plies)
+        stats["book_plies"] = sum(r.source == "book" for r in records)
+        stats["tablebase_plies"] = sum(r.source == "tablebase" for r in records)
+        annotated = _apply_embedded(game, records, all_plies) if embedded != "off" else []
+        if annotated:
+            annotated_set = set(annotated)
+            rest = [j for j in all_plies if j not in annotated_set]
+            with span("scan", timings):
+                _scan(engine, records, rest, depth, [BASE_TIME_S] * len(rest), pool, parallelism, progress)
+                _backfill_book(records)
+            checked: List[int] = []
+            if embedded == "verify":
+                pre_threshold = int(swing_threshold_cp * prescan_ratio)
+                flagged = _swings([r.score for r in records], pre_threshold, min_cross_cp=pre_threshold // 2)
+                checked = sorted({j for i, _ in flagged for j in (i-1, i) if j in annotated_set})
+                with span("deep", timings):
+                    _scan(engine, records, checked, depth, [BASE_TIME_S] * len(checked), pool, parallelism,
+                          progress, stage="deep")
+                    for j in checked:
+                        records[j].source = "engine"
+                    _backfill_book(records)
+                trusted = set(rest) | set(checked) | resolved
+                candidates = [(i, d) for i, d in _swings([r.score for r in records], swing_threshold_cp)
+                              if i in trusted and i-1 in trusted]
+            else:
+                candidates = _swings([r.score for r in records], swing_threshold_cp)
+            stats.update({
+                "mode": "embedded",
+                "embedded": embedded,
+                "plies": len(records) - 1,
+                "embedded_plies": len(annotated),
+                "searched_positions": len(rest) + len(checked),
+                "scan_s": round(time.time() - t0, 3),
+            })
+            logger.info(f"detect_pivots: {len(annotated)} plies from [%eval] comments ({embedded}), "
+                        f"searched={len(rest) + len(checked)} time={time.time()-t0:.3f}s")
+        elif mode == "two_pass" and prescan_depth < depth:
+            with span("sweep", timings):
+                _scan(engine, records, all_plies, prescan_depth, [None] * len(all_plies), pool, parallelism, progress)
+                _backfill_book(records)
+            sweep_s = time.time() - t0
+            shallow = [r.score for r in records]
+            pre_threshold = int(swing_threshold_cp * prescan_ratio)
+            # Level positions flip sign on noise at low depth; don't send those to the deep pass.
+            flagged = _swings(shallow, pre_threshold, min_cross_cp=pre_threshold // 2)
+            deep_idx = sorted({j for i, _ in flagged for j in (i-2, i-1, i, i+1)
+                               if 0 <= j < len(records) and j not in resolved})
+            budgets = []
+            for j in deep_idx:
+                swing = (shallow[j] - shallow[j-1]) if j >= 1 and shallow[j] is not None and shallow[j-1] is not None else 0
+                budgets.append(_ply_budget(_board(records, j), j, records, swing, swing_threshold_cp))
+            t1 = time.time()
+            with span("deep", timings):
+                _scan(engine, records, deep_idx, depth, budgets, pool, parallelism, progress, stage="deep")
+                _backfill_book(records)
+            deep_s = time.time() - t1
+            # Only plies with deep (or book/tablebase) evals on both sides can be pivots.
+            deep_set = set(deep_idx) | resolved
+            candidates = [(i, d) for i, d in _swings([r.score for r in records], swing_threshold_cp)
+                          if i in deep_set and i-1 in deep_set]
+            per_position = deep_s / len(deep_idx) if deep_idx else None
+            est_full_s = per_position * len(all_plies) if per_position is not None else None
+            stats.update({
+                "mode": "two_pass",
+                "plies": len(records) - 1,
+                "prescan_depth": prescan_depth,
+                "sweep_s": round(sweep_s, 3),
+                "deep_positions": len(deep_idx),
+                "deep_s": round(deep_s, 3),
+                "est_full_scan_s": round(est_full_s, 3) if est_full_s is not None else None,
+                "saved_s": round(est_full_s - sweep_s - deep_s, 3) if est_full_s is not None else None,
+            })
+            logger.info(f"detect_pivots: two-pass sweep={sweep_s:.3f}s deep={deep_s:.3f}s "
+                        f"deep_positions={len(deep_idx)}/{len(records)}")
+        else:
+            with span("scan", timings):
+                _scan(engine, records, all_plies, depth, [BASE_TIME_S] * len(all_plies), pool, parallelism, progress)
+                _backfill_book(records)
+            candidates = _swings([r.score for r in records], swing_threshold_cp)
+            stats.update({"mode": "full", "plies": len(records) - 1, "scan_s": round(time.time() - t0, 3)})
+            logger.info(f"detect_pivots: scan done moves={len(records) - 1} time={time.time()-t0:.3f}s")
+        if curve_out is not None and annotated:
+            # the platform's evals, not ours: kept for the report's chart, never reused (curve.covers)
+            curve_out.update(_curve(records, depth, "embedded", None, None))
+        elif curve_out is not None:
+            two_pass = mode == "two_pass" and prescan_depth < depth
+            curve_out.update(_curve(records, depth, "two_pass" if two_pass else "full",
+                                    prescan_depth if two_pass else None,
+                                    int(swing_threshold_cp * prescan_ratio) if two_pass else None))
+    stats["parallelism"] = parallelism
+
+    selected = _select(candidates, max_pivots, min_ply_gap)
+    stats["candidates"] = len(candidates)
+    counter = _Counter(progress, "pivots", len(selected))
+
+    known_cards = known_cards or {}
+    stats["reused_pivots"] = sum(i in known_cards for i, _ in selected)
+
+    def build(eng: chess.engine.SimpleEngine, i: int) -> PivotMoment:
+        if i in known_cards:
+            pivot = PivotMoment.model_validate(known_cards[i])
+        else:
+            pivot = _build_pivot(eng, records, i, depth, multipv, pv_len)
+        counter.step(pivot=pivot.model_dump())
+        return pivot
+
+    t_pivots = time.time()
+    with span("pivots", timings):
+        pivots = map_engines(engine, [i for i, _ in selected], build, pool=pool, parallelism=parallelism)
+    stats["pivots_s"] = round(time.time() - t_pivots, 3)
+    cache = get_eval_cache()
+    stats["total_s"] = round(time.time() - t0, 3)
+    logger.info(f"detect_pivots: done pivots={len(pivots)} candidates={len(candidates)} "
+                f"total_time={time.time()-t0:.3f}s eval_cache={cache.stats() if cache else 'off'}")
+    return pivots
+
+
+def anytime_pivots(
+    game: chess.pgn.Game,
+    engine: chess.engine.SimpleEngine,
+    depth: int,
+    max_pivots: int,
+    swing_threshold_cp: int,
+    min_ply_gap: int,
+    budget_s: float,
+    on_version: Callable[[List[PivotMoment], int], None],
+    multipv: int = 1,
+    pv_len: int = PV_LEN,
+    prescan_ratio: float = 0.5,
+    stats: Optional[dict] = None,
+    pool: Optional[EnginePool] = None,
+    parallelism: int = 1,
+    progress: Optional[ProgressFn] = None,
+    curve_out: Optional[dict] = None,
+) -> List[PivotMoment]:
+    """detect_pivots under a wall-clock budget, handing every improved pivot set to
+    `on_version(pivots, effective_depth)` as soon as it exists.
+
+    Every ply is scanned at ANYTIME_START_DEPTH and the pivots found there form the first
+    version. Then, like the deep pass of two-pass mode, the plies around each shallow swing
+    are searched ANYTIME_DEPTH_STEP deeper per round and the pivots re-selected and rebuilt
+    at that depth, until `depth` is reached or the next round (estimated from the last one)
+    would not finish within `budget_s`. Returns the last version.
+    """
+    logger = logging.getLogger(__name__)
+    t0 = time.time()
+    stats = stats if stats is not None else {}
+    timings = stats.setdefault("timings", {})
+    if game is None:
+        logger.info("anytime_pivots: game is None")
+        return []
+    start = min(depth, ANYTIME_START_DEPTH)
+    with span("resolve", timings):
+        records = _records(game)
+        all_plies = _resolve(records, get_resolvers(), pv_len)
+    resolved = set(range(len(records))) - set(all_plies)
+    with span("scan", timings):
+        _scan(engine, records, all_plies, start, [None] * len(all_plies), pool, parallelism, progress)
+        _backfill_book(records)
+    per_position_s = (time.time() - t0) / max(1, len(all_plies))
+    pre_threshold = int(swing_threshold_cp * prescan_ratio)
+    flagged = _swings([r.score for r in records], pre_threshold, min_cross_cp=pre_threshold // 2)
+    focus = sorted({j for i, _ in flagged for j in (i-2, i-1, i, i+1) if 0 <= j < len(records) and j not in resolved})
+    deep_set = set(focus) | resolved
+
+    def version(candidates: List[Tuple[int, int]], d: int) -> Tuple[List[PivotMoment], float]:
+        t = time.time()
+        selected = _select(candidates, max_pivots, min_ply_gap)
+        with span("pivots", timings):
+            pivots = map_engines(engine, [i for i, _ in selected],
+                                 lambda eng, i: _build_pivot(eng, records, i, d, multipv, pv_len),
+                                 pool=pool, parallelism=parallelism)
+        on_version(pivots, d)
+        if progress is not None:
+            progress("refine", int(1000 * (time.time() - t0)), int(1000 * budget_s))
+        return pivots, time.time() - t
+
+    pivots, cards_s = version(_swings([r.score for r in records], swing_threshold_cp), start)
+    effective, rounds = start, 0
+    while effective < depth and focus:
+        expected = ANYTIME_GROWTH * (per_position_s * len(focus) + cards_s)
+        if time.time() + expected > t0 + budget_s:
             break
-        if all(abs(c.ply - s.ply) >= min_ply_gap for s in selected):
-            selected.append(c)
-    logger.info(f"detect_pivots: done pivots={len(selected)} total_time={time.time()-t0:.3f}s")
-    return selected
+        nxt = min(depth, effective + ANYTIME_DEPTH_STEP)
+        t = time.time()
+        with span("deep", timings):
+            _scan(engine, records, focus, nxt, [None] * len(focus), pool, parallelism)
+            _backfill_book(records)
+        per_position_s = (time.time() - t) / len(focus)
+        candidates = [(i, d) for i, d in _swings([r.score for r in records], swing_threshold_cp)
+                      if i in deep_set and i-1 in deep_set]
+        pivots, cards_s = version(candidates, nxt)
+        effective, rounds = nxt, rounds + 1
+
+    if curve_out is not None:
+        # a refined curve is a two-pass curve whose sweep ran at the start depth
+        curve_out.update(_curve(records, effective, "two_pass", start, pre_threshold) if rounds
+                         else _curve(records, start, "full", None, None))
+    stats.update({
+        "mode": "anytime",
+        "plies": len(records) - 1,
+        "book_plies": sum(r.source == "book" for r in records),
+        "tablebase_plies": sum(r.source == "tablebase" for r in records),
+        "budget_s": budget_s,
+        "start_depth": start,
+        "effective_depth": effective,
+        "rounds": rounds,
+        "deep_positions": len(focus),
+        "parallelism": parallelism,
+        "total_s": round(time.time() - t0, 3),
+    })
+    logger.info(f"anytime_pivots: depth {start}->{effective} in {rounds} rounds, budget={budget_s}s "
+                f"total_time={time.time()-t0:.3f}s")
+    return pivots
+
 
-def _san(board: chess.Board, move: chess.Move) -> str:
-    return board.san(move)
+def select_from_curve(game: chess.pgn.Game, curve: dict, max_pivots: int, swing_threshold_cp: int,
+                      min_ply_gap: int) -> List[int]:
+    """Plies detect_pivots would pick from a stored curve, without touching an engine."""
+    records = _records(game)
+    _apply_curve(records, curve)
+    return [i for i, _ in _select(_curve_candidates(records, curve, swing_threshold_cp), max_pivots, min_ply_gap)]
 
 
 def get_multipv_candidates(board: chess.Board, k=3, depth=12) -> List[CandidateLine]:
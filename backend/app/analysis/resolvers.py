@@ -0,0 +1,121 @@
+import os
+import logging
+import threading
+from typing import Optional, Tuple
+import chess
+import chess.polyglot
+import chess.syzygy
+
+logger = logging.getLogger(__name__)
+
+# Local lookup sources consulted before the engine; both are optional.
+BOOK_PATH = os.getenv("BOOK_PATH", "")  # Polyglot .bin
+SYZYGY_PATH = os.getenv("SYZYGY_PATH", "")  # directories with .rtbw/.rtbz files, os.pathsep-separated
+SYZYGY_MAX_PIECES = int(os.getenv("SYZYGY_MAX_PIECES", "6"))
+# Tablebase wins are scored like engine mates (see score_to_white_cp) so swings stay comparable.
+TB_WIN_CP = 100000
+
+# (white-relative cp or None, pv as uci strings)
+Resolved = Tuple[Optional[int], Tuple[str, ...]]
+
+
+class Resolvers:
+    """Opening book and Syzygy lookups that stand in for an engine search when they cover a position."""
+
+    def __init__(self, book_path: str = BOOK_PATH, syzygy_path: str = SYZYGY_PATH, max_pieces: int = SYZYGY_MAX_PIECES):
+        self.book: Optional[chess.polyglot.MemoryMappedReader] = None
+        self.tablebase: Optional[chess.syzygy.Tablebase] = None
+        self.max_pieces = max_pieces
+        self._tb_lock = threading.Lock()
+        if book_path:
+            try:
+                self.book = chess.polyglot.open_reader(book_path)
+            except OSError as e:
+                logger.warning("resolvers: cannot open book %s: %s", book_path, e)
+        if syzygy_path:
+            tb = chess.syzygy.Tablebase()
+            for d in syzygy_path.split(os.pathsep):
+                try:
+                    tb.add_directory(d)
+                except OSError as e:
+                    logger.warning("resolvers: cannot open tablebase dir %s: %s", d, e)
+            if tb.wdl:
+                self.tablebase = tb
+                self.max_pieces = min(max_pieces, max(len(name) - 1 for name in tb.wdl))
+
+    def book_line(self, board: chess.Board, played: Optional[chess.Move]) -> Optional[Resolved]:
+        """The book's preferred move if `played` is itself a book move here, else None.
+
+        Book positions carry no score of their own; detect_pivots fills it in from the
+        first position after the game leaves theory.
+        """
+        if self.book is None or played is None:
+            return None
+        moves = [e.move for e in self.book.find_all(board)]
+        if played not in moves:
+            return None
+        return None, (moves[0].uci(),)
+
+    def _covers(self, board: chess.Board) -> bool:
+        return (
+            self.tablebase is not None
+            and chess.popcount(board.occupied) <= self.max_pieces
+            and not board.castling_rights
+            and not board.is_game_over()
+        )
+
+    def _tb_best(self, board: chess.Board) -> Optional[chess.Move]:
+        """Best move by (WDL, then fastest win / slowest loss by DTZ)."""
+        best, best_key = None, None
+        for mv in board.legal_moves:
+            zeroing = board.is_zeroing(mv)
+            board.push(mv)
+            try:
+                if board.is_checkmate():
+                    key = (3, 0)
+                else:
+                    wdl = -self.tablebase.probe_wdl(board)
+                    dtz = 0 if zeroing else abs(self.tablebase.probe_dtz(board))
+                    key = (wdl, -dtz if wdl > 0 else dtz)
+            finally:
+                board.pop()
+            if best_key is None or key > best_key:
+                best, best_key = mv, key
+        return best
+
+    def tablebase_line(self, board: chess.Board, pv_len: int = 4) -> Optional[Resolved]:
+        if not self._covers(board):
+            return None
+        b = board.copy(stack=False)
+        try:
+            with self._tb_lock:
+                wdl = self.tablebase.probe_wdl(b)
+                pv = []
+                while len(pv) < pv_len and self._covers(b):
+                    mv = self._tb_best(b)
+                    if mv is None:
+                        break
+                    pv.append(mv.uci())
+                    b.push(mv)
+        except (KeyError, chess.syzygy.MissingTableError):
+            return None
+        cp = TB_WIN_CP if wdl == 2 else -TB_WIN_CP if wdl == -2 else 0  # cursed wins/blessed losses draw
+        return (cp if board.turn == chess.WHITE else -cp), tuple(pv)
+
+    def close(self) -> None:
+        if self.book is not None:
+            self.book.close()
+        if self.tablebase is not None:
+            self.tablebase.close()
+
+
+_resolvers: Optional[Resolvers] = None
+_resolvers_lock = threading.Lock()
+
+
+def get_resolvers() -> Resolvers:
+    global _resolvers
+    with _resolvers_lock:
+        if _resolvers is None:
+            _resolvers = Resolvers()
+        return _resolvers
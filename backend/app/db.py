@@ -1,12 +1,37 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dev.db")
+# Connection pool per process (ignored for SQLite). Async API handlers share one pool per
+# worker process, so it can be sized to what Postgres allows rather than to the thread pool.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "10"))
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+
+def _async_url(url: str) -> str:
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url  # postgresql+psycopg picks psycopg's async mode under create_async_engine
+
+
+def _pool_args(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {}
+    return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT_S}
+
+
+engine = create_engine(DATABASE_URL, pool_pre_ping=True, **_pool_args(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_DATABASE_URL = _async_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True, **_pool_args(ASYNC_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 class Base(DeclarativeBase):
     pass
 
@@ -16,3 +41,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,20 +1,58 @@
+import io
+import os
 import uuid
 import json
 import hashlib
 import logging
-from fastapi import FastAPI, Depends, HTTPException
+import tempfile
+import time
+import datetime as dt
+import chess.pgn
+from typing import Annotated, BinaryIO, Iterator
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .db import Base, engine, get_db
-from .models import Job, Report
-from .schemas import AnalyzeRequest, AnalyzeResponse, JobStatusResponse, ReportResponse, PivotMoment
-from .tasks import enqueue_analysis, get_redis
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from .db import Base, engine, async_engine, get_db, get_async_db, SessionLocal
+from .models import Job, Report, Batch, BatchItem, EvalCurve, PlayerPivot, PlayerSummary
+from .reuse import plan
+from .pgn_store import put_pgn
+from .schemas import (
+    AnalyzeRequest, AnalyzeSettings, AnalyzeResponse, JobStatusResponse, ReportResponse, PivotMoment,
+    BatchResponse, BatchStatusResponse, BatchGameReport, BatchReportPage, QueueStat,
+    EvalCurveResponse, PlayerAggregate, PlayerSummaryResponse, PlayerPivotRef,
+)
+from . import progress
+from .tasks import (
+    enqueue_analysis, get_async_redis, claim_inflight, release_inflight, estimate_cost, runs_anytime, job_timeout,
+    queue_stats, ANALYSIS_QUEUES, narration_queue,
+)
+from .metrics import HTTP_REQUEST_SECONDS, JOB_COST, REPORT_REUSE, register_queue_collector
 from .utils.hash import pgn_hash
-from app.analysis.explain import explain_pivots
-from app import report2
+from .analysis.pgn import parse_pgn, iter_pgn_texts, embedded_evals
+from .analysis.explain import explain_pivots, EXPLAIN_VERSION
+from .analysis.cards import report_cards
+from .analysis.curve import unpack_curve, curve_points
 
 app = FastAPI(title="Chess Pivot Coach API")
 
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(50 * 1024 * 1024)))
+# Distinct playable games per batch; repeats and unparsable games do not count.
+BATCH_MAX_GAMES = int(os.getenv("BATCH_MAX_GAMES", "2000"))
+# Uploads are spooled to disk past this size, so a large batch never sits in memory.
+BATCH_SPOOL_BYTES = 1024 * 1024
+# Fair-share key: this header when the caller (or a gateway) sets it, else the client address.
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Tenant-Id")
+# How long browsers/CDNs may reuse a finished report before revalidating with its ETag.
+REPORT_MAX_AGE_S = int(os.getenv("REPORT_MAX_AGE_S", "60"))
+# Responses at least this large are gzip-encoded for clients that accept it.
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+
 logger = logging.getLogger("chess_coach")
 logging.basicConfig(level=logging.INFO)
 
@@ -29,6 +67,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES)
+
+register_queue_collector([*ANALYSIS_QUEUES, narration_queue])
+
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    # label by route template, not raw path, so job ids don't explode the series count
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(request.method, route.path if route else "unmatched", response.status_code).observe(
+        time.perf_counter() - t0)
+    return response
 
 
 @app.on_event("startup")
@@ -36,105 +88,536 @@ def startup():
     Base.metadata.create_all(bind=engine)
 
 
-@app.post("/api/analyze", response_model=AnalyzeResponse)
-def analyze(req: AnalyzeRequest, db: Session = Depends(get_db)):
-    if len(req.pgn) > 1_000_000:
-        raise HTTPException(status_code=400, detail="PGN too large.")
+@app.on_event("shutdown")
+async def shutdown():
+    await async_engine.dispose()
+    await get_async_redis().aclose()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics for this API process (workers serve their own on WORKER_METRICS_PORT)."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def _tenant(request: Request) -> str:
+    return request.headers.get(TENANT_HEADER) or (request.client.host if request.client else "anonymous")
+
 
-    h = pgn_hash(req.pgn)
-    settings = req.model_dump(exclude={"pgn"})
+def _parse_or_none(pgn: str) -> chess.pgn.Game | None:
+    try:
+        return parse_pgn(pgn)
+    except ValueError:
+        return None  # the worker reports the parse error
+
+
+def _touch(db: Session, job_id: str) -> None:
+    """Keep a job that submissions are answered with out of the retention sweep."""
+    db.query(Job).filter(Job.id == job_id).update(
+        {Job.accessed_at: dt.datetime.utcnow(), Job.updated_at: Job.updated_at}, synchronize_session=False)
+    db.commit()
+
+
+def _submit_analysis(db: Session, pgn: str, req: AnalyzeSettings, tenant: str, game: chess.pgn.Game | None,
+                     bulk: bool = False) -> AnalyzeResponse:
+    """Return a cached report, attach to an identical in-flight job, or create and enqueue a new job."""
+    h = pgn_hash(pgn)
+    settings = req.model_dump(exclude={"pgn", "force_refresh"})
 
     settings_hash = hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
     cache_key = f"{h}:{settings_hash}"
 
-    cached = db.query(Report).filter(Report.pgn_hash == cache_key).first()
-    if cached:
-        try:
-            db_job_id = cached.job_id
-            rq_job_id = enqueue_analysis(db_job_id=db_job_id, pgn=req.pgn, settings=settings)
-            logger.info("enqueued db_job_id=%s rq_job_id=%s queue=analysis", db_job_id, rq_job_id)
-        except Exception as e:
-            logger.exception("Failed to enqueue (cache-hit) job %s: %s", cached.job_id, e)
-            raise HTTPException(status_code=500, detail=str(e))
-        return AnalyzeResponse(db_job_id=db_job_id, rq_job_id=rq_job_id)
+    if not req.force_refresh:
+        cached = (
+            db.query(Report)
+            .filter(Report.pgn_hash == cache_key, Report.final.is_(True))
+            .order_by(Report.created_at.desc())
+            .first()
+        )
+        if cached:
+            REPORT_REUSE.labels("exact").inc()
+            logger.info("cache hit key=%s db_job_id=%s", cache_key, cached.job_id)
+            _touch(db, cached.job_id)
+            return AnalyzeResponse(db_job_id=cached.job_id, cached=True)
 
     db_job_id = str(uuid.uuid4())
-    job = Job(id=db_job_id, status="queued", progress=0, pgn_hash=cache_key)
+    # An analysis of this game that searched at least as deep and wide may already cover the
+    # request; the job then only searches the pivots it lacks (see reuse.plan / run_analysis).
+    missing = None if req.force_refresh else plan(db, h, game, settings)["missing"]
+    reuse = "miss" if missing is None else "partial" if missing else "derived"
+    plies = game.end().ply() if game is not None else 0
+    annotated = 0
+    if missing is None and game is not None and req.embedded_evals != "off":
+        # annotated plies are not searched, but the pivots' positions still are
+        annotated = sum(e is not None for e in embedded_evals(game))
+        if annotated:
+            plies = min(plies, max(plies - annotated, 2 * req.max_pivots))
+    cost = estimate_cost(plies if missing is None else 2 * len(missing), settings,
+                         anytime=runs_anytime(settings, missing is not None, annotated > 0))
+
+    put_pgn(pgn)
+    job = Job(id=db_job_id, status="queued", progress=0, pgn_hash=cache_key, game_hash=h, cost=cost, tenant=tenant,
+              settings=settings)
     db.add(job)
     db.commit()
 
+    # Claimed only once the job row is committed, so a coalesced caller never gets an id
+    # that 404s; everything after the claim releases it on failure.
     try:
-        rq_job_id = enqueue_analysis(db_job_id=db_job_id, pgn=req.pgn, settings=settings)
-        logger.info("enqueued db_job_id=%s rq_job_id=%s queue=analysis", db_job_id, rq_job_id)
+        owner = claim_inflight(cache_key, db_job_id, force=req.force_refresh, timeout_s=job_timeout(cost, req.budget_s))
+    except Exception as e:
+        # Redis trouble only costs us coalescing; the enqueue below will surface real outages.
+        logger.warning("single-flight claim failed for key=%s: %s", cache_key, e)
+        owner = None
+    if owner:
+        REPORT_REUSE.labels("coalesced").inc()
+        logger.info("coalesced key=%s onto in-flight db_job_id=%s", cache_key, owner)
+        db.delete(job)
+        db.commit()
+        _touch(db, owner)
+        return AnalyzeResponse(db_job_id=owner, coalesced=True)
+
+    try:
+        REPORT_REUSE.labels(reuse).inc()
+        run_settings = {**settings, "force_refresh": True} if req.force_refresh else settings
+        rq_job_id, queue_name = enqueue_analysis(job_id=db_job_id, game_hash=h, settings=run_settings, cost=cost,
+                                                 tenant=tenant, bulk=bulk)
+        job.queue = queue_name
+        db.commit()
+        JOB_COST.labels(queue_name).observe(cost)
+        logger.info("enqueued db_job_id=%s rq_job_id=%s queue=%s cost=%s tenant=%s reuse=%s",
+                    db_job_id, rq_job_id, queue_name, cost, tenant, reuse)
     except Exception as e:
         logger.exception("Failed to enqueue job %s: %s", db_job_id, e)
+        try:
+            release_inflight(cache_key, db_job_id)
+        except Exception:
+            pass
+        db.rollback()
+        job.status = "error"
+        job.error_message = f"enqueue failed: {e}"
+        db.commit()
         raise HTTPException(status_code=500, detail=str(e))
 
-    return AnalyzeResponse(db_job_id=db_job_id, rq_job_id=rq_job_id)
+    return AnalyzeResponse(db_job_id=db_job_id, rq_job_id=rq_job_id, queue=queue_name, cost=cost,
+                           derived=reuse == "derived")
 
 
-@app.get("/api/analyze/{job_id}", response_model=JobStatusResponse)
-def analyze_status(job_id: str, db: Session = Depends(get_db)):
-    job = db.get(Job, job_id)
+@app.post("/api/analyze", response_model=AnalyzeResponse)
+def analyze(req: AnalyzeRequest, request: Request, db: Session = Depends(get_db)):
+    if len(req.pgn) > 1_000_000:
+        raise HTTPException(status_code=400, detail="PGN too large.")
+    return _submit_analysis(db, req.pgn, req, _tenant(request), _parse_or_none(req.pgn))
+
+
+@app.get("/api/queues", response_model=list[QueueStat])
+def queues():
+    """Queue depth, running jobs, oldest wait and waiting cost, for sizing worker counts."""
+    try:
+        return queue_stats()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"queue stats unavailable: {e}")
+
+
+async def _rq_id_hint(job_id: str, detail: str) -> None:
+    """404 with a clearer message when the caller passed an RQ job id instead of a DB id."""
+    try:
+        if await get_async_redis().exists(f"rq:job:{job_id}"):
+            raise HTTPException(status_code=404, detail=detail)
+    except HTTPException:
+        raise
+    except Exception:
+        pass  # ignore redis errors and fall through to the generic 404
+
+
+async def _job_or_404(db: AsyncSession, job_id: str) -> Job:
+    job = await db.get(Job, job_id)
     if not job:
-        # If the caller accidentally passed an RQ job id, detect and return
-        # a clearer 404 message to avoid ambiguity between RQ ids and DB ids.
-        try:
-            r = get_redis()
-            if r and r.exists(f"rq:job:{job_id}"):
-                raise HTTPException(
-                    status_code=404,
-                    detail="Job not found. You passed an RQ job id (rq_job_id); poll the DB id (db_job_id) returned by POST /api/analyze.",
-                )
-        except Exception:
-            # ignore redis errors and fallthrough to generic 404
-            pass
+        await _rq_id_hint(job_id, "Job not found. You passed an RQ job id (rq_job_id); poll the DB id (db_job_id) returned by POST /api/analyze.")
         raise HTTPException(status_code=404, detail="Job not found.")
-    return JobStatusResponse(job_id=job.id, status=job.status, progress=job.progress, error_message=job.error_message)
+    return job
 
 
-@app.get("/api/report/{job_id}", response_model=ReportResponse)
-def get_report(job_id: str, db: Session = Depends(get_db)):
-    report = db.get(Report, job_id)
+async def _narration_status(db: AsyncSession, job_id: str) -> str | None:
+    return await db.scalar(select(Report.narration_status).where(Report.job_id == job_id))
+
+
+@app.get("/api/analyze/{job_id}", response_model=JobStatusResponse)
+async def analyze_status(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    # While a job runs, answer from the worker's live state in Redis; otherwise from the
+    # read-through status cache, and only on a miss from the database.
+    live = await progress.aget_state(job_id)
+    if live and live.get("status") == "running":
+        return JobStatusResponse(job_id=job_id, status="running", progress=live.get("progress", 0),
+                                 stage=live.get("stage"), eta_s=live.get("eta_s"),
+                                 report_version=live.get("report_version"), effective_depth=live.get("effective_depth"))
+    cached = await progress.cached_status(job_id)
+    if cached:
+        return JobStatusResponse(**cached)
+    job = await _job_or_404(db, job_id)
+    out = JobStatusResponse(job_id=job.id, status=job.status, progress=job.progress, error_message=job.error_message,
+                            stats=job.stats, narration_status=await _narration_status(db, job_id))
+    await progress.cache_status(job_id, out.model_dump())
+    return out
+
+
+@app.get("/api/analyze/{job_id}/events")
+async def analyze_events(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Server-Sent Events stream of status, progress, ETA and pivots found so far."""
+    initial = None
+    if await progress.aget_state(job_id) is None:
+        job = await _job_or_404(db, job_id)
+        initial = {"job_id": job.id, "status": job.status, "progress": job.progress, "error_message": job.error_message,
+                   "narration_status": await _narration_status(db, job_id)}
+    await db.close()  # the stream can stay open for minutes; don't hold a pooled connection for it
+    return StreamingResponse(
+        progress.iter_events(job_id, initial),
+        media_type="text/event-stream",
+        # "identity" keeps GZipMiddleware out: it would buffer events inside the compressor
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Encoding": "identity"},
+    )
+
+
+async def _report_or_404(db: AsyncSession, job_id: str) -> Report:
+    report = await db.get(Report, job_id)
     if not report:
-        # Helpful message if caller passed an RQ id by mistake
-        try:
-            r = get_redis()
-            if r and r.exists(f"rq:job:{job_id}"):
-                raise HTTPException(
-                    status_code=404,
-                    detail="Report not found. You passed an RQ job id (rq_job_id); use the DB id (db_job_id) from POST /api/analyze to poll for report.",
-                )
-        except Exception:
-            pass
+        await _rq_id_hint(job_id, "Report not found. You passed an RQ job id (rq_job_id); use the DB id (db_job_id) from POST /api/analyze to poll for report.")
         raise HTTPException(status_code=404, detail="Report not found (job may still be running).")
-    # Ensure pivotal_moments are serialized as PivotMoment objects (not dicts)
+    return report
+
+
+def _etag(*parts) -> str:
+    # weak: the same tag covers the gzip and identity encodings of a response
+    return 'W/"' + hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()[:32] + '"'
+
+
+def _not_modified(request: Request, response: Response, etag: str, cache_control: str) -> Response | None:
+    """Set the validators on `response`, or return a 304 if the client already has this version."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    sent = request.headers.get("if-none-match")
+    if sent:
+        tags = [t.strip().removeprefix("W/") for t in sent.split(",")]
+        if "*" in tags or etag.removeprefix("W/") in tags:
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def _slim(model, headers) -> Response:
+    """Serialize without null fields (fen_after among them), for clients that replay PVs themselves."""
+    return Response(content=model.model_dump_json(exclude_none=True), media_type="application/json",
+                    headers=dict(headers))
+
+
+def _report_response(report: Report, slim: bool) -> ReportResponse:
     return ReportResponse(
-        job_id=job_id,
+        job_id=report.job_id,
         headers=report.headers,
-        pivotal_moments=[PivotMoment.model_validate(m) for m in report.moment_cards],
-        coach_report=report.llm_report
+        pivotal_moments=[PivotMoment.model_validate(m) for m in report_cards(report, fen_after=not slim)],
+        coach_report=report.llm_report,
+        narration_status=report.narration_status,
+        version=report.version,
+        effective_depth=report.effective_depth,
+        final=report.final,
     )
 
-# --- Plain-English report (computed on the fly) ---
-from app.db import SessionLocal
-from app.models import Report as ReportModel
 
-@app.get("/api/report2/{job_id}")
-def get_report2(job_id: str):
+@app.get("/api/report/{job_id}", response_model=ReportResponse)
+async def get_report(job_id: str, request: Request, response: Response, slim: bool = False,
+                     db: AsyncSession = Depends(get_async_db)):
+    report = await _report_or_404(db, job_id)
+    # A report changes only when it is re-analysed, refined or its narration lands (all bump updated_at).
+    etag = _etag(job_id, report.updated_at.isoformat(), report.version, report.narration_status, slim)
+    cache_control = "no-cache" if report.narration_status == "pending" else f"public, max-age={REPORT_MAX_AGE_S}, must-revalidate"
+    not_modified = _not_modified(request, response, etag, cache_control)
+    if not_modified:
+        return not_modified
+    # decoding the cards replays every line; keep that off the event loop
+    out = await run_in_threadpool(_report_response, report, slim)
+    return _slim(out, response.headers) if slim else out
+
+@app.get("/api/report/{job_id}/curve", response_model=EvalCurveResponse)
+async def get_curve(job_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """Per-ply eval curve the report's pivots were selected from, for eval charts."""
+    report = await _report_or_404(db, job_id)
+    if report.curve_id is None:
+        raise HTTPException(status_code=404, detail="No eval curve stored for this report.")
+    # curves are immutable once written
+    not_modified = _not_modified(request, response, _etag("curve", report.curve_id), "public, max-age=86400")
+    if not_modified:
+        return not_modified
+    curve = unpack_curve(await db.scalar(select(EvalCurve.data).where(EvalCurve.id == report.curve_id)))
+    return EvalCurveResponse(job_id=job_id, depth=curve["depth"], mode=curve["mode"], points=curve_points(curve))
+
+# --- Multi-game batches ---
+
+def _playable(text: str) -> chess.pgn.Game | None:
+    try:
+        game = parse_pgn(text)
+    except ValueError:
+        return None
+    return None if game.errors or game.next() is None else game
+
+
+def _pgn_texts(f: BinaryIO) -> Iterator[str]:
+    """One pass over the spooled upload, game by game, leaving it rewound and open."""
+    lines = io.TextIOWrapper(f, encoding="utf-8", errors="replace", newline="")
+    try:
+        yield from iter_pgn_texts(lines)
+    finally:
+        lines.detach()
+        f.seek(0)
+
+
+def _count_games(f: BinaryIO, limit: int) -> int:
+    """Games `_ingest_batch` would submit: distinct by pgn_hash and playable. Parsing is only
+    needed when the distinct count alone is over `limit`."""
+    seen = {pgn_hash(text) for text in _pgn_texts(f)}
+    if len(seen) <= limit:
+        return len(seen)
+    seen.clear()
+    count = 0
+    for text in _pgn_texts(f):
+        h = pgn_hash(text)
+        if h not in seen:
+            seen.add(h)
+            count += _playable(text) is not None
+    return count
+
+
+def _ingest_batch(f: BinaryIO, req: AnalyzeSettings, tenant: str) -> BatchResponse:
+    """Split the spooled upload game by game and fan each one out through `_submit_analysis`.
+
+    Oversized uploads are rejected before anything is stored. If submitting a game fails
+    partway, the games already submitted stay in the batch and the response says it was
+    truncated, so the client still gets a batch_id to follow them.
+    """
+    if _count_games(f, BATCH_MAX_GAMES) > BATCH_MAX_GAMES:
+        raise HTTPException(status_code=400, detail=f"Batch has more than {BATCH_MAX_GAMES} games.")
     db = SessionLocal()
     try:
-        r = db.query(ReportModel).filter(ReportModel.job_id == job_id).first()
-        if not r:
-            return {"detail": "Report not found (job may still be running)."}
-        headers = r.headers or {}
-        pivots = r.moment_cards or []
-        coach_report = explain_pivots(headers, pivots)
-        return {
-            "job_id": job_id,
-            "headers": headers,
-            "pivotal_moments": pivots,
-            "coach_report": coach_report,
-        }
+        batch = Batch(id=str(uuid.uuid4()), settings=req.model_dump())
+        db.add(batch)
+        db.commit()
+        counts = {"enqueued": 0, "cached": 0, "coalesced": 0}
+        seen: set[str] = set()
+        index = 0
+        truncated = False
+        for text in _pgn_texts(f):
+            h = pgn_hash(text)
+            if h in seen:
+                batch.duplicates += 1
+                continue
+            seen.add(h)
+            game = _playable(text)
+            if game is None:
+                batch.invalid += 1
+                continue
+            # batch games always go to the bulk lane, interleaved with other tenants' jobs
+            try:
+                resp = _submit_analysis(db, text, req, tenant, game, bulk=True)
+            except Exception:
+                db.rollback()
+                if not index:
+                    db.delete(batch)
+                    db.commit()
+                    raise
+                logger.exception("batch %s: stopped after %s games", batch.id, index)
+                truncated = True
+                break
+            counts["cached" if resp.cached else "coalesced" if resp.coalesced else "enqueued"] += 1
+            db.add(BatchItem(
+                batch_id=batch.id, game_index=index, job_id=resp.db_job_id,
+                white=game.headers.get("White"), black=game.headers.get("Black"), result=game.headers.get("Result"),
+            ))
+            index += 1
+            batch.total_games = index
+            db.commit()
+        db.commit()
+        logger.info("batch %s: games=%s %s duplicates=%s invalid=%s truncated=%s",
+                    batch.id, index, counts, batch.duplicates, batch.invalid, truncated)
+        return BatchResponse(batch_id=batch.id, total_games=index, duplicates=batch.duplicates,
+                             invalid=batch.invalid, truncated=truncated, **counts)
     finally:
         db.close()
+
+
+@app.post("/api/batch", response_model=BatchResponse)
+async def create_batch(request: Request, settings: Annotated[AnalyzeSettings, Query()]):
+    """Accept a multi-game PGN as a multipart upload (field `file`) or as the raw request body."""
+    spool = tempfile.SpooledTemporaryFile(max_size=BATCH_SPOOL_BYTES)
+    try:
+        size = 0
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Expected a PGN file in form field 'file'.")
+            while chunk := await upload.read(64 * 1024):
+                size += len(chunk)
+                if size > BATCH_MAX_BYTES:
+                    raise HTTPException(status_code=400, detail="Batch too large.")
+                spool.write(chunk)
+        else:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > BATCH_MAX_BYTES:
+                    raise HTTPException(status_code=400, detail="Batch too large.")
+                spool.write(chunk)
+        spool.seek(0)
+        return await run_in_threadpool(_ingest_batch, spool, settings, _tenant(request))
+    finally:
+        spool.close()
+
+
+@app.get("/api/batch/{batch_id}", response_model=BatchStatusResponse)
+async def batch_status(batch_id: str, db: AsyncSession = Depends(get_async_db)):
+    batch = await db.get(Batch, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    rows = (await db.execute(
+        select(Job.status, Job.progress)
+        .join(BatchItem, BatchItem.job_id == Job.id)
+        .where(BatchItem.batch_id == batch_id)
+    )).all()
+    status_counts: dict[str, int] = {}
+    for status, _ in rows:
+        status_counts[status] = status_counts.get(status, 0) + 1
+    progress = round(sum(p or 0 for _, p in rows) / len(rows)) if rows else 100
+    return BatchStatusResponse(batch_id=batch.id, total_games=batch.total_games, duplicates=batch.duplicates,
+                               invalid=batch.invalid, progress=progress, status_counts=status_counts)
+
+
+def _batch_games(rows, slim: bool) -> list[BatchGameReport]:
+    return [
+        BatchGameReport(
+            game_index=item.game_index,
+            job_id=job.id,
+            status=job.status,
+            headers=report.headers if report else {"White": item.white, "Black": item.black, "Result": item.result},
+            pivotal_moments=[PivotMoment.model_validate(m) for m in report_cards(report, fen_after=not slim)] if report else [],
+            coach_report=report.llm_report if report else None,
+            narration_status=report.narration_status if report else None,
+        )
+        for item, job, report in rows
+    ]
+
+
+@app.get("/api/batch/{batch_id}/reports", response_model=BatchReportPage)
+async def batch_reports(
+    batch_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    slim: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    batch = await db.get(Batch, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    rows = (await db.execute(
+        select(BatchItem, Job, Report)
+        .join(Job, BatchItem.job_id == Job.id)
+        .outerjoin(Report, Report.job_id == Job.id)
+        .where(BatchItem.batch_id == batch_id)
+        .order_by(BatchItem.game_index)
+        .offset(offset)
+        .limit(limit)
+    )).all()
+    games = await run_in_threadpool(_batch_games, rows, slim)
+    page = BatchReportPage(batch_id=batch_id, offset=offset, limit=limit, total_games=batch.total_games, games=games)
+    return _slim(page, {}) if slim else page
+
+
+# --- Plain-English report (stored with the report, rebuilt when the explain rules change) ---
+
+@app.get("/api/report2/{job_id}")
+async def get_report2(job_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    report = await _report_or_404(db, job_id)
+    etag = _etag(job_id, report.updated_at.isoformat(), EXPLAIN_VERSION)
+    not_modified = _not_modified(request, response, etag, f"public, max-age={REPORT_MAX_AGE_S}, must-revalidate")
+    if not_modified:
+        return not_modified
+    cards = await run_in_threadpool(report_cards, report)
+    plain = report.plain_report
+    if plain is None or report.plain_report_version != EXPLAIN_VERSION:
+        plain = await run_in_threadpool(explain_pivots, report.headers or {}, cards)
+        # stored for the next request, but the report itself did not change: keep updated_at
+        # (and with it the /api/report ETag) as it is
+        await db.execute(update(Report).where(Report.job_id == job_id).values(
+            plain_report=plain, plain_report_version=EXPLAIN_VERSION, updated_at=Report.updated_at))
+        await db.commit()
+    return {
+        "job_id": job_id,
+        "headers": report.headers or {},
+        "pivotal_moments": cards,
+        "coach_report": plain,
+    }
+
+
+# --- Player aggregates, served from the summaries players.py maintains per indexed game ---
+
+def _aggregate(row: PlayerSummary, key: str | None = None) -> PlayerAggregate:
+    return PlayerAggregate(
+        key=row.key if key is None else key, label=row.label, games=row.games, wins=row.wins, draws=row.draws,
+        losses=row.losses, loss_rate=round(row.losses / row.games, 3) if row.games else 0.0, pivots=row.pivots,
+        avg_swing_cp=round(row.swing_cp / row.pivots) if row.pivots else None,
+    )
+
+
+@app.get("/api/players", response_model=list[PlayerAggregate])
+async def players(prefix: str = "", limit: int = Query(50, ge=1, le=500), db: AsyncSession = Depends(get_async_db)):
+    q = select(PlayerSummary).where(PlayerSummary.dimension == "total")
+    if prefix:
+        q = q.where(PlayerSummary.player.startswith(prefix, autoescape=True))
+    rows = (await db.scalars(q.order_by(PlayerSummary.games.desc(), PlayerSummary.player).limit(limit))).all()
+    return [_aggregate(r, key=r.player) for r in rows]
+
+
+@app.get("/api/players/{player}/summary", response_model=PlayerSummaryResponse)
+async def player_summary(player: str, top: int = Query(10, ge=1, le=100), db: AsyncSession = Depends(get_async_db)):
+    rows = (await db.scalars(select(PlayerSummary).where(PlayerSummary.player == player))).all()
+    by_dim: dict[str, list[PlayerSummary]] = {}
+    for r in rows:
+        by_dim.setdefault(r.dimension, []).append(r)
+    if "total" not in by_dim:
+        raise HTTPException(status_code=404, detail="No analyzed games for this player.")
+
+    def ranked(dimension: str, key) -> list[PlayerAggregate]:
+        return [_aggregate(r) for r in sorted(by_dim.get(dimension, []), key=key)[:top]]
+
+    def most_pivots(r: PlayerSummary):
+        return -r.pivots, r.key
+
+    return PlayerSummaryResponse(
+        player=player,
+        total=_aggregate(by_dim["total"][0]),
+        by_color=ranked("color", lambda r: r.key),
+        openings=ranked("eco", lambda r: (-r.losses, -r.losses / max(r.games, 1), -r.games, r.key)),
+        phases=ranked("phase", most_pivots),
+        motifs=ranked("motif", most_pivots),
+        severities=ranked("severity", most_pivots),
+    )
+
+
+@app.get("/api/players/{player}/pivots", response_model=list[PlayerPivotRef])
+async def player_pivots(
+    player: str,
+    eco: str | None = None,
+    phase: str | None = None,
+    color: str | None = None,
+    motif: str | None = None,
+    severity: str | None = None,
+    min_swing_cp: int = 0,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """The indexed pivots behind a summary row, largest swings first; job_id + ply locate the card."""
+    q = select(PlayerPivot).where(PlayerPivot.player == player, PlayerPivot.swing_cp >= min_swing_cp)
+    for col, value in ((PlayerPivot.eco, eco), (PlayerPivot.phase, phase), (PlayerPivot.color, color),
+                       (PlayerPivot.motif, motif), (PlayerPivot.severity, severity)):
+        if value is not None:
+            q = q.where(col == value)
+    rows = (await db.scalars(q.order_by(PlayerPivot.swing_cp.desc(), PlayerPivot.id).offset(offset).limit(limit))).all()
+    return [PlayerPivotRef(job_id=r.job_id, ply=r.ply, color=r.color, eco=r.eco, phase=r.phase, swing_cp=r.swing_cp,
+                           severity=r.severity, motif=r.motif, result=r.result) for r in rows]
@@ -0,0 +1,119 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import REGISTRY, Collector
+
+logger = logging.getLogger(__name__)
+
+# Store the per-stage breakdown in Job.stats["timings"].
+JOB_TIMINGS = os.getenv("JOB_TIMINGS", "1") == "1"
+# Port for a worker's own /metrics (the API serves /metrics itself); 0 disables.
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9100"))
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STAGE_SECONDS = Histogram(
+    "chess_coach_stage_seconds", "Time spent per pipeline stage.", ["stage"], buckets=_LATENCY_BUCKETS)
+HTTP_REQUEST_SECONDS = Histogram(
+    "chess_coach_http_request_seconds", "API request latency.", ["method", "route", "status"], buckets=_LATENCY_BUCKETS)
+ENGINE_NODES = Counter("chess_coach_engine_nodes", "Nodes searched by the engine.")
+ENGINE_SEARCH_SECONDS = Counter("chess_coach_engine_search_seconds", "Wall time spent in engine searches.")
+ENGINE_SEARCHES = Counter("chess_coach_engine_searches", "Engine searches, by how they were answered.", ["source"])
+CACHE_LOOKUPS = Counter("chess_coach_cache_lookups", "Cache lookups by cache and result.", ["cache", "result"])
+REPORT_REUSE = Counter(
+    "chess_coach_report_reuse", "Analysis requests by how much earlier work served them "
+    "(exact, coalesced, derived without the engine, partial, miss).", ["result"])
+JOB_COST = Histogram(
+    "chess_coach_job_cost", "Estimated cost (plies x depth x multipv) of enqueued analysis jobs.", ["queue"],
+    buckets=(100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000))
+QUEUE_WAIT_SECONDS = Histogram(
+    "chess_coach_queue_wait_seconds", "Time a job waited in the queue before a worker started it.", ["queue"],
+    buckets=_LATENCY_BUCKETS)
+WORKER_BUSY = Gauge("chess_coach_worker_busy", "1 while this worker is running a job.", ["queue"])
+WORKER_BUSY_SECONDS = Counter(
+    "chess_coach_worker_busy_seconds", "Time spent running jobs; rate() of this is worker utilization.", ["queue"])
+
+
+@contextmanager
+def span(stage: str, timings: Optional[dict] = None) -> Iterator[None]:
+    """Time a block into the stage histogram and, if given, add the seconds to `timings[stage]`."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        STAGE_SECONDS.labels(stage).observe(dt)
+        if timings is not None and JOB_TIMINGS:
+            timings[stage] = round(timings.get(stage, 0.0) + dt, 4)
+
+
+def observe_search(info: dict, seconds: float) -> None:
+    ENGINE_SEARCHES.labels("engine").inc()
+    ENGINE_SEARCH_SECONDS.inc(seconds)
+    if info.get("nodes"):
+        ENGINE_NODES.inc(info["nodes"])
+
+
+@contextmanager
+def worker_job(queue: str, timings: Optional[dict] = None) -> Iterator[None]:
+    """Wrap an RQ job body: records how long it queued and how long the worker was busy."""
+    try:
+        from rq import get_current_job
+        job = get_current_job()
+    except Exception:
+        job = None
+    if job is not None and job.enqueued_at is not None:
+        # RQ stores naive UTC datetimes
+        wait = max(0.0, (job.started_at or job.enqueued_at).timestamp() - job.enqueued_at.timestamp())
+        QUEUE_WAIT_SECONDS.labels(job.origin or queue).observe(wait)
+        if timings is not None and JOB_TIMINGS:
+            timings[f"{queue}_wait"] = round(wait, 4)
+    label = job.origin if job is not None and job.origin else queue
+    WORKER_BUSY.labels(label).set(1)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        WORKER_BUSY_SECONDS.labels(label).inc(time.perf_counter() - t0)
+        WORKER_BUSY.labels(label).set(0)
+
+
+class QueueCollector(Collector):
+    """Queue depth and running jobs per RQ queue, read from Redis at scrape time."""
+
+    def __init__(self, queues):
+        self.queues = queues
+
+    @staticmethod
+    def _families() -> tuple[GaugeMetricFamily, GaugeMetricFamily]:
+        return (GaugeMetricFamily("chess_coach_queue_depth", "Jobs waiting per queue.", labels=["queue"]),
+                GaugeMetricFamily("chess_coach_queue_running", "Jobs being worked on per queue.", labels=["queue"]))
+
+    def describe(self):
+        # without this, registering the collector would call collect() and hit Redis at import time
+        return list(self._families())
+
+    def collect(self):
+        depth, running = self._families()
+        for q in self.queues:
+            try:
+                depth.add_metric([q.name], q.count)
+                running.add_metric([q.name], q.started_job_registry.count)
+            except Exception as e:
+                logger.warning("metrics: cannot read queue %s: %s", q.name, e)
+        yield depth
+        yield running
+
+
+def register_queue_collector(queues) -> None:
+    REGISTRY.register(QueueCollector(queues))
+
+
+def start_worker_metrics_server() -> None:
+    if WORKER_METRICS_PORT:
+        start_http_server(WORKER_METRICS_PORT)
+        logger.info("metrics: serving worker metrics on :%s", WORKER_METRICS_PORT)
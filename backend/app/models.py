@@ -1,5 +1,5 @@
 import datetime as dt
-from sqlalchemy import String, Integer, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import String, Integer, Boolean, DateTime, Text, JSON, LargeBinary, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .db import Base
 
@@ -11,9 +11,18 @@ class Job(Base):
     progress: Mapped[int] = mapped_column(Integer, default=0)
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
     pgn_hash: Mapped[str] = mapped_column(String, index=True)
+    game_hash: Mapped[str | None] = mapped_column(String, nullable=True, index=True)  # PgnBlob analyzed
+    stats: Mapped[dict | None] = mapped_column(JSON, nullable=True)  # analysis timings / savings
+    settings: Mapped[dict | None] = mapped_column(JSON, nullable=True)  # AnalyzeSettings the job ran with
+    cost: Mapped[int | None] = mapped_column(Integer, nullable=True)  # plies x depth x multipv
+    queue: Mapped[str | None] = mapped_column(String, nullable=True)
+    tenant: Mapped[str | None] = mapped_column(String, nullable=True, index=True)
 
     created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
     updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow)
+    # Last time a submission was answered with this job (created, cache hit or coalesced);
+    # retention sweeps by this.
+    accessed_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow, index=True)
 
     report = relationship("Report", back_populates="job", uselist=False)
 
@@ -24,9 +33,150 @@ class Report(Base):
     pgn_hash: Mapped[str] = mapped_column(String, index=True)
 
     headers: Mapped[dict] = mapped_column(JSON)
-    moment_cards: Mapped[list] = mapped_column(JSON)
-    llm_report: Mapped[dict] = mapped_column(JSON)
+    # Compact, compressed cards (see analysis/cards.py); moment_cards is only set on older rows.
+    cards_blob: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    moment_cards: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    llm_report: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Narration runs on its own queue after the engine work: pending|done|error
+    narration_status: Mapped[str] = mapped_column(String, default="pending", index=True)
+    narration_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Rule-based plain-English report (/api/report2), stale when its version != EXPLAIN_VERSION
+    plain_report: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    plain_report_version: Mapped[str | None] = mapped_column(String, nullable=True)
+    # The eval curve the pivots were selected from
+    curve_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("eval_curves.id"), nullable=True, index=True)
+    # Anytime jobs save a refined version after every round; only the last one is final.
+    version: Mapped[int] = mapped_column(Integer, default=1)
+    effective_depth: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    final: Mapped[bool] = mapped_column(Boolean, default=True)
 
     created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow)
 
     job = relationship("Job", back_populates="report")
+    curve = relationship("EvalCurve")
+
+class PgnBlob(Base):
+    """A game's normalized PGN, compressed and stored once per pgn_hash (see pgn_store.py)."""
+    __tablename__ = "pgns"
+
+    hash: Mapped[str] = mapped_column(String, primary_key=True)
+    data: Mapped[bytes] = mapped_column(LargeBinary)
+    size: Mapped[int] = mapped_column(Integer)  # uncompressed bytes
+
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow, index=True)
+
+class EvalCurve(Base):
+    """Per-ply evals of one game at one search depth (analysis/curve.py), shared by every
+    report whose settings differ only in how pivots are selected from it."""
+    __tablename__ = "eval_curves"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    game_hash: Mapped[str] = mapped_column(String, index=True)  # pgn_hash of the PGN alone
+    depth: Mapped[int] = mapped_column(Integer)
+    mode: Mapped[str] = mapped_column(String)  # full|two_pass|embedded
+    plies: Mapped[int] = mapped_column(Integer)
+    data: Mapped[bytes] = mapped_column(LargeBinary)
+
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+
+class AnalysisIndex(Base):
+    """Search parameters of every finished report, so a request can be served from any
+    analysis of the same game that searched at least as deep and as wide (see reuse.py)."""
+    __tablename__ = "analysis_index"
+    __table_args__ = (Index("ix_analysis_index_lookup", "game_hash", "depth", "multipv", "pv_len"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    game_hash: Mapped[str] = mapped_column(String)
+    depth: Mapped[int] = mapped_column(Integer)
+    multipv: Mapped[int] = mapped_column(Integer)
+    pv_len: Mapped[int] = mapped_column(Integer)
+    job_id: Mapped[str] = mapped_column(String, ForeignKey("jobs.id"), index=True)
+    curve_id: Mapped[int] = mapped_column(Integer, ForeignKey("eval_curves.id"), index=True)
+
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+
+class PlayerGame(Base):
+    """One analyzed game from one player's side (see players.py). Keyed by game, so
+    re-analyzing a game with other settings replaces its rows instead of adding more."""
+    __tablename__ = "player_games"
+    __table_args__ = (UniqueConstraint("player", "game_hash", "color"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    player: Mapped[str] = mapped_column(String, index=True)  # White/Black header
+    game_hash: Mapped[str] = mapped_column(String, index=True)
+    color: Mapped[str] = mapped_column(String)  # white|black
+    job_id: Mapped[str] = mapped_column(String, ForeignKey("jobs.id"), index=True)
+    eco: Mapped[str] = mapped_column(String)  # "?" when the PGN has no ECO tag
+    opening: Mapped[str | None] = mapped_column(String, nullable=True)
+    result: Mapped[str] = mapped_column(String)  # win|loss|draw|unknown, for this player
+    pivots: Mapped[int] = mapped_column(Integer, default=0)  # pivots this player made
+
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+
+class PlayerPivot(Base):
+    """One pivotal move, attributed to the player who made it."""
+    __tablename__ = "player_pivots"
+    __table_args__ = (Index("ix_player_pivots_lookup", "player", "eco", "phase", "swing_cp"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    player: Mapped[str] = mapped_column(String)
+    game_hash: Mapped[str] = mapped_column(String, index=True)
+    job_id: Mapped[str] = mapped_column(String, ForeignKey("jobs.id"), index=True)
+    ply: Mapped[int] = mapped_column(Integer)
+    color: Mapped[str] = mapped_column(String)  # side to move: white|black
+    eco: Mapped[str] = mapped_column(String)
+    phase: Mapped[str] = mapped_column(String)  # opening|middlegame|endgame
+    swing_cp: Mapped[int] = mapped_column(Integer)  # eval lost vs the best move, capped
+    severity: Mapped[str] = mapped_column(String)  # from analysis/explain.py
+    motif: Mapped[str] = mapped_column(String)
+    result: Mapped[str] = mapped_column(String)  # the game's result for this player
+
+class PlayerSummary(Base):
+    """Per-player aggregates by one dimension (total, color, eco, phase, motif, severity),
+    rebuilt for a player whenever one of their games is indexed, so reads never scan."""
+    __tablename__ = "player_summaries"
+    __table_args__ = (UniqueConstraint("player", "dimension", "key"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    player: Mapped[str] = mapped_column(String, index=True)
+    dimension: Mapped[str] = mapped_column(String)
+    key: Mapped[str] = mapped_column(String)  # "" for the total row
+    label: Mapped[str | None] = mapped_column(String, nullable=True)  # opening name for eco rows
+    games: Mapped[int] = mapped_column(Integer, default=0)
+    wins: Mapped[int] = mapped_column(Integer, default=0)
+    draws: Mapped[int] = mapped_column(Integer, default=0)
+    losses: Mapped[int] = mapped_column(Integer, default=0)
+    pivots: Mapped[int] = mapped_column(Integer, default=0)
+    swing_cp: Mapped[int] = mapped_column(Integer, default=0)  # summed over the pivots
+
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow)
+
+class Batch(Base):
+    __tablename__ = "batches"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    settings: Mapped[dict] = mapped_column(JSON)
+    total_games: Mapped[int] = mapped_column(Integer, default=0)
+    duplicates: Mapped[int] = mapped_column(Integer, default=0)  # repeats within the upload
+    invalid: Mapped[int] = mapped_column(Integer, default=0)
+
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+
+    items = relationship("BatchItem", back_populates="batch", order_by="BatchItem.game_index")
+
+class BatchItem(Base):
+    """One game of a batch. Several items (and batches) may point at the same Job when games dedupe."""
+    __tablename__ = "batch_items"
+    __table_args__ = (UniqueConstraint("batch_id", "game_index"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    batch_id: Mapped[str] = mapped_column(String, ForeignKey("batches.id"), index=True)
+    game_index: Mapped[int] = mapped_column(Integer)
+    job_id: Mapped[str] = mapped_column(String, ForeignKey("jobs.id"), index=True)
+    white: Mapped[str | None] = mapped_column(String, nullable=True)
+    black: Mapped[str | None] = mapped_column(String, nullable=True)
+    result: Mapped[str | None] = mapped_column(String, nullable=True)
+
+    batch = relationship("Batch", back_populates="items")
+    job = relationship("Job")
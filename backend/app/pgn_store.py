@@ -0,0 +1,58 @@
+import os
+import re
+import zlib
+import threading
+from collections import OrderedDict
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .db import SessionLocal
+from .models import PgnBlob
+from .utils.hash import normalize_pgn, pgn_hash
+
+# PGNs are stored once, normalized and zlib-compressed, under their pgn_hash; queued jobs
+# carry only the hash. Workers keep recently used games decompressed in this many slots.
+PGN_CACHE_SIZE = int(os.getenv("PGN_CACHE_SIZE", "256"))
+ZLIB_LEVEL = 6
+
+_HASH = re.compile(r"^[0-9a-f]{64}$")
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def put_pgn(pgn: str) -> str:
+    """Store a PGN (once per content) and return its hash. Uses its own short transaction, so
+    the caller's session is never rolled back by a concurrent insert of the same game."""
+    text = normalize_pgn(pgn)
+    h = pgn_hash(text)
+    with SessionLocal() as db:
+        if db.get(PgnBlob, h) is None:
+            db.add(PgnBlob(hash=h, data=zlib.compress(text.encode("utf-8"), ZLIB_LEVEL), size=len(text)))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # stored meanwhile by another request
+    return h
+
+
+def get_pgn(db: Session, h: str) -> str:
+    with _lock:
+        if h in _cache:
+            _cache.move_to_end(h)
+            return _cache[h]
+    blob = db.get(PgnBlob, h)
+    if blob is None:
+        raise ValueError(f"PGN {h} is not stored (removed by retention?)")
+    text = zlib.decompress(blob.data).decode("utf-8")
+    with _lock:
+        _cache[h] = text
+        while len(_cache) > PGN_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return text
+
+
+def load_pgn(db: Session, ref: str) -> tuple[str, str]:
+    """(hash, text) for a job's PGN reference. Jobs queued before the store existed carry
+    the PGN text itself."""
+    if _HASH.match(ref):
+        return ref, get_pgn(db, ref)
+    return pgn_hash(ref), ref
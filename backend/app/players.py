@@ -0,0 +1,147 @@
+import logging
+import chess
+from sqlalchemy import case, distinct, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .models import PlayerGame, PlayerPivot, PlayerSummary, Report
+from .analysis.cards import report_cards
+from .analysis.explain import explain_pivots
+
+logger = logging.getLogger(__name__)
+
+# Player index: every analyzed game's pivots attributed to the player (PGN White/Black tag)
+# who made them, plus per-player summaries rebuilt from those rows on each indexed game.
+SWING_CAP_CP = 1000  # a pivot lost to a mate would swamp the sums; count it as this much
+OPENING_PLIES = 20
+# Knights/bishops 3, rooks 5, queens 9, both sides; at or below this a position is an endgame.
+ENDGAME_MATERIAL = 26
+DIMENSIONS = ("total", "color", "eco", "phase", "motif", "severity")
+
+_PIECE_VALUES = {chess.KNIGHT: 3, chess.BISHOP: 3, chess.ROOK: 5, chess.QUEEN: 9}
+_RESULTS = {"1-0": ("win", "loss"), "0-1": ("loss", "win"), "1/2-1/2": ("draw", "draw")}
+
+
+def game_phase(fen: str, ply: int) -> str:
+    board = chess.Board(fen)
+    material = sum(value * len(board.pieces(piece, color))
+                   for piece, value in _PIECE_VALUES.items() for color in chess.COLORS)
+    if material <= ENDGAME_MATERIAL:
+        return "endgame"
+    return "opening" if ply < OPENING_PLIES else "middlegame"
+
+
+def _players(headers: dict) -> dict[str, str]:
+    """color -> player name, for the sides the PGN names."""
+    out = {}
+    for color in ("white", "black"):
+        name = (headers.get(color.capitalize()) or "").strip()
+        if name not in ("", "?"):
+            out[color] = name
+    return out
+
+
+def _outcomes(model, per_game: bool) -> list:
+    """games, wins, draws, losses: PlayerGame rows are games; pivot rows are counted per game."""
+    if per_game:
+        return [func.count(model.id)] + [func.sum(case((model.result == r, 1), else_=0)) for r in ("win", "draw", "loss")]
+    return [func.count(distinct(model.game_hash))] + [
+        func.count(distinct(case((model.result == r, model.game_hash)))) for r in ("win", "draw", "loss")]
+
+
+def _grouped(db: Session, model, player: str, dimension: str, cols: list) -> list[tuple]:
+    # the total is grouped by player, which the filter already pins to one row
+    key = model.player if dimension == "total" else getattr(model, dimension)
+    rows = db.query(key, *cols).filter(model.player == player).group_by(key).all()
+    return [("" if dimension == "total" else k, *vals) for k, *vals in rows]
+
+
+def refresh_summary(db: Session, player: str) -> None:
+    """Rebuild a player's summary rows from their indexed games and pivots (not committed)."""
+    db.query(PlayerSummary).filter(PlayerSummary.player == player).delete()
+    rows: dict[tuple[str, str], PlayerSummary] = {}
+
+    def row(dimension, key, games, wins, draws, losses) -> PlayerSummary:
+        if (dimension, key) not in rows:
+            rows[dimension, key] = PlayerSummary(player=player, dimension=dimension, key=key, games=games,
+                                                 wins=wins or 0, draws=draws or 0, losses=losses or 0,
+                                                 pivots=0, swing_cp=0)
+        return rows[dimension, key]
+
+    for dimension in ("total", "color", "eco"):
+        cols = [*_outcomes(PlayerGame, per_game=True), func.max(PlayerGame.opening)]
+        for key, games, wins, draws, losses, opening in _grouped(db, PlayerGame, player, dimension, cols):
+            row(dimension, key, games, wins, draws, losses).label = opening if dimension == "eco" else None
+    for dimension in DIMENSIONS:
+        cols = [func.count(PlayerPivot.id), func.sum(PlayerPivot.swing_cp), *_outcomes(PlayerPivot, per_game=False)]
+        for key, pivots, swing, games, wins, draws, losses in _grouped(db, PlayerPivot, player, dimension, cols):
+            r = row(dimension, key, games, wins, draws, losses)
+            r.pivots, r.swing_cp = pivots, swing or 0
+    db.add_all(rows.values())
+
+
+def _index(db: Session, game_hash: str, job_id: str, headers: dict, cards: list[dict], moments: list[dict]) -> None:
+    players = _players(headers)
+    eco = (headers.get("ECO") or "").strip() or "?"
+    white, black = _RESULTS.get(headers.get("Result", "*"), ("unknown", "unknown"))
+    results = {"white": white, "black": black}
+    db.query(PlayerPivot).filter(PlayerPivot.game_hash == game_hash).delete()
+    db.query(PlayerGame).filter(PlayerGame.game_hash == game_hash).delete()
+    counts = dict.fromkeys(players, 0)
+    for card, moment in zip(cards, moments):
+        color = "white" if card["side_to_move"] == "White" else "black"
+        if color not in players:
+            continue
+        counts[color] += 1
+        db.add(PlayerPivot(player=players[color], game_hash=game_hash, job_id=job_id, ply=card["ply"], color=color,
+                           eco=eco, phase=game_phase(card["fen_before"], card["ply"]),
+                           swing_cp=min(moment["loss_cp"], SWING_CAP_CP), severity=moment["severity"],
+                           motif=moment["motif"], result=results[color]))
+    for color, name in players.items():
+        db.add(PlayerGame(player=name, game_hash=game_hash, color=color, job_id=job_id, eco=eco,
+                          opening=headers.get("Opening"), result=results[color], pivots=counts[color]))
+    db.flush()
+    for name in set(players.values()):
+        refresh_summary(db, name)
+
+
+def index_game(db: Session, game_hash: str, job_id: str, headers: dict, cards: list[dict], moments: list[dict]) -> None:
+    """Replace a game's rows in the player index with this report's pivots (`moments` are the
+    explain_pivot entries for `cards`) and refresh its players' summaries, then commit.
+
+    The index is secondary data: a failure is logged and leaves the previous rows in place.
+    """
+    if not _players(headers):
+        return
+    for _ in range(2):
+        try:
+            _index(db, game_hash, job_id, headers, cards, moments)
+            db.commit()
+            return
+        except IntegrityError:
+            db.rollback()  # a concurrent job indexed this game or player; redo on top of it
+        except Exception:
+            db.rollback()
+            logger.exception("player index: cannot index game %s (job %s)", game_hash, job_id)
+            return
+    logger.warning("player index: gave up on game %s (job %s) after concurrent updates", game_hash, job_id)
+
+
+def backfill(db: Session) -> int:
+    """Index every stored report, newest last so it wins; safe to repeat. Returns reports seen."""
+    ids = [job_id for (job_id,) in db.query(Report.job_id).order_by(Report.created_at)]
+    for job_id in ids:
+        report = db.get(Report, job_id)
+        cards = report_cards(report)
+        moments = explain_pivots(report.headers or {}, cards)["moments"]
+        index_game(db, report.pgn_hash.split(":")[0], job_id, report.headers or {}, cards, moments)
+        db.expunge_all()
+    return len(ids)
+
+
+if __name__ == "__main__":
+    from .db import Base, SessionLocal, engine
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as session:
+        logger.info("player index: indexed %d reports", backfill(session))
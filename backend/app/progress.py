@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import AsyncIterator, Optional
+from .tasks import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+# Latest state per job, so a client that connects (or polls) mid-job sees where it is.
+STATE_TTL_S = 24 * 3600
+# Read-through cache of the DB-backed status response: final states are kept long, others
+# only briefly; every publish() drops it, so polling sees transitions right away. 0 disables.
+STATUS_CACHE_TTL_S = int(os.getenv("STATUS_CACHE_TTL_S", "3600"))
+STATUS_CACHE_PENDING_TTL_S = int(os.getenv("STATUS_CACHE_PENDING_TTL_S", "1"))
+
+
+def _state_key(job_id: str) -> str:
+    return f"job:{job_id}:state"
+
+
+def _status_key(job_id: str) -> str:
+    return f"job:{job_id}:status"
+
+
+def channel(job_id: str) -> str:
+    return f"job:{job_id}:events"
+
+
+def publish(job_id: str, **fields) -> None:
+    """Merge `fields` into the job's live state and push the new state to subscribers.
+
+    Best effort: progress must never fail a job, so Redis errors are only logged.
+    """
+    r = get_redis()
+    try:
+        raw = r.get(_state_key(job_id))
+        state = json.loads(raw) if raw else {"job_id": job_id}
+        state.update(fields)
+        state["ts"] = time.time()
+        data = json.dumps(state)
+        pipe = r.pipeline()
+        pipe.set(_state_key(job_id), data, ex=STATE_TTL_S)
+        pipe.delete(_status_key(job_id))
+        pipe.publish(channel(job_id), data)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("progress publish failed for job %s: %s", job_id, e)
+
+
+def is_final(state: dict) -> bool:
+    """A job's stream ends once it failed, or finished and its narration is no longer pending."""
+    status = state.get("status")
+    return status == "error" or (status == "done" and state.get("narration_status") != "pending")
+
+
+def get_state(job_id: str) -> Optional[dict]:
+    try:
+        raw = get_redis().get(_state_key(job_id))
+    except Exception:
+        return None
+    return json.loads(raw) if raw else None
+
+
+async def aget_state(job_id: str) -> Optional[dict]:
+    try:
+        raw = await get_async_redis().get(_state_key(job_id))
+    except Exception:
+        return None
+    return json.loads(raw) if raw else None
+
+
+async def cached_status(job_id: str) -> Optional[dict]:
+    if not STATUS_CACHE_TTL_S:
+        return None
+    try:
+        raw = await get_async_redis().get(_status_key(job_id))
+    except Exception:
+        return None
+    return json.loads(raw) if raw else None
+
+
+async def cache_status(job_id: str, status: dict) -> None:
+    ttl = STATUS_CACHE_TTL_S if is_final(status) else STATUS_CACHE_PENDING_TTL_S
+    if not STATUS_CACHE_TTL_S or not ttl:
+        return
+    try:
+        await get_async_redis().set(_status_key(job_id), json.dumps(status), ex=ttl)
+    except Exception as e:
+        logger.warning("status cache write failed for job %s: %s", job_id, e)
+
+
+class ProgressTracker:
+    """Maps per-stage (done, total) counts onto the job's 0-100 progress and estimates the ETA.
+
+    STAGES gives each stage's (start, end) share of the overall progress bar. Safe to call
+    from the engine threads used for parallel evaluation.
+    """
+
+    STAGES = {"scan": (20, 60), "deep": (60, 75), "pivots": (75, 99), "refine": (60, 99)}
+
+    def __init__(self, job_id: str, start_progress: int = 20):
+        self.job_id = job_id
+        self.start_progress = start_progress
+        self.t0 = time.time()
+        self.pivots: list = []
+        self._lock = threading.Lock()
+
+    def __call__(self, stage: str, done: int, total: int, pivot: Optional[dict] = None) -> None:
+        lo, hi = self.STAGES.get(stage, (0, 100))
+        progress = lo + (hi - lo) * done // max(total, 1)
+        elapsed = time.time() - self.t0
+        gained = progress - self.start_progress
+        eta = round(elapsed * (100 - progress) / gained, 1) if gained > 0 else None
+        fields = {"status": "running", "stage": stage, "progress": progress, "eta_s": eta}
+        with self._lock:
+            if pivot is not None:
+                self.pivots.append(pivot)
+                fields["pivots"] = self.pivots
+            publish(self.job_id, **fields)
+
+
+async def iter_events(job_id: str, initial: Optional[dict], keepalive_s: float = 15.0) -> AsyncIterator[str]:
+    """Server-Sent Events for one job: the current state, then every published update until
+    the job fails or its narration has finished. Async, so an open stream holds no thread."""
+    pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(channel(job_id))  # subscribe before reading state so no update is missed
+    try:
+        state = await aget_state(job_id) or initial
+        if state:
+            yield f"data: {json.dumps(state)}\n\n"
+            if is_final(state):
+                return
+        while True:
+            msg = await pubsub.get_message(timeout=keepalive_s)
+            if msg is None:
+                yield ": keepalive\n\n"
+                continue
+            data = msg["data"].decode() if isinstance(msg["data"], bytes) else msg["data"]
+            yield f"data: {data}\n\n"
+            if is_final(json.loads(data)):
+                return
+    finally:
+        await pubsub.aclose()
@@ -0,0 +1,90 @@
+import os
+import time
+import logging
+import threading
+import datetime as dt
+from redis import Redis
+from sqlalchemy import exists
+from sqlalchemy.orm import Session
+from .db import SessionLocal
+from .models import AnalysisIndex, Batch, BatchItem, EvalCurve, Job, PgnBlob, PlayerGame, PlayerPivot, Report
+from .players import refresh_summary
+
+logger = logging.getLogger(__name__)
+
+# Jobs no submission was answered with for this many days are deleted with their report and the rows derived from
+# it (reuse index, player index, batch items); eval curves, batches and stored PGNs nothing
+# uses any more go with them. 0 keeps everything.
+RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", "90"))
+# How often the sweep runs; analysis workers take turns through a Redis lock.
+RETENTION_INTERVAL_S = int(os.getenv("RETENTION_INTERVAL_S", "3600"))
+RETENTION_BATCH = 500
+
+_LOCK_KEY = "retention:lock"
+
+
+def sweep(db: Session, now: dt.datetime | None = None) -> dict:
+    """Delete everything past the retention window, a batch of jobs per transaction."""
+    counts = dict.fromkeys(("jobs", "reports", "batches", "curves", "pgns"), 0)
+    if not RETENTION_DAYS:
+        return counts
+    cutoff = (now or dt.datetime.utcnow()) - dt.timedelta(days=RETENTION_DAYS)
+    while True:
+        ids = [job_id for (job_id,) in db.query(Job.id).filter(Job.accessed_at < cutoff).limit(RETENTION_BATCH)]
+        if not ids:
+            break
+        players = {p for (p,) in db.query(PlayerGame.player).filter(PlayerGame.job_id.in_(ids)).distinct()}
+        for model in (AnalysisIndex, PlayerPivot, PlayerGame, BatchItem):
+            db.query(model).filter(model.job_id.in_(ids)).delete(synchronize_session=False)
+        counts["reports"] += db.query(Report).filter(Report.job_id.in_(ids)).delete(synchronize_session=False)
+        counts["jobs"] += db.query(Job).filter(Job.id.in_(ids)).delete(synchronize_session=False)
+        for player in players:
+            refresh_summary(db, player)
+        db.commit()
+    counts["batches"] = db.query(Batch).filter(
+        Batch.created_at < cutoff, ~exists().where(BatchItem.batch_id == Batch.id),
+    ).delete(synchronize_session=False)
+    counts["curves"] = db.query(EvalCurve).filter(
+        EvalCurve.created_at < cutoff,
+        ~exists().where(Report.curve_id == EvalCurve.id),
+        ~exists().where(AnalysisIndex.curve_id == EvalCurve.id),
+    ).delete(synchronize_session=False)
+    counts["pgns"] = db.query(PgnBlob).filter(
+        PgnBlob.created_at < cutoff, ~exists().where(Job.game_hash == PgnBlob.hash),
+    ).delete(synchronize_session=False)
+    db.commit()
+    return counts
+
+
+def run_if_due(redis: Redis) -> dict | None:
+    """Sweep, unless another process already did within the last interval."""
+    if not RETENTION_DAYS or not redis.set(_LOCK_KEY, "1", nx=True, ex=RETENTION_INTERVAL_S):
+        return None
+    with SessionLocal() as db:
+        counts = sweep(db)
+    logger.info("retention: removed %s", counts)
+    return counts
+
+
+def start_background(redis: Redis) -> threading.Thread | None:
+    """Run the sweep from a daemon thread of this process every RETENTION_INTERVAL_S."""
+    if not RETENTION_DAYS:
+        return None
+
+    def loop():
+        while True:
+            try:
+                run_if_due(redis)
+            except Exception:
+                logger.exception("retention: sweep failed")
+            time.sleep(RETENTION_INTERVAL_S)
+
+    thread = threading.Thread(target=loop, name="retention", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as session:
+        logger.info("retention: removed %s", sweep(session))
@@ -0,0 +1,76 @@
+import chess.pgn
+from sqlalchemy.orm import Session
+from .models import AnalysisIndex, EvalCurve, Report
+from .analysis.cards import report_cards, trim_card
+from .analysis.curve import covers, unpack_curve
+from .analysis.pivots import PV_LEN, select_from_curve
+
+
+def find_curve(db: Session, game_hash: str, settings: dict) -> tuple[EvalCurve | None, dict | None]:
+    """A stored eval curve that can replace the scan for these settings: full scans first,
+    then the shallowest that is deep enough, newest first."""
+    depth = int(settings.get("depth", 14))
+    rows = (
+        db.query(EvalCurve)
+        .filter(EvalCurve.game_hash == game_hash, EvalCurve.depth >= depth)
+        .order_by((EvalCurve.mode == "full").desc(), EvalCurve.depth, EvalCurve.created_at.desc())
+        .all()
+    )
+    pre_threshold = int(int(settings.get("swing_threshold_cp", 120)) * float(settings.get("prescan_ratio", 0.5)))
+    for row in rows:
+        curve = unpack_curve(row.data)
+        if covers(curve, depth, settings.get("mode", "full"), int(settings.get("prescan_depth", 8)), pre_threshold):
+            return row, curve
+    return None, None
+
+
+def known_cards(db: Session, game_hash: str, curve_id: int, settings: dict) -> dict[int, tuple[dict, str]]:
+    """Pivot cards built from this curve by searches that dominate the request (depth, multipv
+    and line length at least as large), cut down to the requested size: ply -> (card, job id)."""
+    depth, multipv = int(settings.get("depth", 14)), int(settings.get("multipv", 2))
+    entries = (
+        db.query(AnalysisIndex)
+        .filter(AnalysisIndex.game_hash == game_hash, AnalysisIndex.depth >= depth,
+                AnalysisIndex.multipv >= multipv, AnalysisIndex.pv_len >= PV_LEN,
+                AnalysisIndex.curve_id == curve_id)
+        .order_by(AnalysisIndex.depth, AnalysisIndex.multipv, AnalysisIndex.created_at.desc())
+        .all()
+    )
+    cards: dict[int, tuple[dict, str]] = {}
+    for entry in entries:
+        report = db.get(Report, entry.job_id)
+        if report is None:
+            continue
+        for card in report_cards(report):
+            if card["ply"] not in cards:
+                cards[card["ply"]] = (trim_card(card, multipv, PV_LEN), entry.job_id)
+    return cards
+
+
+def plan(db: Session, game_hash: str, game: chess.pgn.Game | None, settings: dict) -> dict:
+    """How much of a request existing analyses cover: the curve to reuse, the selected plies'
+    cards that are already built (and the jobs they come from) and the plies still needing
+    an engine search. An empty `missing` means the report is derived without the engine."""
+    row, curve = find_curve(db, game_hash, settings)
+    if row is None or game is None:
+        return {"curve_row": None, "curve": None, "cards": {}, "derived_from": [], "missing": None}
+    known = known_cards(db, game_hash, row.id, settings)
+    plies = select_from_curve(game, curve, int(settings.get("max_pivots", 10)),
+                              int(settings.get("swing_threshold_cp", 120)), int(settings.get("min_ply_gap", 6)))
+    hits = {i: known[i] for i in plies if i in known}
+    return {
+        "curve_row": row,
+        "curve": curve,
+        "cards": {i: card for i, (card, _) in hits.items()},
+        "derived_from": sorted({job_id for _, job_id in hits.values()}),
+        "missing": [i for i in plies if i not in known],
+    }
+
+
+def index_report(db: Session, game_hash: str, job_id: str, curve_id: int | None, settings: dict) -> None:
+    """Record a finished report's search parameters (replacing any earlier entry for the job)."""
+    db.query(AnalysisIndex).filter(AnalysisIndex.job_id == job_id).delete()
+    if curve_id is None:
+        return
+    db.add(AnalysisIndex(game_hash=game_hash, depth=int(settings.get("depth", 14)),
+                         multipv=int(settings.get("multipv", 2)), pv_len=PV_LEN, job_id=job_id, curve_id=curve_id))
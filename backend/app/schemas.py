@@ -1,10 +1,10 @@
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any, Literal
 from pydantic import BaseModel, Field
 
 class PVMove(BaseModel):
     uci: str
     san: str
-    fen_after: str
+    fen_after: Optional[str] = None  # omitted in slim reports; replay the moves from fen_before
     eval_cp: Optional[int] = None
 
 class CandidateLine(BaseModel):
@@ -24,6 +24,8 @@ class PivotMoment(BaseModel):
     eval_before_cp: Optional[int] = None
     eval_after_played_cp: Optional[int] = None
     eval_after_best_cp: Optional[int] = None
+    source_before: str = "engine"  # how eval_before_cp was obtained: engine | book | tablebase | embedded
+    source_after: str = "engine"
     pv_best: List[PVMove] = Field(default_factory=list)
     candidates: List[CandidateLine] = Field(default_factory=list)
     pv_played: List[PVMove] = Field(default_factory=list)
@@ -34,26 +36,143 @@ class PivotMoment(BaseModel):
     remember: Optional[str] = None
 
 
-class AnalyzeRequest(BaseModel):
-    pgn: str = Field(..., description="PGN text")
+class CurvePoint(BaseModel):
+    ply: int  # 0 = start position
+    san: Optional[str] = None  # move that led to this position
+    eval_cp: Optional[int] = None  # white-relative
+    best: Optional[str] = None  # engine's best move here (uci)
+    depth: int
+    source: str = "engine"
+
+class EvalCurveResponse(BaseModel):
+    job_id: str
+    depth: int
+    mode: str  # full|two_pass; two-pass curves are shallow outside the flagged plies
+    points: List[CurvePoint]
+
+
+class AnalyzeSettings(BaseModel):
     depth: int = 14
     multipv: int = 2
     max_pivots: int = 10
     swing_threshold_cp: int = 120
     min_ply_gap: int = 6  # spacing between pivotal moments
+    # "two_pass": shallow sweep at prescan_depth, full-depth search only where the
+    # shallow swing reaches prescan_ratio * swing_threshold_cp
+    mode: Literal["full", "two_pass"] = "full"
+    prescan_depth: int = 8
+    prescan_ratio: float = 0.5
+    force_refresh: bool = False  # bypass the report cache and in-flight coalescing
+    # [%eval] comments in the PGN: ignore them, use them but re-search both sides of every
+    # swing they show, or use them as they are (only unannotated plies and pivots are searched)
+    embedded_evals: Literal["off", "verify", "trust"] = "off"
+    # Anytime mode: publish a quick shallow report, then refine it towards `depth` until
+    # this many seconds have passed (see pivots.anytime_pivots).
+    budget_s: Optional[float] = Field(None, gt=0, le=1800)
+
+class AnalyzeRequest(AnalyzeSettings):
+    pgn: str = Field(..., description="PGN text")
 
 class AnalyzeResponse(BaseModel):
     db_job_id: str
-    rq_job_id: str
+    rq_job_id: Optional[str] = None  # None when served from cache or attached to an in-flight job
+    queue: Optional[str] = None
+    cost: Optional[int] = None
+    cached: bool = False
+    coalesced: bool = False
+    derived: bool = False  # queued, but built from a deeper/wider analysis without engine searches
 
 class JobStatusResponse(BaseModel):
     job_id: str
     status: str
     progress: int
     error_message: Optional[str] = None
+    stats: Optional[dict] = None
+    stage: Optional[str] = None  # live stage while running (scan/deep/pivots)
+    eta_s: Optional[float] = None
+    narration_status: Optional[str] = None  # pending|done|error once the engine work is done
+    report_version: Optional[int] = None  # latest published report version (anytime mode)
+    effective_depth: Optional[int] = None  # depth that version was searched to
 
 class ReportResponse(BaseModel):
     job_id: str
     headers: dict
     pivotal_moments: List[PivotMoment]
-    coach_report: dict
+    coach_report: Optional[dict] = None
+    narration_status: str = "done"
+    version: int = 1  # anytime jobs publish refined versions of the same report
+    effective_depth: Optional[int] = None
+    final: bool = True  # False while an anytime job is still refining it
+
+class BatchResponse(BaseModel):
+    batch_id: str
+    total_games: int
+    enqueued: int
+    cached: int
+    coalesced: int
+    duplicates: int
+    invalid: int
+    truncated: bool = False  # a game failed to submit; only the games before it are in the batch
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    total_games: int
+    duplicates: int
+    invalid: int
+    progress: int
+    status_counts: dict
+
+class BatchGameReport(BaseModel):
+    game_index: int
+    job_id: str
+    status: str
+    headers: dict = Field(default_factory=dict)
+    pivotal_moments: List[PivotMoment] = Field(default_factory=list)
+    coach_report: Optional[dict] = None
+    narration_status: Optional[str] = None
+
+class BatchReportPage(BaseModel):
+    batch_id: str
+    offset: int
+    limit: int
+    total_games: int
+    games: List[BatchGameReport]
+
+class QueueStat(BaseModel):
+    queue: str
+    depth: int
+    running: int
+    oldest_wait_s: float
+    waiting_cost: int  # summed over (up to) the first 1000 waiting jobs
+    tenants: Dict[str, int] = Field(default_factory=dict)  # waiting jobs per tenant
+
+class PlayerAggregate(BaseModel):
+    key: str  # the ECO code, phase, motif, ... (the player's name in player lists)
+    label: Optional[str] = None  # opening name for ECO rows
+    games: int
+    wins: int
+    draws: int
+    losses: int
+    loss_rate: float  # losses / games; for pivot dimensions, over games with such a pivot
+    pivots: int
+    avg_swing_cp: Optional[int] = None
+
+class PlayerSummaryResponse(BaseModel):
+    player: str
+    total: PlayerAggregate
+    by_color: List[PlayerAggregate]
+    openings: List[PlayerAggregate]  # most losses first
+    phases: List[PlayerAggregate]
+    motifs: List[PlayerAggregate]  # recurring pivot types, most frequent first
+    severities: List[PlayerAggregate]
+
+class PlayerPivotRef(BaseModel):
+    job_id: str  # the report holding the full moment card
+    ply: int
+    color: str
+    eco: str
+    phase: str
+    swing_cp: int
+    severity: str
+    motif: str
+    result: str
@@ -1,10 +1,222 @@
 import os
+import uuid
+import datetime as dt
 from redis import Redis
-from rq import Queue
+from redis import asyncio as aioredis
+from rq import Queue, Retry
+from .analysis.pivots import ANYTIME_START_DEPTH
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-redis_conn = Redis.from_url(REDIS_URL)
-queue = Queue("analysis", connection=redis_conn, default_timeout=900)
+# Per-process pool caps; the async client serves the API's event loop, the sync one RQ and workers.
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_SOCKET_TIMEOUT_S = float(os.getenv("REDIS_SOCKET_TIMEOUT_S", "5"))
+redis_conn = Redis.from_url(REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS)
+async_redis = aioredis.Redis.from_url(REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS,
+                                      socket_connect_timeout=REDIS_SOCKET_TIMEOUT_S)
 
-def enqueue_analysis(job_id: str, pgn: str, settings: dict):
-    return queue.enqueue("app.worker_jobs.run_analysis", job_id, pgn, settings)
+# Analysis jobs are routed by estimated cost (plies x depth x multipv): cheap ones to the
+# fast lane, the rest (and every batch game) to bulk. Workers list the fast lane first.
+FAST_LANE_MAX_COST = int(os.getenv("FAST_LANE_MAX_COST", "2500"))
+# RQ timeout = base + cost * per-unit, capped.
+JOB_TIMEOUT_BASE_S = int(os.getenv("JOB_TIMEOUT_BASE_S", "120"))
+JOB_TIMEOUT_S_PER_UNIT = float(os.getenv("JOB_TIMEOUT_S_PER_UNIT", "0.1"))
+JOB_TIMEOUT_MAX_S = int(os.getenv("JOB_TIMEOUT_MAX_S", "3600"))
+# How long RQ keeps finished / failed job records in Redis (nothing reads the results; the
+# database has the outcome).
+RQ_RESULT_TTL_S = int(os.getenv("RQ_RESULT_TTL_S", "600"))
+RQ_FAILURE_TTL_S = int(os.getenv("RQ_FAILURE_TTL_S", str(7 * 24 * 3600)))
+
+# Fair share: each tenant's n-th waiting job is placed after every other tenant's n-th
+# waiting job, so one tenant's large batch cannot starve everyone else's single games.
+# Jobs carry an absolute round (the tenant's next round, never below the round now
+# starting) and the queue stays sorted by round, so a push only looks up its round's
+# last job and inserts after it; a tenant alone in the queue just appends.
+# Bookkeeping per queue, refreshed on every push and dropped after FAIR_STATE_TTL_S idle:
+#   fair:<q>:tenants  job -> tenant until pushed, then job -> round until it starts
+#   fair:<q>:next     tenant -> its next round
+#   fair:<q>:tails    round -> last job pushed in that round
+#   fair:<q>:head     round of the latest started job
+FAIR_STATE_TTL_S = int(os.getenv("FAIR_STATE_TTL_S", str(24 * 3600)))
+
+# KEYS: queue list, jobs hash, next hash, tails hash, head; ARGV: job id, state TTL.
+_FAIR_PUSH = """
+local tenant = redis.call('HGET', KEYS[2], ARGV[1]) or ''
+local head = tonumber(redis.call('GET', KEYS[5]) or '0')
+local round = math.max(tonumber(redis.call('HGET', KEYS[3], tenant) or '0'), head)
+local tail = redis.call('HGET', KEYS[4], round)
+redis.call('HSET', KEYS[3], tenant, round + 1)
+redis.call('HSET', KEYS[2], ARGV[1], round)
+redis.call('HSET', KEYS[4], round, ARGV[1])
+for i = 2, 5 do redis.call('EXPIRE', KEYS[i], ARGV[2]) end
+if tail and redis.call('LINSERT', KEYS[1], 'AFTER', tail, ARGV[1]) > 0 then
+  return 1
+end
+if tail and round == head then
+  -- the round's last job already started, so every job left is in a later round
+  return redis.call('LPUSH', KEYS[1], ARGV[1])
+end
+return redis.call('RPUSH', KEYS[1], ARGV[1])
+"""
+
+# KEYS: jobs hash, tails hash, head; ARGV: job id, state TTL.
+_FAIR_FORGET = """
+local round = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '')
+redis.call('HDEL', KEYS[1], ARGV[1])
+if not round then return 0 end
+local head = tonumber(redis.call('GET', KEYS[3]) or '0')
+if round > head then
+  for r = head, round - 1 do redis.call('HDEL', KEYS[2], r) end
+  redis.call('SET', KEYS[3], round, 'EX', ARGV[2])
+end
+return 1
+"""
+
+
+def _owners_key(queue_name: str) -> str:
+    return f"fair:{queue_name}:tenants"
+
+
+def _fair_keys(queue_name: str) -> list[str]:
+    return [_owners_key(queue_name), *(f"fair:{queue_name}:{k}" for k in ("next", "tails", "head"))]
+
+
+class FairQueue(Queue):
+    """An RQ queue that orders waiting jobs round-robin across tenants instead of FIFO."""
+
+    def push_job_id(self, job_id: str, pipeline=None, at_front: bool = False) -> None:
+        if at_front:
+            return super().push_job_id(job_id, pipeline=pipeline, at_front=at_front)
+        script = self.connection.register_script(_FAIR_PUSH)
+        script(keys=[self.key, *_fair_keys(self.name)], args=[job_id, FAIR_STATE_TTL_S],
+               client=pipeline or self.connection)
+        self.log.debug("Pushed job %s into %s (fair)", job_id, self.name)
+
+
+fast_queue = FairQueue("analysis_fast", connection=redis_conn, default_timeout=JOB_TIMEOUT_BASE_S)
+bulk_queue = FairQueue("analysis_bulk", connection=redis_conn, default_timeout=JOB_TIMEOUT_BASE_S)
+# LLM calls run on their own queue so engine workers never wait on the API.
+narration_queue = Queue("narration", connection=redis_conn, default_timeout=300)
+ANALYSIS_QUEUES = (fast_queue, bulk_queue)
+
+def get_redis() -> Redis:
+    return redis_conn
+
+def get_async_redis() -> aioredis.Redis:
+    return async_redis
+
+# Single-flight marker: while a job for a cache key is queued/running, identical
+# submissions attach to it. The TTL covers the queue wait allowance plus the job's own
+# timeout so a crashed worker cannot pin a key forever.
+INFLIGHT_TTL_S = 900
+
+def runs_anytime(settings: dict, reuses_curve: bool, annotated: bool) -> bool:
+    """Whether a job with a time budget refines in anytime mode: not when it reuses a stored
+    curve, nor when it takes the game's evals from [%eval] comments."""
+    return (bool(settings.get("budget_s")) and not reuses_curve
+            and (settings.get("embedded_evals", "off") == "off" or not annotated))
+
+def estimate_cost(plies: int, settings: dict, anytime: bool = False) -> int:
+    """Relative engine cost of a job: plies x depth x multipv (anytime jobs: up to their first report)."""
+    depth = int(settings.get("depth", 14))
+    if anytime:
+        depth = min(depth, ANYTIME_START_DEPTH)
+    return max(1, plies) * depth * max(1, int(settings.get("multipv", 2)))
+
+def job_timeout(cost: int, budget_s: float | None = None) -> int:
+    # an anytime job keeps refining for up to its budget after the first report
+    return min(JOB_TIMEOUT_MAX_S, int(JOB_TIMEOUT_BASE_S + cost * JOB_TIMEOUT_S_PER_UNIT + (budget_s or 0)))
+
+def route(cost: int, bulk: bool = False) -> FairQueue:
+    return bulk_queue if bulk or cost > FAST_LANE_MAX_COST else fast_queue
+
+def enqueue_analysis(job_id: str, game_hash: str, settings: dict, cost: int, tenant: str,
+                     bulk: bool = False) -> tuple[str, str]:
+    """Enqueue on the queue for this cost; returns (rq job id, queue name). The job carries the
+    stored PGN's hash (pgn_store.put_pgn), not the text."""
+    q = route(cost, bulk)
+    rq_id = str(uuid.uuid4())
+    redis_conn.hset(_owners_key(q.name), rq_id, tenant)
+    try:
+        job = q.enqueue(
+            "app.worker_jobs.run_analysis", job_id, game_hash, settings,
+            job_id=rq_id, job_timeout=job_timeout(cost, settings.get("budget_s")), meta={"cost": cost, "tenant": tenant},
+            result_ttl=RQ_RESULT_TTL_S, failure_ttl=RQ_FAILURE_TTL_S, on_failure=_forget_failed,
+        )
+    except Exception:
+        forget_tenant(q.name, rq_id)
+        raise
+    return job.id, q.name
+
+def forget_tenant(queue_name: str, rq_job_id: str) -> None:
+    """Drop a job that started (or will never start) from its queue's fair-share bookkeeping."""
+    keys = _fair_keys(queue_name)
+    redis_conn.register_script(_FAIR_FORGET)(keys=[keys[0], keys[2], keys[3]], args=[rq_job_id, FAIR_STATE_TTL_S])
+
+def _forget_failed(job, connection, *exc_info) -> None:
+    # RQ failure callback: also covers jobs that fail before run_analysis gets to forget them
+    forget_tenant(job.origin, job.id)
+
+def queue_stats(queues=None, sample: int = 1000) -> list[dict]:
+    """Depth, running jobs, oldest wait and waiting cost per queue, with per-tenant counts."""
+    out = []
+    now = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+    for q in queues or (*ANALYSIS_QUEUES, narration_queue):
+        jobs = [j for j in q.get_jobs(0, sample) if j is not None]
+        tenants: dict[str, int] = {}
+        for j in jobs:
+            t = j.meta.get("tenant")
+            if t:
+                tenants[t] = tenants.get(t, 0) + 1
+        oldest = min((j.enqueued_at for j in jobs if j.enqueued_at), default=None)
+        out.append({
+            "queue": q.name,
+            "depth": q.count,
+            "running": q.started_job_registry.count,
+            "oldest_wait_s": round((now - oldest).total_seconds(), 1) if oldest else 0.0,
+            "waiting_cost": sum(int(j.meta.get("cost", 0)) for j in jobs),
+            "tenants": tenants,
+        })
+    return out
+
+def enqueue_narration(job_id: str) -> str:
+    # A failed API call is retried here without touching the engine results.
+    return narration_queue.enqueue(
+        "app.worker_jobs.run_narration", job_id, retry=Retry(max=3, interval=[10, 60, 300]),
+        result_ttl=RQ_RESULT_TTL_S, failure_ttl=RQ_FAILURE_TTL_S,
+    ).id
+
+def _inflight_key(cache_key: str) -> str:
+    return f"inflight:{cache_key}"
+
+# KEYS: marker; ARGV: job id, TTL. Returns the current holder, or nil after claiming it.
+_CLAIM = """
+local owner = redis.call('GET', KEYS[1])
+if owner then return owner end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return nil
+"""
+
+# KEYS: marker; ARGV: job id. Deletes the marker only while it still names this job.
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+def claim_inflight(cache_key: str, job_id: str, force: bool = False, timeout_s: int = 0) -> str | None:
+    """Register `job_id` as the in-flight job for `cache_key`.
+
+    Returns the id of an already in-flight job instead if another submission won
+    the race (never when `force` is set).
+    """
+    key = _inflight_key(cache_key)
+    ttl = INFLIGHT_TTL_S + timeout_s
+    if force:
+        redis_conn.set(key, job_id, ex=ttl)
+        return None
+    # one script, so the holder expiring or releasing between the check and the read
+    # cannot leave us "claimed" without the key naming us
+    owner = redis_conn.register_script(_CLAIM)(keys=[key], args=[job_id, ttl])
+    return owner.decode() if owner else None
+
+def release_inflight(cache_key: str, job_id: str) -> None:
+    redis_conn.register_script(_RELEASE)(keys=[_inflight_key(cache_key)], args=[job_id])
@@ -1,6 +1,8 @@
 import hashlib
 
-def pgn_hash(pgn: str) -> str:
+def normalize_pgn(pgn: str) -> str:
     # normalize whitespace lightly
-    cleaned = "\n".join([line.rstrip() for line in pgn.strip().splitlines() if line.strip()])
-    return hashlib.sha256(cleaned.encode("utf-8")).hexdigest()
+    return "\n".join([line.rstrip() for line in pgn.strip().splitlines() if line.strip()])
+
+def pgn_hash(pgn: str) -> str:
+    return hashlib.sha256(normalize_pgn(pgn).encode("utf-8")).hexdigest()
@@ -1,63 +1,219 @@
 import os
+from contextlib import nullcontext
 from sqlalchemy.orm import Session
 from .db import SessionLocal, engine
-from .models import Job, Report
-from .analysis.pgn import parse_pgn
-from .analysis.engine import open_engine
-from .analysis.pivots import detect_pivots
+from .models import Job, Report, EvalCurve
+from .reuse import plan, index_report
+from .players import index_game
+from .analysis.pgn import parse_pgn, embedded_evals
+from .analysis.engine_pool import get_pool, ENGINE_JOB_PARALLELISM
+from .analysis.pivots import detect_pivots, anytime_pivots
 from .analysis.narration import narrate
+from .analysis.explain import explain_pivots, EXPLAIN_VERSION
+from .analysis.cards import pack_cards, report_cards
+from .analysis.curve import pack_curve
+from .pgn_store import load_pgn
+from rq import get_current_job
+from .tasks import release_inflight, enqueue_narration, forget_tenant, runs_anytime
+from .progress import ProgressTracker, publish
+from .metrics import span, worker_job
+
+# Narrate in the engine worker instead of queueing it (tests, bench, single-process setups).
+NARRATION_INLINE = os.getenv("NARRATION_INLINE", "0") == "1"
 
 def _set_job(db: Session, job_id: str, **kwargs):
+    """Persist a job state transition and mirror it to live subscribers.
+
+    Progress between transitions only goes through `progress.publish` (Redis),
+    so Postgres sees a handful of writes per job instead of one per update.
+    """
     job = db.get(Job, job_id)
     if not job:
         return
     for k, v in kwargs.items():
         setattr(job, k, v)
     db.commit()
+    live = {k: v for k, v in kwargs.items() if k in ("status", "progress", "error_message")}
+    if live.get("status") in ("done", "error"):
+        live.update(stage=None, eta_s=0)
+    publish(job_id, **live)
+
+def _save_report(db: Session, job: Job, headers: dict, cards: list[dict], plain: dict, curve_id: int | None,
+                 version: int, effective_depth: int | None, final: bool) -> None:
+    """Upsert the job's report; the coach narration is filled in later by run_narration."""
+    fields = dict(headers=headers, cards_blob=pack_cards(cards), moment_cards=None, llm_report=None,
+                  narration_status="pending", narration_error=None, plain_report=plain,
+                  plain_report_version=EXPLAIN_VERSION, curve_id=curve_id, version=version,
+                  effective_depth=effective_depth, final=final)
+    existing = db.get(Report, job.id)
+    if existing:
+        for k, v in fields.items():
+            setattr(existing, k, v)
+    else:
+        db.add(Report(job_id=job.id, pgn_hash=job.pgn_hash, **fields))
 
-def run_analysis(job_id: str, pgn: str, settings: dict):
+def run_analysis(job_id: str, pgn_ref: str, settings: dict):
     db = SessionLocal()
+    stats: dict = {}
+    timings = stats.setdefault("timings", {})
     try:
-        _set_job(db, job_id, status="running", progress=5, error_message=None)
+        with worker_job("analysis", timings):
+            rq_job = get_current_job()
+            if rq_job is not None:
+                forget_tenant(rq_job.origin, rq_job.id)
+            _set_job(db, job_id, status="running", progress=5, error_message=None)
 
-        game = parse_pgn(pgn)
-        headers = dict(game.headers)
+            with span("parse", timings):
+                game_hash, pgn = load_pgn(db, pgn_ref)
+                game = parse_pgn(pgn)
+                headers = dict(game.headers)
 
-        _set_job(db, job_id, progress=20)
-        engine_sf = open_engine()
-        try:
-            cards = detect_pivots(
-                game=game,
-                engine=engine_sf,
-                depth=int(settings.get("depth", 14)),
-                multipv=int(settings.get("multipv", 2)),
-                max_pivots=int(settings.get("max_pivots", 10)),
-                swing_threshold_cp=int(settings.get("swing_threshold_cp", 120)),
-                min_ply_gap=int(settings.get("min_ply_gap", 6)),
-            )
-        finally:
-            engine_sf.quit()
+            # Reuse a stored curve that is deep enough instead of rescanning, and pivot cards from
+            # analyses that searched at least as deep and wide; the engine is only borrowed when
+            # some selected ply has no such card.
+            reuse = None if settings.get("force_refresh") else plan(db, game_hash, game, settings)
+            curve_row = reuse["curve_row"] if reuse else None
+            need_engine = curve_row is None or bool(reuse["missing"])
+            if curve_row is not None:
+                stats["reuse"] = "partial" if need_engine else "derived"
+                stats["derived_from"] = reuse["derived_from"]
+            curve_out: dict = {}
 
-        _set_job(db, job_id, progress=70)
+            tracker = ProgressTracker(job_id)
+            publish(job_id, stage="parse", progress=20)
+            pool = get_pool()
+            depth = int(settings.get("depth", 14))
+            effective_depth = depth
+            versions = 0
+            # Anytime jobs save and announce every refined version while they run; the last is
+            # saved again below as the final report.
+            embedded = settings.get("embedded_evals", "off")
+            # a game annotated with [%eval] comments needs no shallow first version
+            anytime = runs_anytime(settings, curve_row is not None, any(embedded_evals(game)))
 
-        coach = narrate(headers=headers, moment_cards=cards)
+            def save_version(found: list, at_depth: int) -> None:
+                nonlocal versions, effective_depth
+                versions, effective_depth = versions + 1, at_depth
+                version_cards = [p.model_dump() for p in found]
+                with span("db_save", timings):
+                    _save_report(db, db.get(Job, job_id), headers, version_cards, explain_pivots(headers, version_cards),
+                                 None, versions, at_depth, final=False)
+                    db.commit()
+                publish(job_id, report_version=versions, effective_depth=at_depth)
 
-        # upsert report
-        job = db.get(Job, job_id)
-        if not job:
-            raise RuntimeError("Job missing during report save.")
-        existing = db.get(Report, job_id)
-        if existing:
-            existing.headers = headers
-            existing.moment_cards = cards
-            existing.llm_report = coach
-        else:
-            db.add(Report(job_id=job_id, pgn_hash=job.pgn_hash, headers=headers, moment_cards=cards, llm_report=coach))
-        db.commit()
+            with pool.engine() if need_engine else nullcontext() as engine_sf:
+                common = dict(
+                    game=game,
+                    engine=engine_sf,
+                    depth=depth,
+                    multipv=int(settings.get("multipv", 2)),
+                    max_pivots=int(settings.get("max_pivots", 10)),
+                    swing_threshold_cp=int(settings.get("swing_threshold_cp", 120)),
+                    min_ply_gap=int(settings.get("min_ply_gap", 6)),
+                    prescan_ratio=float(settings.get("prescan_ratio", 0.5)),
+                    stats=stats,
+                    pool=pool if need_engine else None,
+                    parallelism=ENGINE_JOB_PARALLELISM,
+                    progress=tracker,
+                    curve_out=curve_out,
+                )
+                if anytime:
+                    pivots = anytime_pivots(**common, budget_s=float(settings["budget_s"]), on_version=save_version)
+                else:
+                    pivots = detect_pivots(
+                        **common,
+                        mode=settings.get("mode", "full"),
+                        prescan_depth=int(settings.get("prescan_depth", 8)),
+                        curve=reuse["curve"] if reuse else None,
+                        known_cards=reuse["cards"] if reuse else None,
+                        embedded=embedded,
+                    )
+            cards = [p.model_dump() for p in pivots]
+            with span("explain", timings):
+                plain = explain_pivots(headers, cards)
+
+            with span("db_save", timings):
+                job = db.get(Job, job_id)
+                if not job:
+                    raise RuntimeError("Job missing during report save.")
+                if curve_row is None and curve_out:
+                    curve_row = EvalCurve(game_hash=game_hash, depth=curve_out["depth"], mode=curve_out["mode"],
+                                          plies=len(curve_out["scores"]) - 1, data=pack_curve(curve_out))
+                    db.add(curve_row)
+                    db.flush()
+                curve_id = curve_row.id if curve_row is not None else None
+                _save_report(db, job, headers, cards, plain, curve_id, max(versions, 1), effective_depth, final=True)
+                # reuse sees what was actually searched, which for anytime jobs may be shallower than asked
+                index_report(db, game_hash, job_id, curve_id, {**settings, "depth": effective_depth})
+                db.commit()
+            with span("player_index", timings):
+                index_game(db, game_hash, job_id, headers, cards, plain["moments"])
 
-        _set_job(db, job_id, status="done", progress=100)
+            publish(job_id, narration_status="pending")
+            _set_job(db, job_id, status="done", progress=100, stats=stats)
     except Exception as e:
         _set_job(db, job_id, status="error", progress=100, error_message=str(e))
         raise
+    finally:
+        job = db.get(Job, job_id)
+        if job:
+            try:
+                release_inflight(job.pgn_hash, job_id)
+            except Exception:
+                pass
+        db.close()
+
+    if NARRATION_INLINE:
+        try:
+            run_narration(job_id)
+        except Exception:
+            pass  # already recorded on the report as narration_status="error"
+    else:
+        try:
+            enqueue_narration(job_id)
+        except Exception as e:
+            _set_narration(job_id, "error", error=f"could not queue narration: {e}")
+    return stats
+
+def _set_narration(job_id: str, status: str, coach: dict | None = None, error: str | None = None,
+                   timings: dict | None = None):
+    db = SessionLocal()
+    try:
+        report = db.get(Report, job_id)
+        if not report:
+            return
+        report.narration_status = status
+        report.narration_error = error
+        if coach is not None:
+            report.llm_report = coach
+        if timings and report.job is not None:
+            # reassign so SQLAlchemy sees the JSON change
+            report.job.stats = {**(report.job.stats or {}),
+                                "timings": {**(report.job.stats or {}).get("timings", {}), **timings}}
+        db.commit()
     finally:
         db.close()
+    publish(job_id, narration_status=status)
+
+def run_narration(job_id: str):
+    """Second pipeline stage: turn a finished report's moment cards into the coach narration."""
+    timings: dict = {}
+    with worker_job("narration", timings):
+        db = SessionLocal()
+        try:
+            report = db.get(Report, job_id)
+            if not report:
+                raise RuntimeError("Report missing for narration.")
+            headers, cards = report.headers, report_cards(report)
+        finally:
+            db.close()
+        try:
+            with span("narrate", timings):
+                coach = narrate(headers=headers, moment_cards=cards)
+        except Exception as e:
+            # while RQ still has retries left the narration stays pending, so streams keep following
+            rq_job = get_current_job()
+            retrying = rq_job is not None and (rq_job.retries_left or 0) > 0
+            _set_narration(job_id, "pending" if retrying else "error", error=str(e))
+            raise
+        _set_narration(job_id, "done", coach=coach, timings=timings)
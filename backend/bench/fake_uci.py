@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Deterministic stand-in for Stockfish, for benchmarks and offline runs.
+
+Scores are material plus a small hash of the position, so every run over the
+same PGN produces the same evals, PVs and pivots. Each `go depth N` sleeps
+FAKE_UCI_MS_PER_DEPTH * N milliseconds to mimic search cost growing with depth.
+"""
+import os
+import sys
+import time
+import hashlib
+import chess
+
+MS_PER_DEPTH = float(os.getenv("FAKE_UCI_MS_PER_DEPTH", "1"))
+VALUES = {chess.PAWN: 100, chess.KNIGHT: 300, chess.BISHOP: 320, chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0}
+
+
+def evaluate(board: chess.Board) -> int:
+    """White-relative score."""
+    score = 0
+    for p in board.piece_map().values():
+        score += VALUES[p.piece_type] if p.color else -VALUES[p.piece_type]
+    noise = int(hashlib.sha1(board.board_fen().encode()).hexdigest()[:4], 16) % 41 - 20
+    return score + noise
+
+
+def ranked(board: chess.Board):
+    """Legal moves, best first for the side to move, as (score, uci, move)."""
+    out = []
+    for mv in board.legal_moves:
+        board.push(mv)
+        if board.is_checkmate():
+            score = 100000
+        else:
+            score = -evaluate(board) if board.turn else evaluate(board)
+        board.pop()
+        out.append((score, mv.uci(), mv))
+    out.sort(key=lambda t: (-t[0], t[1]))
+    return out
+
+
+def line(board: chess.Board, first: chess.Move, length: int):
+    b = board.copy(stack=False)
+    pv = [first]
+    b.push(first)
+    while len(pv) < length:
+        r = ranked(b)
+        if not r:
+            break
+        pv.append(r[0][2])
+        b.push(r[0][2])
+    return pv
+
+
+def main() -> None:
+    board = chess.Board()
+    multipv = 1
+    for raw in sys.stdin:
+        parts = raw.split()
+        if not parts:
+            continue
+        cmd = parts[0]
+        if cmd == "uci":
+            print("id name FakeFish")
+            print("option name MultiPV type spin default 1 min 1 max 500")
+            print("option name Threads type spin default 1 min 1 max 64")
+            print("option name Hash type spin default 16 min 1 max 4096")
+            print("uciok")
+        elif cmd == "isready":
+            print("readyok")
+        elif cmd == "setoption" and "name" in parts:
+            name = parts[parts.index("name") + 1]
+            if name == "MultiPV" and "value" in parts:
+                multipv = int(parts[parts.index("value") + 1])
+        elif cmd == "position":
+            if parts[1] == "startpos":
+                board, rest = chess.Board(), parts[2:]
+            else:
+                i = parts.index("moves") if "moves" in parts else len(parts)
+                board, rest = chess.Board(" ".join(parts[2:i])), parts[i:]
+            for u in rest[1:]:
+                board.push_uci(u)
+        elif cmd == "go":
+            depth = int(parts[parts.index("depth") + 1]) if "depth" in parts else 10
+            time.sleep(MS_PER_DEPTH * depth / 1000)
+            r = ranked(board)
+            if not r:
+                print("info depth 0 score mate 0" if board.is_checkmate() else "info depth 0 score cp 0")
+                print("bestmove (none)")
+            else:
+                for k, (score, uci, mv) in enumerate(r[:multipv], 1):
+                    pv = " ".join(m.uci() for m in line(board, mv, 4))
+                    kind = "mate 1" if score >= 100000 else f"cp {score}"
+                    print(f"info depth {depth} seldepth {depth} multipv {k} score {kind} nodes {1000 * depth} pv {pv}")
+                print(f"bestmove {r[0][1]}")
+        elif cmd == "quit":
+            break
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Polling load test against a running API.
+
+    cd backend && python -m bench.load --api http://localhost:8000 --clients 200 --duration 20
+    python -m bench.load --api http://localhost:8000 --paths status,report --out load.json
+
+Submits one game (bench/corpus/short.pgn unless --pgn) and waits until it is done,
+then --clients concurrent clients request its status (and the other --paths) back to
+back for --duration seconds, the way many browsers polling one job would. Prints
+requests/s, latency percentiles and error counts as JSON. To see the throughput
+difference of a change, run the same scenario against both builds, or against one
+API started with STATUS_CACHE_TTL_S=0 (status cache off) and one without.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+PATHS = {
+    "status": "/api/analyze/{id}",
+    "report": "/api/report/{id}",
+    "report_slim": "/api/report/{id}?slim=true",
+    "report2": "/api/report2/{id}",
+}
+
+
+def _parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--api", required=True, help="base URL of the running API")
+    p.add_argument("--pgn", default=str(BENCH_DIR / "corpus" / "short.pgn"))
+    p.add_argument("--job-id", help="poll this finished job instead of submitting --pgn")
+    p.add_argument("--depth", type=int, default=8)
+    p.add_argument("--clients", type=int, default=100)
+    p.add_argument("--duration", type=float, default=15.0, help="seconds of load")
+    p.add_argument("--paths", default="status", help=f"comma-separated, from {', '.join(PATHS)}")
+    p.add_argument("--out", help="write the JSON results here (default: stdout)")
+    return p.parse_args(argv)
+
+
+async def _finished_job(client: httpx.AsyncClient, args) -> str:
+    if args.job_id:
+        return args.job_id
+    body = {"pgn": Path(args.pgn).read_text(), "depth": args.depth}
+    job_id = (await client.post("/api/analyze", json=body)).raise_for_status().json()["db_job_id"]
+    for _ in range(600):
+        st = (await client.get(f"/api/analyze/{job_id}")).json()
+        if st["status"] in ("done", "error"):
+            return job_id
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"job {job_id} did not finish")
+
+
+async def _client(client: httpx.AsyncClient, urls: list[str], deadline: float, latencies: list, errors: dict):
+    k = 0
+    while time.perf_counter() < deadline:
+        url = urls[k % len(urls)]
+        k += 1
+        t = time.perf_counter()
+        try:
+            resp = await client.get(url)
+            key = None if resp.status_code < 400 else str(resp.status_code)
+        except httpx.HTTPError as e:
+            key = type(e).__name__
+        if key:
+            errors[key] = errors.get(key, 0) + 1
+        else:
+            latencies.append(time.perf_counter() - t)
+
+
+def _pct(values: list[float], q: int) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(1000 * ordered[min(len(ordered) - 1, len(ordered) * q // 100)], 2)
+
+
+async def run(args) -> dict:
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.api.rstrip("/"), limits=limits, timeout=30) as client:
+        job_id = await _finished_job(client, args)
+        urls = [PATHS[p.strip()].format(id=job_id) for p in args.paths.split(",") if p.strip()]
+        await asyncio.gather(*(client.get(u) for u in urls))  # warm up: connections, caches
+        latencies: list[float] = []
+        errors: dict[str, int] = {}
+        t0 = time.perf_counter()
+        await asyncio.gather(*(_client(client, urls, t0 + args.duration, latencies, errors)
+                               for _ in range(args.clients)))
+        elapsed = time.perf_counter() - t0
+    return {
+        "api": args.api,
+        "job_id": job_id,
+        "paths": urls,
+        "clients": args.clients,
+        "duration_s": round(elapsed, 2),
+        "requests": len(latencies),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": _pct(latencies, 50),
+        "p95_ms": _pct(latencies, 95),
+        "p99_ms": _pct(latencies, 99),
+        "errors": errors,
+    }
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    out = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.out:
+        Path(args.out).write_text(out + "\n")
+    print(out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""Benchmark the analysis pipeline over the PGN corpus and write the results as JSON.
+
+    cd backend && python -m bench.run --out bench-results.json
+    python -m bench.run --baseline bench-results.json      # compare against an earlier run
+    python -m bench.run --api http://localhost:8000        # also time a running API
+
+Runs against Stockfish when one is found (STOCKFISH_PATH or `stockfish` on PATH),
+otherwise against bench/fake_uci.py; narration uses the stub client unless --llm.
+Each game goes through the same stages as a worker job (parse, scan, pivot
+multipv, explain, narrate, DB save), timed separately.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+FAKE_ENGINE = BENCH_DIR / "fake_uci.py"
+# Summary metrics where a larger value is a regression (everything else: smaller is worse).
+HIGHER_IS_BETTER = {"jobs_per_min"}
+
+
+def _parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--corpus", default=str(BENCH_DIR / "corpus"), help="directory of .pgn files")
+    p.add_argument("--engine", choices=["auto", "stockfish", "fake"], default="auto")
+    p.add_argument("--depth", type=int, default=12)
+    p.add_argument("--multipv", type=int, default=2)
+    p.add_argument("--mode", choices=["full", "two_pass"], default="full")
+    p.add_argument("--max-pivots", type=int, default=10)
+    p.add_argument("--swing-threshold-cp", type=int, default=120)
+    p.add_argument("--min-ply-gap", type=int, default=6)
+    p.add_argument("--repeat", type=int, default=1, help="run the corpus this many times")
+    p.add_argument("--eval-cache", action="store_true", help="keep the eval cache on (off by default so repeats do real work)")
+    p.add_argument("--llm", action="store_true", help="narrate with the real LLM client instead of the stub")
+    p.add_argument("--api", help="base URL of a running API to time submit/poll/report requests against")
+    p.add_argument("--out", help="write the JSON results here (default: stdout)")
+    p.add_argument("--baseline", help="earlier results JSON to compare the summary against")
+    p.add_argument("--tolerance", type=float, default=0.10, help="relative change flagged as a regression")
+    p.add_argument("--fail-on-regression", action="store_true")
+    return p.parse_args(argv)
+
+
+def _configure_env(args) -> str:
+    """Settings are read from the environment at import time, so set them before importing app.*"""
+    engine = args.engine
+    if engine == "auto":
+        engine = "stockfish" if shutil.which(os.getenv("STOCKFISH_PATH", "stockfish")) else "fake"
+    if engine == "fake":
+        os.environ["STOCKFISH_PATH"] = str(FAKE_ENGINE)
+    if "DATABASE_URL" not in os.environ:
+        # throwaway DB, recreated each run so it always has the current schema
+        db_path = Path(tempfile.gettempdir()) / "chess-coach-bench.db"
+        db_path.unlink(missing_ok=True)
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["EVAL_CACHE_ENABLED"] = "1" if args.eval_cache else "0"
+    if not args.llm:
+        os.environ["NARRATION_CLIENT"] = "stub"
+    return engine
+
+
+def _corpus(path: str):
+    from app.analysis.pgn import iter_pgn_texts
+    games = []
+    for f in sorted(Path(path).glob("*.pgn")):
+        with open(f, encoding="utf-8", errors="replace", newline="") as fh:
+            texts = list(iter_pgn_texts(fh))
+        for k, text in enumerate(texts):
+            games.append((f.stem if len(texts) == 1 else f"{f.stem}#{k}", text))
+    return games
+
+
+def _pct(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(round(q * (len(values) - 1))))], 6)
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=BENCH_DIR, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_pipeline(args, games):
+    from app.db import Base, SessionLocal, engine as db_engine
+    from app.models import Job, Report
+    from app.analysis.pgn import parse_pgn
+    from app.analysis.pivots import detect_pivots
+    from app.analysis.explain import explain_pivots, EXPLAIN_VERSION
+    from app.analysis.cards import pack_cards
+    from app.analysis.narration import narrate
+    from app.analysis.engine_pool import get_pool, _rss_mb, ENGINE_JOB_PARALLELISM
+    from app.utils.hash import pgn_hash
+
+    Base.metadata.create_all(bind=db_engine)
+    pool = get_pool()
+    results = []
+    engine_rss = 0
+    wall0 = time.perf_counter()
+    try:
+        with pool.engine() as eng:
+            engine_name = eng.id.get("name")
+            for rep in range(args.repeat):
+                for name, text in games:
+                    row = {"game": name, "repeat": rep}
+                    t = time.perf_counter()
+                    game = parse_pgn(text)
+                    headers = dict(game.headers)
+                    row["parse_s"] = time.perf_counter() - t
+
+                    stats: dict = {}
+                    t = time.perf_counter()
+                    pivots = detect_pivots(
+                        game=game, engine=eng, depth=args.depth, multipv=args.multipv,
+                        max_pivots=args.max_pivots, swing_threshold_cp=args.swing_threshold_cp,
+                        min_ply_gap=args.min_ply_gap, mode=args.mode, stats=stats,
+                        pool=pool, parallelism=ENGINE_JOB_PARALLELISM,
+                    )
+                    analysis_s = time.perf_counter() - t
+                    row["pivots_s"] = stats.get("pivots_s", 0.0)
+                    row["scan_s"] = analysis_s - row["pivots_s"]
+                    resolved = stats.get("book_plies", 0) + stats.get("tablebase_plies", 0)
+                    searched = stats["plies"] + 1 - resolved + stats.get("deep_positions", 0)
+                    row["plies"] = stats["plies"]
+                    row["positions_searched"] = searched
+                    row["per_ply_ms"] = 1000 * row["scan_s"] / searched if searched else None
+                    row["pivots"] = len(pivots)
+
+                    cards = [p.model_dump() for p in pivots]
+                    t = time.perf_counter()
+                    plain = explain_pivots(headers, cards)
+                    row["explain_s"] = time.perf_counter() - t
+
+                    t = time.perf_counter()
+                    coach = narrate(headers=headers, moment_cards=cards)
+                    row["narrate_s"] = time.perf_counter() - t
+
+                    t = time.perf_counter()
+                    db = SessionLocal()
+                    try:
+                        job_id = str(uuid.uuid4())
+                        h = pgn_hash(text)
+                        db.add(Job(id=job_id, status="done", progress=100, pgn_hash=h, stats=stats))
+                        db.add(Report(job_id=job_id, pgn_hash=h, headers=headers, cards_blob=pack_cards(cards),
+                                      llm_report=coach, narration_status="done",
+                                      plain_report=plain, plain_report_version=EXPLAIN_VERSION))
+                        db.commit()
+                    finally:
+                        db.close()
+                    row["db_save_s"] = time.perf_counter() - t
+
+                    row["total_s"] = sum(row[k] for k in ("parse_s", "scan_s", "pivots_s", "explain_s", "narrate_s", "db_save_s"))
+                    results.append({k: round(v, 6) if isinstance(v, float) else v for k, v in row.items()})
+                    engine_rss = max(engine_rss, _rss_mb(eng.transport.get_pid()) or 0)
+                    print(f"{name:>14} rep={rep} plies={row['plies']:>3} total={row['total_s']:.3f}s "
+                          f"per_ply={row['per_ply_ms'] or 0:.1f}ms pivots={row['pivots']}", file=sys.stderr)
+    finally:
+        pool.close()
+    wall = time.perf_counter() - wall0
+    return results, wall, engine_name, engine_rss
+
+
+def summarize(results, wall, engine_rss):
+    per_ply = [r["per_ply_ms"] for r in results if r["per_ply_ms"] is not None]
+    totals = [r["total_s"] for r in results]
+    summary = {
+        "jobs": len(results),
+        "wall_s": round(wall, 3),
+        "jobs_per_min": round(60 * len(results) / wall, 2) if wall else None,
+        "job_p50_s": _pct(totals, 0.5),
+        "job_p95_s": _pct(totals, 0.95),
+        "per_ply_ms_mean": round(statistics.fmean(per_ply), 3) if per_ply else None,
+        "per_ply_ms_p95": _pct(per_ply, 0.95),
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+        "engine_rss_mb": engine_rss or None,
+    }
+    for stage in ("parse_s", "scan_s", "pivots_s", "explain_s", "narrate_s", "db_save_s"):
+        summary[f"{stage[:-2]}_total_s"] = round(sum(r[stage] for r in results), 4)
+    return summary
+
+
+def _http(method, url, body=None, headers=None):
+    req = urllib.request.Request(url, method=method, data=json.dumps(body).encode() if body is not None else None,
+                                 headers={"Content-Type": "application/json", **(headers or {})})
+    t = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            data, status, hdrs = resp.read(), resp.status, resp.headers
+    except urllib.error.HTTPError as e:
+        data, status, hdrs = e.read(), e.code, e.headers
+    return status, (json.loads(data) if data else None), hdrs, time.perf_counter() - t
+
+
+def run_api(args, games, timeout_s=600):
+    """Time the public endpoints of a running stack (API, worker, Redis, DB)."""
+    base = args.api.rstrip("/")
+    rows = []
+    for name, text in games:
+        body = {"pgn": text, "depth": args.depth, "multipv": args.multipv, "mode": args.mode,
+                "max_pivots": args.max_pivots, "swing_threshold_cp": args.swing_threshold_cp,
+                "min_ply_gap": args.min_ply_gap, "force_refresh": True}
+        status, resp, _, submit_s = _http("POST", f"{base}/api/analyze", body)
+        row = {"game": name, "submit_ms": round(1000 * submit_s, 2), "submit_status": status}
+        if status != 200:
+            rows.append(row)
+            continue
+        job_id, t0, polls, poll_s = resp["db_job_id"], time.perf_counter(), 0, 0.0
+        while time.perf_counter() - t0 < timeout_s:
+            _, st, _, dt = _http("GET", f"{base}/api/analyze/{job_id}")
+            polls, poll_s = polls + 1, poll_s + dt
+            if st and st["status"] in ("done", "error"):
+                break
+            time.sleep(0.2)
+        row.update(job_status=st["status"] if st else None, time_to_done_s=round(time.perf_counter() - t0, 3),
+                   status_ms_mean=round(1000 * poll_s / polls, 2))
+        for path in ("report", "report2"):
+            status, _, hdrs, dt = _http("GET", f"{base}/api/{path}/{job_id}")
+            row[f"{path}_ms"] = round(1000 * dt, 2)
+            if status == 200 and hdrs.get("ETag"):
+                status, _, _, dt = _http("GET", f"{base}/api/{path}/{job_id}", headers={"If-None-Match": hdrs["ETag"]})
+                row[f"{path}_revalidate_ms"], row[f"{path}_revalidate_status"] = round(1000 * dt, 2), status
+        rows.append(row)
+        print(f"{name:>14} api time_to_done={row['time_to_done_s']}s", file=sys.stderr)
+    return rows
+
+
+def compare(summary, baseline_path, tolerance):
+    base = json.loads(Path(baseline_path).read_text())["summary"]
+    changes, regressions = {}, []
+    for key, new in summary.items():
+        old = base.get(key)
+        if not isinstance(new, (int, float)) or not isinstance(old, (int, float)) or not old:
+            continue
+        rel = (new - old) / old
+        changes[key] = {"old": old, "new": new, "change": round(rel, 4)}
+        worse = -rel if key in HIGHER_IS_BETTER else rel
+        if key.endswith(("_s", "_ms", "_mb", "_ms_mean", "_ms_p95", "_per_min")) and worse > tolerance:
+            regressions.append(key)
+    return changes, regressions
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    engine_kind = _configure_env(args)
+    sys.path.insert(0, str(BENCH_DIR.parent))
+    import logging
+    logging.basicConfig(level=logging.ERROR)
+
+    games = _corpus(args.corpus)
+    if not games:
+        print(f"no .pgn games found in {args.corpus}", file=sys.stderr)
+        return 2
+    results, wall, engine_name, engine_rss = run_pipeline(args, games)
+    out = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_rev": _git_rev(),
+            "engine": engine_kind,
+            "engine_name": engine_name,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": {k: getattr(args, k) for k in ("depth", "multipv", "mode", "max_pivots", "swing_threshold_cp",
+                                                        "min_ply_gap", "repeat", "eval_cache", "llm")},
+            "env": {k: os.environ[k] for k in sorted(os.environ) if k.startswith(("ENGINE_", "FAKE_UCI_"))},
+        },
+        "games": results,
+        "summary": summarize(results, wall, engine_rss),
+    }
+    if args.api:
+        out["api"] = run_api(args, games)
+    regressions = []
+    if args.baseline:
+        out["comparison"], regressions = compare(out["summary"], args.baseline, args.tolerance)
+        out["regressions"] = regressions
+        for key in regressions:
+            c = out["comparison"][key]
+            print(f"REGRESSION {key}: {c['old']} -> {c['new']} ({c['change']:+.1%})", file=sys.stderr)
+
+    text = json.dumps(out, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
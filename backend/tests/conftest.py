@@ -0,0 +1,31 @@
+import os
+import tempfile
+import pytest
+
+# Point the app at a throwaway database before any app module reads its settings.
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='chess-coach-tests-')}/test.db")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    """A fresh in-memory Redis behind every client the app and its queues use."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # the fair-share queue runs Lua scripts
+    from app import tasks
+    server = fakeredis.FakeServer()
+    conn = fakeredis.FakeRedis(server=server)
+    monkeypatch.setattr(tasks, "redis_conn", conn)
+    monkeypatch.setattr(tasks, "async_redis", fakeredis.aioredis.FakeRedis(server=server))
+    for q in (*tasks.ANALYSIS_QUEUES, tasks.narration_queue):
+        monkeypatch.setattr(q, "connection", conn)
+    return conn
+
+
+@pytest.fixture
+def db():
+    from app.db import Base, SessionLocal, engine
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as session:
+        yield session
@@ -0,0 +1,37 @@
+import io
+import pytest
+from fastapi import HTTPException
+from app import main
+from app.models import Batch, BatchItem, Job
+from app.schemas import AnalyzeSettings
+
+GAME = '[White "{white}"]\n[Black "B"]\n[Result "*"]\n\n1. e4 e5 2. Nf3 Nc6 *\n'
+BROKEN = '[White "X"]\n[Black "Y"]\n[Result "*"]\n\n1. e4 Ke7 2. Qxf7 *\n'
+
+
+def _upload(*games: str) -> io.BytesIO:
+    return io.BytesIO("\n".join(games).encode())
+
+
+def test_count_games_skips_repeats_and_unplayable_games():
+    f = _upload(GAME.format(white="A"), GAME.format(white="A"), BROKEN, GAME.format(white="C"))
+    assert main._count_games(f, limit=10) == 3  # repeats dropped without parsing
+    assert main._count_games(f, limit=2) == 2   # over the limit: parsed, the broken game does not count
+    assert f.tell() == 0 and not f.closed
+
+
+def test_batch_limit_counts_real_games(db, redis, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_GAMES", 2)
+    f = _upload(GAME.format(white="A"), GAME.format(white="A"), GAME.format(white="A"), BROKEN,
+                GAME.format(white="C"))
+    resp = main._ingest_batch(f, AnalyzeSettings(depth=6), "tenant")
+    assert (resp.total_games, resp.duplicates, resp.invalid, resp.truncated) == (2, 2, 1, False)
+
+
+def test_batch_over_the_limit_stores_nothing(db, redis, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_GAMES", 2)
+    f = _upload(*(GAME.format(white=w) for w in "ABC"))
+    with pytest.raises(HTTPException) as exc:
+        main._ingest_batch(f, AnalyzeSettings(depth=6), "tenant")
+    assert exc.value.status_code == 400
+    assert db.query(Batch).count() == db.query(Job).count() == db.query(BatchItem).count() == 0
@@ -0,0 +1,88 @@
+import json
+import zlib
+import chess
+import pytest
+from app.analysis.cards import CARDS_FORMAT, pack_cards, trim_card, unpack_cards, _strip_fens
+from app.analysis.engine import pv_moves
+from app.schemas import CandidateLine, PivotMoment
+
+# After 1. e4 e5 2. Nf3, black to move
+FEN = "rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2"
+
+
+def _line(board: chess.Board, ucis: list[str], evals: list | None = None) -> list[dict]:
+    moves = [m.model_dump() for m in pv_moves(board, [chess.Move.from_uci(u) for u in ucis])]
+    for m, ev in zip(moves, evals or []):
+        m["eval_cp"] = ev
+    return moves
+
+
+def _card(**overrides) -> dict:
+    board = chess.Board(FEN)
+    played = board.copy()
+    played.push_uci("f7f6")
+    best = _line(board, ["b8c6", "f1b5", "a7a6"], [10, 12, None])
+    card = PivotMoment(
+        ply=4, side_to_move="Black", fen_before=FEN, uci_played="f7f6", san_played="f6", uci_best="b8c6",
+        san_best="Nc6", eval_before_cp=30, eval_after_played_cp=110, eval_after_best_cp=25,
+        source_before="book", source_after="engine", why_bad="Weakens the king.",
+    ).model_dump()
+    card.update(
+        pv_best=best,
+        candidates=[
+            CandidateLine(uci="b8c6", san="Nc6", eval_cp=25, pv=best).model_dump(),
+            CandidateLine(uci="d7d6", san="d6", eval_cp=40, pv=_line(board, ["d7d6", "d2d4"])).model_dump(),
+        ],
+        pv_played=_line(played, ["f3e5", "f6e5", "d1h5"]),
+        candidates_played=[
+            CandidateLine(uci="f3e5", san="Nxe5", eval_cp=110, pv=_line(played, ["f3e5", "f6e5"])).model_dump(),
+        ],
+    )
+    card.update(overrides)
+    return card
+
+
+CASES = {
+    "full": _card(),
+    "no_pv": _card(pv_best=[], pv_played=[], candidates=[], candidates_played=[]),
+    "no_best_move": _card(uci_best="", san_best="", pv_best=[], candidates=[]),
+    "no_evals": _card(eval_before_cp=None, eval_after_played_cp=None, eval_after_best_cp=None),
+    # a stored annotation that differs from what the board would derive is kept as written
+    "custom_san": _card(san_played="f6?!"),
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_cards_round_trip(name):
+    card = CASES[name]
+    assert unpack_cards(pack_cards([card])) == [card]
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_cards_without_fens_round_trip_slim(name):
+    slim = _strip_fens(CASES[name])
+    assert unpack_cards(pack_cards([slim]), fen_after=False) == [slim]
+    # the FENs are derived again from the moves
+    assert unpack_cards(pack_cards([slim])) == [CASES[name]]
+
+
+def test_several_cards_keep_their_order():
+    cards = list(CASES.values())
+    assert unpack_cards(pack_cards(cards)) == cards
+    assert unpack_cards(pack_cards([])) == []
+
+
+def test_unknown_format_is_rejected():
+    blob = zlib.compress(json.dumps({"v": CARDS_FORMAT + 1, "cards": []}).encode())
+    with pytest.raises(ValueError):
+        unpack_cards(blob)
+
+
+def test_trim_card_cuts_lines_and_candidates():
+    trimmed = trim_card(CASES["full"], multipv=1, pv_len=2)
+    assert [m["uci"] for m in trimmed["pv_best"]] == ["b8c6", "f1b5"]
+    assert [c["uci"] for c in trimmed["candidates"]] == ["b8c6"]
+    assert len(trimmed["candidates"][0]["pv"]) == 2
+    assert len(trimmed["pv_played"]) == 2
+    assert trim_card(CASES["no_pv"], multipv=3, pv_len=4)["candidates"] == []
+    assert CASES["full"]["candidates"][1]["uci"] == "d7d6"  # the original is left alone
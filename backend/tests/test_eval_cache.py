@@ -0,0 +1,61 @@
+import chess
+import chess.engine
+from app.analysis import engine as engine_mod
+from app.analysis.eval_cache import EvalCache, normalize_fen
+
+
+def _infos(depth: int, multipv: int) -> list:
+    board = chess.Board()
+    moves = list(board.legal_moves)[:multipv]
+    return [{"score": chess.engine.PovScore(chess.engine.Cp(20 - k), chess.WHITE), "pv": [m], "depth": depth}
+            for k, m in enumerate(moves)]
+
+
+def test_deep_single_line_does_not_block_wider_entry():
+    board = chess.Board()
+    cache = EvalCache(redis=None)
+    cache.put(board, 20, 1, _infos(20, 1))
+    cache.put(board, 14, 3, _infos(14, 3))
+    assert len(cache.get(board, depth=14, multipv=3)) == 3
+    assert cache.get(board, depth=20, multipv=1)[0]["depth"] == 20
+
+
+def test_deep_single_line_does_not_replace_wider_entry():
+    board = chess.Board()
+    cache = EvalCache(redis=None)
+    cache.put(board, 14, 3, _infos(14, 3))
+    cache.put(board, 20, 1, _infos(20, 1))
+    assert len(cache.get(board, depth=14, multipv=3)) == 3
+    assert cache.get(board, depth=20, multipv=1)[0]["depth"] == 20
+
+
+def test_dominated_entries_are_dropped():
+    board = chess.Board()
+    cache = EvalCache(redis=None)
+    cache.put(board, 14, 3, _infos(14, 3))
+    cache.put(board, 12, 2, _infos(12, 2))  # dominated: ignored
+    cache.put(board, 16, 3, _infos(16, 3))  # dominates the stored entry: replaces it
+    assert [(e["d"], e["m"]) for e in cache._lru_get(normalize_fen(board))] == [(16, 3)]
+    assert cache.get(board, depth=16, multipv=3) is not None
+
+
+class _TimedOutEngine:
+    """Asked for depth 20, stops at depth 9 on its time limit."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def analyse(self, board, limit, multipv=1):
+        self.calls += 1
+        return _infos(9, multipv)
+
+
+def test_time_limited_search_is_cached_at_reached_depth(monkeypatch):
+    cache = EvalCache(redis=None)
+    monkeypatch.setattr(engine_mod, "get_eval_cache", lambda: cache)
+    board, eng = chess.Board(), _TimedOutEngine()
+    engine_mod.analyse(eng, board, depth=20, time_limit=0.1)
+    engine_mod.analyse(eng, board, depth=20, time_limit=0.1)
+    assert eng.calls == 2  # the shallow result does not serve a depth-20 request
+    assert cache.get(board, depth=9)[0]["depth"] == 9
+    assert cache.get(board, depth=10) is None
@@ -0,0 +1,29 @@
+from app import tasks
+
+
+def test_second_claim_gets_the_holder(redis):
+    assert tasks.claim_inflight("k", "job1") is None
+    assert tasks.claim_inflight("k", "job2") == "job1"
+    assert redis.ttl(tasks._inflight_key("k")) > 0
+
+
+def test_claim_after_the_holder_expired_names_the_new_job(redis):
+    assert tasks.claim_inflight("k", "job1") is None
+    redis.delete(tasks._inflight_key("k"))  # expired or released by the worker
+    assert tasks.claim_inflight("k", "job2") is None
+    assert redis.get(tasks._inflight_key("k")) == b"job2"
+    assert tasks.claim_inflight("k", "job3") == "job2"
+
+
+def test_release_only_drops_our_own_marker(redis):
+    tasks.claim_inflight("k", "job1")
+    tasks.release_inflight("k", "job2")
+    assert tasks.claim_inflight("k", "job3") == "job1"
+    tasks.release_inflight("k", "job1")
+    assert tasks.claim_inflight("k", "job3") is None
+
+
+def test_force_takes_over(redis):
+    tasks.claim_inflight("k", "job1")
+    assert tasks.claim_inflight("k", "job2", force=True) is None
+    assert tasks.claim_inflight("k", "job3") == "job2"
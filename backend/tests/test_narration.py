@@ -0,0 +1,66 @@
+import asyncio
+import json
+from rq import SimpleWorker
+from app import progress, tasks, worker_jobs
+from app.models import Job, Report
+
+
+async def _stream(job_id: str) -> list[dict]:
+    """The SSE events a client opening the stream now receives before the first keepalive."""
+    events = []
+    async for event in progress.iter_events(job_id, None, keepalive_s=0.05):
+        if not event.startswith("data: "):
+            break
+        events.append(json.loads(event[len("data: "):]))
+    return events
+
+
+def test_narration_retry_keeps_stream_open_until_it_succeeds(redis, db, monkeypatch):
+    db.add(Job(id="j1", status="done", progress=100, pgn_hash="h:s"))
+    db.add(Report(job_id="j1", pgn_hash="h:s", headers={}, moment_cards=[]))
+    db.commit()
+    progress.publish("j1", status="done", progress=100, narration_status="pending")
+    outcomes = iter([RuntimeError("rate limited"), {"summary": "ok"}])
+
+    def narrate(headers, moment_cards):
+        out = next(outcomes)
+        if isinstance(out, Exception):
+            raise out
+        return out
+
+    monkeypatch.setattr(worker_jobs, "narrate", narrate)
+    rq_id = tasks.enqueue_narration("j1")
+    worker = SimpleWorker([tasks.narration_queue], connection=redis)
+
+    worker.work(burst=True)  # first attempt fails; RQ schedules a retry
+    events = asyncio.run(_stream("j1"))
+    assert events[-1]["narration_status"] == "pending"
+    assert not progress.is_final(events[-1])
+
+    tasks.narration_queue.scheduled_job_registry.requeue(rq_id)
+    worker.work(burst=True)
+    events = asyncio.run(_stream("j1"))
+    assert events[-1]["narration_status"] == "done"
+    assert progress.is_final(events[-1])
+    db.expire_all()
+    assert db.get(Report, "j1").narration_status == "done"
+
+
+def test_narration_error_is_final_on_the_last_attempt(redis, db, monkeypatch):
+    db.add(Job(id="j2", status="done", progress=100, pgn_hash="h:s"))
+    db.add(Report(job_id="j2", pgn_hash="h:s", headers={}, moment_cards=[]))
+    db.commit()
+
+    def narrate(headers, moment_cards):
+        raise RuntimeError("down")
+
+    monkeypatch.setattr(worker_jobs, "narrate", narrate)
+    rq_id = tasks.enqueue_narration("j2")
+    worker = SimpleWorker([tasks.narration_queue], connection=redis)
+    for attempt in range(4):  # the first try and its three retries
+        if attempt:
+            tasks.narration_queue.scheduled_job_registry.requeue(rq_id)
+        worker.work(burst=True)
+        db.expire_all()
+        assert db.get(Report, "j2").narration_status == ("error" if attempt == 3 else "pending")
+    assert progress.is_final(progress.get_state("j2") | {"status": "done"})
@@ -0,0 +1,55 @@
+import io
+import chess
+import chess.engine
+import chess.pgn
+import pytest
+from app.analysis import engine as engine_mod
+from app.analysis import pivots
+
+FOOLS_MATE = "1. f3 e5 2. g4 Qh4# 0-1"
+
+
+class _StubEngine:
+    """Stops every search at `reached` plies, as a time limit would."""
+
+    def __init__(self, reached: int):
+        self.reached = reached
+
+    def analyse(self, board, limit, multipv=1):
+        move = next(iter(board.legal_moves), None)
+        info = {"score": chess.engine.PovScore(chess.engine.Cp(0), chess.WHITE),
+                "depth": 0 if move is None else self.reached}
+        if move is not None:
+            info["pv"] = [move]
+        return [info]
+
+
+@pytest.fixture(autouse=True)
+def no_eval_cache(monkeypatch):
+    monkeypatch.setattr(engine_mod, "get_eval_cache", lambda: None)
+
+
+def _records():
+    return pivots._records(chess.pgn.read_game(io.StringIO(FOOLS_MATE)))
+
+
+def test_scan_records_the_depth_reached():
+    records = _records()
+    plies = list(range(len(records)))
+    pivots._scan(_StubEngine(reached=9), records, plies, 20, [0.1] * len(plies), None, 1)
+    assert [r.depth for r in records[:-1]] == [9] * (len(records) - 1)
+    assert records[-1].depth == pivots.RESOLVED_DEPTH  # checkmate on the board is exact
+
+
+@pytest.mark.parametrize("depths, expected", [
+    ([8, 8, 16, 16, 8], [3]),  # both sides searched by the deep pass
+    ([8, 8, 11, 11, 8], [3]),  # deep searches cut short by their time limit still count
+    ([8, 8, 8, 16, 8], []),    # one side only has the sweep's eval
+])
+def test_two_pass_curve_candidates_follow_the_deep_pass(depths, expected):
+    records = _records()
+    for rec, score, depth in zip(records, [0, 0, 0, 400, 400], depths):
+        rec.score, rec.depth = score, depth
+    curve = {"mode": "two_pass", "prescan_depth": 8}
+    assert [i for i, _ in pivots._curve_candidates(records, curve, 120)] == expected
+    assert [i for i, _ in pivots._curve_candidates(records, {"mode": "full"}, 120)] == [3]
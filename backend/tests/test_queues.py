@@ -0,0 +1,100 @@
+import pytest
+from rq import SimpleWorker
+from app import tasks, worker_jobs
+
+
+def _enqueue(tenant: str, cost: int = tasks.FAST_LANE_MAX_COST + 1, bulk: bool = False) -> tuple[str, str]:
+    return tasks.enqueue_analysis(job_id="job", game_hash="hash", settings={}, cost=cost, tenant=tenant, bulk=bulk)
+
+
+def _waiting(queue, owners: dict) -> str:
+    return "".join(owners[i] for i in queue.job_ids)
+
+
+def _pop(queue) -> str:
+    rq_id = tasks.redis_conn.lpop(queue.key).decode()
+    tasks.forget_tenant(queue.name, rq_id)  # as run_analysis does when it starts
+    return rq_id
+
+
+def test_waiting_jobs_alternate_across_tenants(redis):
+    owners = {}
+    for tenant in "AAAABBC":
+        owners[_enqueue(tenant)[0]] = tenant
+    assert _waiting(tasks.bulk_queue, owners) == "ABCABAA"
+
+
+def test_newcomer_joins_the_round_being_served(redis):
+    owners = {}
+    for tenant in "AAAA":
+        owners[_enqueue(tenant)[0]] = tenant
+    assert owners[_pop(tasks.bulk_queue)] == "A"
+    for tenant in "BB":
+        owners[_enqueue(tenant)[0]] = tenant
+    # A's first job started in round 0, so B's first job comes before A's second
+    assert _waiting(tasks.bulk_queue, owners) == "BABAA"
+
+
+def test_single_tenant_appends_in_order(redis):
+    ids = [_enqueue("A")[0] for _ in range(50)]
+    assert tasks.bulk_queue.job_ids == ids
+
+
+def test_forget_tenant_drops_bookkeeping(redis):
+    rq_id, queue_name = _enqueue("A")
+    jobs_key = tasks._owners_key(queue_name)
+    assert redis.hexists(jobs_key, rq_id)
+    assert redis.ttl(jobs_key) > 0
+    _pop(tasks.bulk_queue)
+    assert not redis.hexists(jobs_key, rq_id)
+    tasks.forget_tenant(queue_name, rq_id)  # idempotent, e.g. the failure callback after a start
+
+
+def test_job_failing_before_it_starts_drops_bookkeeping(redis, monkeypatch):
+    def crash(*args):
+        raise RuntimeError("cannot load job")
+
+    monkeypatch.setattr(worker_jobs, "run_analysis", crash)
+    _enqueue("A")
+    SimpleWorker([tasks.bulk_queue], connection=redis).work(burst=True)
+    assert redis.hlen(tasks._owners_key(tasks.bulk_queue.name)) == 0
+
+
+def test_failed_enqueue_drops_bookkeeping(redis, monkeypatch):
+    def fail(*args, **kwargs):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(tasks.bulk_queue, "enqueue", fail)
+    with pytest.raises(ConnectionError):
+        _enqueue("A")
+    assert redis.hlen(tasks._owners_key(tasks.bulk_queue.name)) == 0
+
+
+@pytest.mark.parametrize("cost, bulk, queue", [
+    (1, False, "analysis_fast"),
+    (tasks.FAST_LANE_MAX_COST, False, "analysis_fast"),
+    (tasks.FAST_LANE_MAX_COST + 1, False, "analysis_bulk"),
+    (1, True, "analysis_bulk"),
+])
+def test_route_by_cost(redis, cost, bulk, queue):
+    assert tasks.route(cost, bulk).name == queue
+    assert _enqueue("A", cost=cost, bulk=bulk)[1] == queue
+
+
+@pytest.mark.parametrize("settings, anytime, cost", [
+    ({"depth": 16, "multipv": 2}, False, 30 * 16 * 2),
+    ({"depth": 16, "multipv": 3, "budget_s": 5}, True, 30 * tasks.ANYTIME_START_DEPTH * 3),
+    ({"depth": 16, "multipv": 3, "budget_s": 5}, False, 30 * 16 * 3),  # reused curve / [%eval] comments
+    ({"depth": 6, "multipv": 1, "budget_s": 5}, True, 30 * 6),
+])
+def test_estimate_cost(settings, anytime, cost):
+    assert tasks.estimate_cost(30, settings, anytime=anytime) == cost
+
+
+def test_runs_anytime():
+    budget = {"budget_s": 5}
+    assert tasks.runs_anytime(budget, reuses_curve=False, annotated=False)
+    assert not tasks.runs_anytime({}, reuses_curve=False, annotated=False)
+    assert not tasks.runs_anytime(budget, reuses_curve=True, annotated=False)
+    assert not tasks.runs_anytime({**budget, "embedded_evals": "trust"}, reuses_curve=False, annotated=True)
+    assert tasks.runs_anytime({**budget, "embedded_evals": "trust"}, reuses_curve=False, annotated=False)
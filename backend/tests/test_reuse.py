@@ -0,0 +1,114 @@
+import io
+import chess
+import chess.pgn
+import pytest
+from app.analysis.cards import pack_cards
+from app.analysis.curve import covers, pack_curve
+from app.models import Job, Report, EvalCurve
+from app.reuse import index_report, plan
+from app.schemas import PivotMoment
+
+PGN = "1. e4 e5 2. Nf3 Nc6 3. Bc4 Nd4 4. Nxe5 Qg5 *"
+GAME_HASH = "game"
+SWING_PLY = 7  # 4. Nxe5: the only swing above the thresholds used here
+
+
+def _curve(mode: str, depth: int, prescan_depth: int | None = None, pre_threshold: int | None = None) -> dict:
+    game = chess.pgn.read_game(io.StringIO(PGN))
+    moves = [m.uci() for m in game.mainline_moves()]
+    n = len(moves) + 1
+    return {"depth": depth, "mode": mode, "prescan_depth": prescan_depth, "pre_threshold": pre_threshold,
+            "fen": chess.STARTING_FEN, "moves": moves, "scores": [0] * SWING_PLY + [300] * (n - SWING_PLY),
+            "depths": [depth] * n, "sources": ["embedded" if mode == "embedded" else "engine"] * n, "pvs": [()] * n}
+
+
+FULL_16 = _curve("full", 16)
+TWO_PASS_16 = _curve("two_pass", 16, prescan_depth=8, pre_threshold=60)
+EMBEDDED_20 = _curve("embedded", 20)
+
+
+@pytest.mark.parametrize("curve, depth, mode, prescan_depth, pre_threshold, expected", [
+    # a full curve serves any request at its depth or shallower, whatever the mode
+    (FULL_16, 16, "full", 8, 60, True),
+    (FULL_16, 12, "two_pass", 6, 30, True),
+    (FULL_16, 18, "full", 8, 60, False),
+    # a two-pass curve needs a two-pass request with the same sweep flagging no more plies
+    (TWO_PASS_16, 14, "two_pass", 8, 60, True),
+    (TWO_PASS_16, 14, "two_pass", 8, 90, True),
+    (TWO_PASS_16, 14, "two_pass", 8, 50, False),
+    (TWO_PASS_16, 14, "two_pass", 10, 60, False),
+    (TWO_PASS_16, 14, "full", 8, 60, False),
+    (TWO_PASS_16, 18, "two_pass", 8, 60, False),
+    # a PGN's own [%eval] comments serve nothing else
+    (EMBEDDED_20, 8, "full", 8, 60, False),
+    (EMBEDDED_20, 8, "two_pass", 8, 60, False),
+])
+def test_covers(curve, depth, mode, prescan_depth, pre_threshold, expected):
+    assert covers(curve, depth, mode, prescan_depth, pre_threshold) is expected
+
+
+def _store_curve(db, curve: dict) -> EvalCurve:
+    row = EvalCurve(game_hash=GAME_HASH, depth=curve["depth"], mode=curve["mode"],
+                    plies=len(curve["scores"]) - 1, data=pack_curve(curve))
+    db.add(row)
+    db.commit()
+    return row
+
+
+def _store_report(db, job_id: str, curve_row: EvalCurve, depth: int, multipv: int) -> None:
+    game = chess.pgn.read_game(io.StringIO(PGN))
+    board = game.board()
+    moves = list(game.mainline_moves())
+    for mv in moves[:SWING_PLY - 1]:
+        board.push(mv)
+    played = moves[SWING_PLY - 1]
+    card = PivotMoment(ply=SWING_PLY, side_to_move="White", fen_before=board.fen(), uci_played=played.uci(),
+                       san_played=board.san(played), uci_best="", san_best="").model_dump()
+    db.add(Job(id=job_id, status="done", pgn_hash=f"{GAME_HASH}:x", game_hash=GAME_HASH))
+    db.add(Report(job_id=job_id, pgn_hash=f"{GAME_HASH}:x", headers={}, cards_blob=pack_cards([card]),
+                  curve_id=curve_row.id))
+    index_report(db, GAME_HASH, job_id, curve_row.id, {"depth": depth, "multipv": multipv})
+    db.commit()
+
+
+def _plan(db, **settings) -> dict:
+    game = chess.pgn.read_game(io.StringIO(PGN))
+    return plan(db, GAME_HASH, game, {"depth": 14, "multipv": 2, "swing_threshold_cp": 120, **settings})
+
+
+@pytest.mark.parametrize("stored, settings, curve_mode", [
+    ([], {}, None),
+    ([FULL_16], {}, "full"),
+    ([FULL_16], {"depth": 18}, None),
+    ([EMBEDDED_20], {}, None),
+    ([TWO_PASS_16], {"mode": "two_pass", "prescan_depth": 8}, "two_pass"),
+    ([TWO_PASS_16], {"mode": "two_pass", "prescan_depth": 8, "swing_threshold_cp": 100}, None),
+    ([TWO_PASS_16], {}, None),
+    # when both cover the request the full curve wins
+    ([TWO_PASS_16, FULL_16], {"mode": "two_pass", "prescan_depth": 8}, "full"),
+    ([EMBEDDED_20, FULL_16], {}, "full"),
+])
+def test_plan_picks_a_covering_curve(db, stored, settings, curve_mode):
+    for curve in stored:
+        _store_curve(db, curve)
+    result = _plan(db, **settings)
+    if curve_mode is None:
+        assert result["curve_row"] is None and result["missing"] is None
+    else:
+        assert result["curve_row"].mode == curve_mode
+        assert result["missing"] == [SWING_PLY]
+
+
+@pytest.mark.parametrize("indexed, settings, derived", [
+    ((16, 3), {}, True),
+    ((14, 2), {}, True),
+    ((16, 3), {"multipv": 4}, False),  # the stored cards list fewer candidates
+    ((12, 3), {}, False),              # and here they were searched shallower
+])
+def test_plan_reuses_cards_of_dominating_analyses(db, indexed, settings, derived):
+    row = _store_curve(db, FULL_16)
+    _store_report(db, "earlier", row, *indexed)
+    result = _plan(db, **settings)
+    assert result["missing"] == ([] if derived else [SWING_PLY])
+    assert result["derived_from"] == (["earlier"] if derived else [])
+    assert list(result["cards"]) == ([SWING_PLY] if derived else [])
@@ -3,7 +3,7 @@ import ReportView from "../../../components/ReportView";
 const API_BASE = process.env.NEXT_PUBLIC_API_BASE || "http://localhost:8000";
 
 async function getReport(id: string) {
-  const res = await fetch(`${API_BASE}/api/report/${id}`, { cache: "no-store" });
+  const res = await fetch(`${API_BASE}/api/report/${id}?slim=true`, { cache: "no-store" });
   if (!res.ok) return null;
   return res.json();
 }
@@ -7,6 +7,7 @@ type CandidateLine = { uci: string; san: string; eval_cp?: number | null; pv: PV
 
 export default function InteractiveBoard({
   fen,
+  playedMove,
   pvMoves,
   pvPlayedMoves,
   candidatesBest,
@@ -14,6 +15,7 @@ export default function InteractiveBoard({
   title = "Best line"
 }: {
   fen: string,
+  playedMove?: string,
   pvMoves: PVMove[],
   pvPlayedMoves?: PVMove[],
   candidatesBest?: CandidateLine[],
@@ -34,16 +36,28 @@ export default function InteractiveBoard({
   const activeCand = cands[candIndex] || null;
   const moves = activeCand?.pv?.length ? activeCand.pv : (lineType === "played" ? (pvPlayedMoves || []) : pvMoves);
 
-  // Build FEN sequence for PV using fen_after if present, else chess.js
+  // The played line starts after the played move
+  const startFen = useMemo(() => {
+    if (lineType !== "played" || !playedMove) return fen;
+    try {
+      const chess = new Chess(fen);
+      chess.move({ from: playedMove.slice(0, 2), to: playedMove.slice(2, 4), promotion: playedMove[4] });
+      return chess.fen();
+    } catch (e) {
+      return fen;
+    }
+  }, [fen, playedMove, lineType]);
+
+  // Build FEN sequence for PV using fen_after if present, else chess.js (slim reports omit it)
   const fens = useMemo(() => {
-    const out = [fen];
+    const out = [startFen];
     if (moves.length > 0 && moves.every(m => m.fen_after)) {
       moves.forEach((m) => {
         out.push(m.fen_after!);
       });
     } else if (moves.length > 0) {
       try {
-        const chess = new Chess(fen);
+        const chess = new Chess(startFen);
         moves.forEach((move: any) => {
           const from = move.uci.slice(0,2);
           const to = move.uci.slice(2,4);
@@ -54,7 +68,7 @@ export default function InteractiveBoard({
       } catch (e) {}
     }
     return out;
-  }, [fen, moves]);
+  }, [startFen, moves]);
       <div style={{ marginTop: 10 }}>
         <button
           style={{ padding: "4px 8px", borderRadius: 8, border: "1px solid #ccc", fontWeight: 600, cursor: "pointer" }}
@@ -146,7 +160,7 @@ export default function InteractiveBoard({
             </span>
           </div>
           <div style={{ marginTop: 10, fontSize: 12, opacity: 0.75 }}>
-            Tip: backend already provides <code>fen_after</code> for each PV move—this board will use it automatically.
+            Tip: full reports include <code>fen_after</code> for each PV move; slim ones are replayed here with chess.js.
           </div>
         </div>
       </div>
@@ -14,6 +14,7 @@ export default function MomentCard({ m }: { m: any }) {
       <div style={{ marginTop: 10 }}>
         <InteractiveBoard
           fen={m.fen_before}
+          playedMove={m.uci_played}
           pvMoves={m.pv_best || []}
           pvPlayedMoves={m.pv_played || []}
             {/* Legacy fields removed; only new schema fields rendered */}
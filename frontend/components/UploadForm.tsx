@@ -20,6 +20,9 @@ type Report2 = {
   job_id: string;
   headers: Record<string, string>;
   pivotal_moments: Pivot[];
+  version?: number;
+  effective_depth?: number | null;
+  final?: boolean;
 };
 
 const SAMPLE_PGN = `[Event "Live Chess"]
@@ -54,6 +57,7 @@ export default function UploadForm() {
   const [threshold, setThreshold] = useState(80);
   const [gap, setGap] = useState(2);
   const [explainTopN, setExplainTopN] = useState(5);
+  const [budget, setBudget] = useState(0); // seconds; 0 = fixed-depth analysis
 
   const [jobId, setJobId] = useState<string | null>(null);
   const [status, setStatus] = useState<string | null>(null);
@@ -78,6 +82,7 @@ export default function UploadForm() {
       swing_threshold_cp: threshold,
       min_ply_gap: gap,
       multipv: 2,
+      ...(budget > 0 ? { budget_s: budget } : {}),
     };
 
     // IMPORTANT: same-origin call; Next rewrites /api/* to your backend
@@ -110,10 +115,48 @@ export default function UploadForm() {
       console.warn("db_job_id does not look like a UUID:", dbJobId);
     }
     setJobId(dbJobId);
-    poll(dbJobId);
+    follow(dbJobId);
+  }
+
+  // Prefer the server-sent event stream; fall back to polling if it can't be opened.
+  function follow(id: string) {
+    if (typeof EventSource === "undefined") {
+      poll(id);
+      return;
+    }
+    let gotEvent = false;
+    let shownVersion = 0;
+    const es = new EventSource(`/api/analyze/${id}/events`);
+    es.onmessage = (ev) => {
+      gotEvent = true;
+      const s = JSON.parse(ev.data);
+      setStatus(s.status);
+      setProgress(s.progress ?? 0);
+      // anytime jobs publish refined report versions while they run
+      if (s.status === "running" && s.report_version && s.report_version !== shownVersion) {
+        shownVersion = s.report_version;
+        loadReport2(id);
+      }
+      if (s.status === "done") {
+        es.close();
+        loadReport2(id);
+      } else if (s.status === "error") {
+        es.close();
+        setError({
+          title: "Analysis failed",
+          message: s.error_message || "Analysis failed",
+          retry: () => poll(id),
+        });
+      }
+    };
+    es.onerror = () => {
+      es.close();
+      poll(id);
+    };
   }
 
   async function poll(id: string) {
+    let shownVersion = 0;
     for (let i = 0; i < 200; i++) {
       const res = await fetch(`/api/analyze/${id}`);
       try {
@@ -130,6 +173,10 @@ export default function UploadForm() {
       const s = await res.json();
       setStatus(s.status);
       setProgress(s.progress ?? 0);
+      if (s.status === "running" && s.report_version && s.report_version !== shownVersion) {
+        shownVersion = s.report_version;
+        loadReport2(id);
+      }
 
       if (s.status === "done") {
         await loadReport2(id);
@@ -153,7 +200,7 @@ export default function UploadForm() {
   }
 
   async function loadReport2(id: string) {
-    const res = await fetch(`/api/report/${id}?depth=${depth}&max_items=${explainTopN}`);
+    const res = await fetch(`/api/report/${id}?depth=${depth}&max_items=${explainTopN}&slim=true`);
     try {
       await assertOk(res);
     } catch (err: any) {
@@ -225,6 +272,10 @@ export default function UploadForm() {
           Min ply gap
           <input type="number" value={gap} min={1} max={30} onChange={(e) => setGap(parseInt(e.target.value || "2", 10))} style={{ width: "100%" }} />
         </label>
+        <label>
+          Time budget (s, 0 = off)
+          <input type="number" value={budget} min={0} max={1800} onChange={(e) => setBudget(parseInt(e.target.value || "0", 10))} style={{ width: "100%" }} />
+        </label>
         <label>
           Explain top N
           <input type="number" value={explainTopN} min={1} max={25} onChange={(e) => setExplainTopN(parseInt(e.target.value || "5", 10))} style={{ width: "100%" }} />
@@ -290,6 +341,11 @@ export default function UploadForm() {
           <div style={{ fontSize: 13, opacity: 0.8 }}>
             {report.headers?.White} vs {report.headers?.Black} — {report.headers?.Result}
           </div>
+          {report.effective_depth != null && (
+            <div style={{ fontSize: 13, opacity: 0.8 }}>
+              Depth {report.effective_depth}{report.final === false ? " — refining…" : ""}
+            </div>
+          )}
 
           {report.pivotal_moments?.length ? report.pivotal_moments.map((m, idx) => (
             <MomentCard m={m} />
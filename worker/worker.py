@@ -1,13 +1,31 @@
 import os
 from redis import Redis
-from rq import Worker, Queue, Connection
+from rq import SimpleWorker, Queue, Connection
+from app.analysis.engine_pool import get_pool
+from app.metrics import start_worker_metrics_server
+from app.retention import start_background as start_retention
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
-listen = ["analysis"]
+# Queues in priority order. Engine workers run the analysis lanes (fast before bulk, so
+# single games overtake queued batches); narration workers run "narration", so the
+# number of narrator processes caps concurrent LLM calls.
+listen = [q.strip() for q in os.getenv("WORKER_QUEUES", "analysis_fast,analysis_bulk,narration").split(",") if q.strip()]
 conn = Redis.from_url(REDIS_URL)
 
 if __name__ == "__main__":
-    with Connection(conn):
-        worker = Worker([Queue(name) for name in listen])
-        worker.work(with_scheduler=False)
+    # SimpleWorker runs jobs in this process (no fork per job), so the engine
+    # pool below stays warm across jobs instead of being respawned each time.
+    start_worker_metrics_server()
+    pool = get_pool()
+    if any(name.startswith("analysis") for name in listen):
+        pool.warm()
+        # old jobs, reports and PGNs are swept from here (one worker per interval)
+        start_retention(conn)
+    try:
+        with Connection(conn):
+            worker = SimpleWorker([Queue(name) for name in listen])
+            # narration retries are scheduled with a delay, which needs the RQ scheduler
+            worker.work(with_scheduler="narration" in listen)
+    finally:
+        pool.close()